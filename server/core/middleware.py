@@ -0,0 +1,40 @@
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+
+from core.query_stats import QueryStats, record_request
+
+
+class QueryStatsMiddleware:
+    """
+    Record the number of SQL queries, the total SQL time and the slowest
+    statements of every request, aggregated per endpoint for the
+    /statistics/queries endpoint.
+    With QUERY_STATS_HEADERS (DEBUG by default) the numbers of the request
+    are also sent as X-Query-Count, X-Query-Time-Ms and X-Slowest-Query-Ms.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'QUERY_STATS_ENABLED', True)
+        self.headers = getattr(settings, 'QUERY_STATS_HEADERS', settings.DEBUG)
+        self.slowest = getattr(settings, 'QUERY_STATS_SLOWEST', 5)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        stats = QueryStats(self.slowest)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+
+        # Requests that matched no URL are not an endpoint
+        if request.resolver_match is not None:
+            record_request(request.method, request.resolver_match.route, stats, self.slowest)
+        if self.headers:
+            response['X-Query-Count'] = str(stats.count)
+            response['X-Query-Time-Ms'] = f'{stats.time * 1000:.3f}'
+            slowest = max(stats.slowest, default=(0.0, ''))
+            response['X-Slowest-Query-Ms'] = f'{slowest[0] * 1000:.3f}'
+        return response
@@ -0,0 +1,104 @@
+import os
+import time
+import heapq
+import threading
+
+# Longest SQL text kept for a slow statement
+MAX_SQL_LENGTH = 500
+
+_endpoints = {}  # (method, route) -> aggregated EndpointStats of this process
+_lock = threading.Lock()
+
+
+class QueryStats:
+    """
+    Database execute wrapper that counts and times the statements of one
+    request and keeps the slowest ones
+
+    Args:
+        slowest: Number of slowest statements kept
+    """
+    def __init__(self, slowest=5):
+        self.limit = slowest
+        self.count = 0
+        self.time = 0.0
+        self.slowest = []  # Heap of (seconds, sql), fastest on top
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add(time.perf_counter() - started, sql)
+
+    def add(self, duration, sql):
+        self.count += 1
+        self.time += duration
+        entry = (duration, sql[:MAX_SQL_LENGTH])
+        if len(self.slowest) < self.limit:
+            heapq.heappush(self.slowest, entry)
+        elif duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def slowest_first(self):
+        return sorted(self.slowest, reverse=True)
+
+
+class EndpointStats:
+    """Query counts and SQL time of all requests to one endpoint"""
+    def __init__(self, slowest=5):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.time = 0.0
+        self.max_time = 0.0
+        self.slowest = QueryStats(slowest)
+
+    def add(self, stats):
+        self.requests += 1
+        self.queries += stats.count
+        self.max_queries = max(self.max_queries, stats.count)
+        self.time += stats.time
+        self.max_time = max(self.max_time, stats.time)
+        for duration, sql in stats.slowest:
+            self.slowest.add(duration, sql)
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'avg_queries': round(self.queries / self.requests, 2),
+            'max_queries': self.max_queries,
+            'avg_sql_ms': round(self.time / self.requests * 1000, 3),
+            'max_sql_ms': round(self.max_time * 1000, 3),
+            'slowest': [
+                {'sql_ms': round(duration * 1000, 3), 'sql': sql}
+                for duration, sql in self.slowest.slowest_first()
+            ],
+        }
+
+
+def record_request(method, route, stats, slowest=5):
+    with _lock:
+        endpoint = _endpoints.get((method, route))
+        if endpoint is None:
+            endpoint = _endpoints[method, route] = EndpointStats(slowest)
+        endpoint.add(stats)
+
+
+def get_endpoint_stats():
+    """
+    Aggregated stats of every endpoint served by this process, the ones
+    running the most queries per request first
+    """
+    with _lock:
+        endpoints = [
+            {'method': method, 'route': route, **endpoint.as_dict()}
+            for (method, route), endpoint in _endpoints.items()
+        ]
+    endpoints.sort(key=lambda endpoint: (-endpoint['max_queries'], -endpoint['avg_sql_ms']))
+    return {'pid': os.getpid(), 'endpoints': endpoints}
+
+
+def reset_endpoint_stats():
+    with _lock:
+        _endpoints.clear()
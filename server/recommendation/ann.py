@@ -0,0 +1,138 @@
+import os
+import numpy as np
+
+CENTROIDS_FILE = 'ann_centroids.npy'
+VECTORS_FILE = 'ann_vectors.npy'
+IDS_FILE = 'ann_ids.npy'
+OFFSETS_FILE = 'ann_offsets.npy'
+
+
+def normalize(vectors):
+    """L2-normalize rows, zero rows stay zero"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def assign_lists(vectors, centroids, chunk_size=65536):
+    """Index of the closest (by cosine) centroid for every vector"""
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_size):
+        chunk = vectors[start:start + chunk_size]
+        assignment[start:start + chunk_size] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignment
+
+
+class IVFIndex:
+    """
+    Inverted-file index for approximate cosine nearest-neighbour search.
+    Vectors are normalized once and grouped by their closest k-means centroid,
+    a query only scans the `nprobe` lists whose centroids are closest to it.
+    A higher `nprobe` gives better recall at the cost of latency, with
+    nprobe == number of lists the search is exact.
+    """
+    def __init__(self, centroids, vectors, ids, offsets):
+        self.centroids = centroids  # Normalized list centroids
+        self.vectors = vectors  # Normalized vectors ordered by list
+        self.ids = ids  # Original row of every vector in `vectors`
+        self.offsets = offsets  # List i is vectors[offsets[i]:offsets[i + 1]]
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, embeddings, n_lists=None, n_iter=10, sample_per_list=64, seed=0):
+        """
+        Build the index with spherical k-means on a sample of the vectors
+
+        Args:
+            embeddings: Matrix with one vector per row
+            n_lists: Number of inverted lists, sqrt(N) by default
+            n_iter: k-means iterations
+            sample_per_list: Training sample size per list
+            seed: Random seed
+
+        Returns:
+            IVFIndex
+        """
+        vectors = normalize(embeddings)
+        n = len(vectors)
+        n_lists = min(n_lists or max(1, int(np.sqrt(n))), max(n, 1))
+        rng = np.random.default_rng(seed)
+
+        sample = vectors[rng.choice(n, min(n, n_lists * sample_per_list), replace=False)]
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            assignment = assign_lists(sample, centroids)
+            order = np.argsort(assignment, kind='stable')
+            counts = np.bincount(assignment, minlength=n_lists)
+            nonempty = np.flatnonzero(counts)
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[nonempty]
+            # Empty lists keep their previous centroid
+            centroids[nonempty] = np.add.reduceat(sample[order], starts, axis=0)
+            centroids = normalize(centroids)
+
+        assignment = assign_lists(vectors, centroids)
+        order = np.argsort(assignment, kind='stable')
+        counts = np.bincount(assignment, minlength=n_lists)
+        offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        return cls(centroids, vectors[order], order.astype(np.int64), offsets)
+
+    def search(self, query, k=10, nprobe=8, exclude=None):
+        """
+        Find approximate nearest neighbours of a vector
+
+        Args:
+            query: Query vector
+            k: Number of neighbours to return
+            nprobe: Number of closest lists to scan
+            exclude: Row to leave out of the results (usually the query itself)
+
+        Returns:
+            Tuple of (rows, cosine similarities), best first
+        """
+        query = normalize(query)
+        nprobe = min(nprobe, self.n_lists)
+        centroid_scores = self.centroids @ query
+        if nprobe < self.n_lists:
+            lists = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        else:
+            lists = np.arange(self.n_lists)
+
+        candidates = np.concatenate([
+            np.arange(self.offsets[i], self.offsets[i + 1]) for i in lists
+        ])
+        scores = self.vectors[candidates] @ query
+        if exclude is not None:
+            scores[self.ids[candidates] == exclude] = -np.inf
+
+        k = min(k, len(candidates))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        top = top[np.isfinite(scores[top])]
+        return self.ids[candidates[top]], scores[top]
+
+    def save(self, directory):
+        np.save(os.path.join(directory, CENTROIDS_FILE), self.centroids)
+        np.save(os.path.join(directory, VECTORS_FILE), self.vectors)
+        np.save(os.path.join(directory, IDS_FILE), self.ids)
+        np.save(os.path.join(directory, OFFSETS_FILE), self.offsets)
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Load a saved index, None if the directory doesn't contain one.
+        Arrays are memory-mapped read-only and shared between processes.
+        """
+        if not os.path.exists(os.path.join(directory, CENTROIDS_FILE)):
+            return None
+        return cls(
+            np.load(os.path.join(directory, CENTROIDS_FILE), mmap_mode='r'),
+            np.load(os.path.join(directory, VECTORS_FILE), mmap_mode='r'),
+            np.load(os.path.join(directory, IDS_FILE), mmap_mode='r'),
+            np.load(os.path.join(directory, OFFSETS_FILE), mmap_mode='r'),
+        )
@@ -0,0 +1,118 @@
+import hashlib
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import QuerySet
+
+CURSOR_KEY_PREFIX = 'recommendation-cursor:'
+
+
+def get_cursor_cache():
+    return caches[getattr(settings, 'RECOMMENDATION_CURSOR_CACHE', 'default')]
+
+
+def get_request_signature(request, catalog_marker=None):
+    """
+    Identify who asked for a ranking and with which parameters, so a cursor
+    can't be replayed for another user or another filter. With the marker of
+    the catalog the ranking was filtered and sorted on, a product edit starts
+    a new ranking.
+    """
+    params = sorted(
+        (key, tuple(values)) for key, values in request.query_params.lists()
+        if key not in ('page', 'page_size', 'cursor')
+    )
+    user_id = request.user.id if request.user and request.user.is_authenticated else None
+    return hashlib.sha256(repr((user_id, params, catalog_marker)).encode()).hexdigest()
+
+
+def get_cursor_token(model_version, signature):
+    """
+    The cursor of a request. The same user, parameters and model version
+    always get the same cursor, so a request without one reuses the stored
+    ranking instead of storing a new copy of it.
+    """
+    return hashlib.sha256(f'{model_version or ""}:{signature}'.encode()).hexdigest()[:32]
+
+
+def save_ranking(product_ids, model_version, signature):
+    """
+    Store a ranked list of product IDs under the cursor of the request.
+    Only the first RECOMMENDATION_CURSOR_MAX_ITEMS IDs are kept, see StoredRanking
+    for the pages after them.
+
+    Args:
+        product_ids: RankedSlice, list of IDs or ordered Product queryset
+        model_version: Version of the model that produced the ranking
+        signature: Request signature from get_request_signature
+
+    Returns:
+        Tuple of (token, stored product IDs, number of ranked products)
+    """
+    max_items = getattr(settings, 'RECOMMENDATION_CURSOR_MAX_ITEMS', 1000)
+    if isinstance(product_ids, QuerySet):
+        product_ids = product_ids.values_list('id', flat=True)
+        total = product_ids.count()
+    else:
+        total = len(product_ids)
+    product_ids = np.asarray(list(product_ids[:max_items]), dtype=np.int64)
+
+    token = get_cursor_token(model_version, signature)
+    get_cursor_cache().set(
+        CURSOR_KEY_PREFIX + token,
+        {
+            'version': model_version or '',
+            'signature': signature,
+            'ids': product_ids.tobytes(),
+            'total': total,
+        },
+        timeout=getattr(settings, 'RECOMMENDATION_CURSOR_TTL', 600),
+    )
+    return token, product_ids.tolist(), total
+
+
+def load_ranking(token, model_version, signature):
+    """
+    Get the ranked product IDs stored under a cursor token
+
+    Returns:
+        Tuple of (stored product IDs, number of ranked products), None if
+        the cursor expired, belongs to another request or was computed with
+        another model version
+    """
+    if not token:
+        return None
+    ranking = get_cursor_cache().get(CURSOR_KEY_PREFIX + token)
+    if ranking is None:
+        return None
+    if ranking['version'] != (model_version or '') or ranking['signature'] != signature:
+        return None
+    product_ids = np.frombuffer(ranking['ids'], dtype=np.int64).tolist()
+    return product_ids, ranking.get('total', len(product_ids))
+
+
+class StoredRanking:
+    """
+    A ranking of which only the first product IDs were stored, for the
+    paginator. Pages within the stored IDs are sliced from them, later pages
+    rank the products again.
+    """
+    def __init__(self, product_ids, total, rank):
+        """
+        Args:
+            product_ids: The stored first IDs of the ranking
+            total: Number of ranked products
+            rank: Function computing the whole ranking again
+        """
+        self.product_ids = product_ids
+        self.total = total
+        self.rank = rank
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, index):
+        """Slice of the ranking, as the paginator takes it"""
+        if index.stop is not None and 0 <= index.stop <= len(self.product_ids):
+            return self.product_ids[index]
+        return list(self.rank()[index])
@@ -0,0 +1,137 @@
+import numpy as np
+from django.conf import settings
+from django.db.models import Max
+
+from store.archive import NO_ID, iter_archived_navigations
+
+
+def load_navigations(navigations, chunk_size=None, archives=(), after_id=0):
+    """
+    Stream navigation events into preallocated NumPy arrays.
+    Archived segments are read first, then the navigations queryset. Only
+    the integer columns are read (no model instances, no joins) and rows
+    are fetched in keyset-paginated chunks, so peak memory on top of the
+    result arrays is bounded by the chunk size or one archived day.
+
+    The arrays are sized from the counts before loading. Rows archived,
+    compacted or deleted meanwhile make the counts stale, the arrays grow
+    when more rows come and are trimmed to the rows read.
+
+    Args:
+        navigations: ProductNavigation queryset to load
+        chunk_size: Rows fetched per query
+        archives: NavigationArchive segments to read as well, only their
+            events with a user and an ID above after_id are loaded
+
+    Returns:
+        Dictionary of equally long arrays: ids, user_ids, product_ids and
+        created_at (seconds since the epoch)
+    """
+    chunk_size = chunk_size or getattr(settings, 'RECOMMENDATION_LOADER_CHUNK_SIZE', 50000)
+
+    # Pin the upper bound, rows inserted while loading are left for the next run
+    upper_id = navigations.aggregate(max_id=Max('id'))['max_id'] or 0
+    navigations = navigations.filter(id__lte=upper_id)
+    total = navigations.count() + sum(archive.num_user_events for archive in archives)
+
+    events = {
+        'ids': np.empty(total, dtype=np.int64),
+        'user_ids': np.empty(total, dtype=np.int64),
+        'product_ids': np.empty(total, dtype=np.int64),
+        'created_at': np.empty(total, dtype=np.int64),
+    }
+
+    def reserve(end):
+        # Only when the counts were stale, grown by half so repeated chunks stay linear
+        if end > len(events['ids']):
+            size = max(end, len(events['ids']) * 3 // 2)
+            for name, values in events.items():
+                events[name] = np.resize(values, size)
+
+    filled = 0
+    for _, segment in iter_archived_navigations(archives):
+        keep = (segment['user_ids'] != NO_ID) & (segment['ids'] > after_id)
+        end = filled + int(keep.sum())
+        reserve(end)
+        for name in events:
+            events[name][filled:end] = segment[name][keep]
+        filled = end
+
+    last_id = 0
+    while True:
+        rows = list(
+            navigations.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'user_id', 'destination_product_id', 'created_at')[:chunk_size]
+        )
+        if not rows:
+            break
+
+        end = filled + len(rows)
+        reserve(end)
+        ids, user_ids, product_ids, created_at = zip(*rows)
+        events['ids'][filled:end] = ids
+        events['user_ids'][filled:end] = user_ids
+        events['product_ids'][filled:end] = product_ids
+        events['created_at'][filled:end] = np.fromiter(
+            (int(dt.timestamp()) for dt in created_at), dtype=np.int64, count=len(rows)
+        )
+
+        filled = end
+        last_id = ids[-1]
+        if len(rows) < chunk_size:
+            break
+
+    if filled < len(events['ids']):
+        events = {name: values[:filled] for name, values in events.items()}
+    return events
+
+
+class IdMap:
+    """
+    Read-only {id: index} lookup over an array of IDs where position == index.
+    It is backed by two flat arrays instead of a dict, so a snapshot can
+    memory-map it and every worker process shares the same pages.
+
+    Args:
+        ids: Array of IDs, ids[i] is the ID with index i
+        order: Permutation that sorts ids, computed if not given
+    """
+    def __init__(self, ids, order=None):
+        self.ids = ids
+        self.order = np.argsort(ids, kind='stable') if order is None else order
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids.tolist())
+
+    def __contains__(self, item_id):
+        return self.get(item_id) is not None
+
+    def __getitem__(self, item_id):
+        idx = self.get(item_id)
+        if idx is None:
+            raise KeyError(item_id)
+        return idx
+
+    def get(self, item_id, default=None):
+        pos = int(np.searchsorted(self.ids, item_id, sorter=self.order))
+        if pos < len(self.ids):
+            idx = int(self.order[pos])
+            if self.ids[idx] == item_id:
+                return idx
+        return default
+
+    def lookup(self, values):
+        """
+        Vectorized lookup
+
+        Args:
+            values: IDs to look up, all of them must be present
+
+        Returns:
+            Array of indices
+        """
+        return self.order[np.searchsorted(self.ids, values, sorter=self.order)]
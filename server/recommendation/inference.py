@@ -0,0 +1,44 @@
+import numpy as np
+
+
+def relu(x):
+    return np.maximum(x, 0, out=x)
+
+
+def sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+
+def mlp_scores(user_vector, product_embeddings, dense_layers, block_size=65536):
+    """
+    NumPy forward pass of the 'mlp' architecture for one user against every
+    product, equivalent to the Keras model:
+    concat(user, product) -> Dense relu -> ... -> Dense sigmoid
+
+    The first kernel is split into its user and product halves, so the user
+    half is computed once and the concatenated input is never built.
+    Products are scored in blocks to bound the size of the hidden activations.
+
+    Args:
+        user_vector: Embedding of the user
+        product_embeddings: Embedding table of all products
+        dense_layers: (kernel, bias) pairs of the Dense layers, in order
+        block_size: Number of products per block
+
+    Returns:
+        Array of scores, one per product index
+    """
+    (kernel, bias), rest = dense_layers[0], dense_layers[1:]
+    size = len(user_vector)
+    user_part = user_vector @ kernel[:size] + bias
+    product_kernel = kernel[size:]
+
+    scores = np.empty(len(product_embeddings), dtype=np.float32)
+    for start in range(0, len(product_embeddings), block_size):
+        x = relu(product_embeddings[start:start + block_size] @ product_kernel + user_part)
+        for i, (kernel, bias) in enumerate(rest):
+            x = x @ kernel + bias
+            if i < len(rest) - 1:
+                relu(x)
+        scores[start:start + len(x)] = x.ravel()
+    return sigmoid(scores)
@@ -0,0 +1,268 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+# Measured one call per run, the others `--queries` times
+BUILD_METHODS = ['train', 'build_similar_products', 'build_text_index']
+QUERY_METHODS = ['recommendations', 'similar_products', 'similar_products_ann', 'search_products']
+METHODS = BUILD_METHODS + QUERY_METHODS
+COLUMNS = [
+    'method', 'scale', 'users', 'products', 'events', 'calls',
+    'total_s', 'mean_ms', 'p95_ms', 'setup_rss_mb', 'peak_rss_mb',
+]
+PAGE_SIZE = 20
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def power_law(n, alpha, rng):
+    """Probabilities proportional to rank^-alpha, ranks shuffled over n items"""
+    weights = np.arange(1, n + 1, dtype=np.float64) ** -alpha
+    return rng.permutation(weights / weights.sum())
+
+
+def synthetic_events(num_users, num_products, num_events, rng):
+    """Navigations with power-law product popularity and user activity, like load_navigations returns them"""
+    return {
+        'ids': np.arange(1, num_events + 1, dtype=np.int64),
+        'user_ids': rng.choice(num_users, num_events, p=power_law(num_users, 0.8, rng)).astype(np.int64) + 1,
+        'product_ids': rng.choice(num_products, num_events, p=power_law(num_products, 1.1, rng)).astype(np.int64) + 1,
+        'created_at': np.sort(rng.integers(0, 90 * 86400, num_events)),
+    }
+
+
+def synthetic_state(num_users, num_products, dim, architecture, rng):
+    """
+    A servable ModelState with random weights. Scoring costs the same as
+    with trained ones, and TensorFlow is never imported.
+    """
+    from recommendation.ann import IVFIndex
+    from recommendation.data import IdMap
+    from recommendation.neural_network import ModelState
+
+    # Clustered vectors, like trained embeddings of related products
+    centers = rng.normal(size=(max(1, num_products // 200), dim))
+    product_embeddings = (
+        centers[rng.integers(0, len(centers), num_products)] + 0.5 * rng.normal(size=(num_products, dim))
+    ).astype(np.float32)
+    product_ids = np.arange(1, num_products + 1, dtype=np.int64)
+    user_ids = np.arange(1, num_users + 1, dtype=np.int64)
+    values = dict(
+        user_mapping=IdMap(user_ids, np.arange(num_users)),
+        product_mapping=IdMap(product_ids, np.arange(num_products)),
+        product_ids=product_ids,
+        product_embeddings=product_embeddings,
+        similarity_index=IVFIndex.build(product_embeddings),
+        user_embeddings=rng.normal(size=(num_users, dim)).astype(np.float32),
+        architecture=architecture,
+    )
+    if architecture == 'dot':
+        values['product_bias'] = rng.normal(size=num_products).astype(np.float32)
+    else:
+        # Same shapes as RecommendationTrainer._create_model
+        sizes = [2 * dim, 128, 64, 1]
+        values['dense_layers'] = tuple(
+            (rng.normal(scale=0.1, size=(n_in, n_out)).astype(np.float32), np.zeros(n_out, dtype=np.float32))
+            for n_in, n_out in zip(sizes, sizes[1:])
+        )
+    return ModelState(**values)
+
+
+def synthetic_texts(num_products, rng, words_per_product=20):
+    """Product texts over a vocabulary that grows with the catalog, term frequencies follow Zipf's law"""
+    vocabulary = np.array([f'term{i}' for i in range(max(100, num_products // 2))])
+    term_p = power_law(len(vocabulary), 1.0, rng)
+    words = rng.choice(len(vocabulary), (num_products, words_per_product), p=term_p)
+    return [' '.join(vocabulary[row]) for row in words], vocabulary, term_p
+
+
+def run_method(method, options):
+    """
+    Set up the synthetic dataset, then time the method
+
+    Returns:
+        Dictionary with the COLUMNS of one result row
+    """
+    rng = np.random.default_rng(options['seed'])
+    num_users, num_products, num_events = options['users'], options['products'], options['events']
+    calls = 1 if method in BUILD_METHODS else options['queries']
+    dim = options['dim']
+    architecture = options['architecture']
+
+    if method == 'train':
+        from recommendation.neural_network import ModelState
+        from recommendation.training import RecommendationTrainer
+
+        trainer = RecommendationTrainer()
+        events = synthetic_events(num_users, num_products, num_events, rng)
+        run = lambda _: trainer.fit(ModelState(), events, epochs=options['train_epochs'])
+    elif method == 'build_similar_products':
+        from recommendation.similarity import build_similar_products_table
+
+        state = synthetic_state(num_users, num_products, dim, architecture, rng)
+        # Removed when the process exits
+        directory = tempfile.TemporaryDirectory()
+        run = lambda _: build_similar_products_table(
+            directory.name, state.product_embeddings, state.product_ids, 'benchmark',
+            k=getattr(settings, 'RECOMMENDATION_SIMILAR_PRODUCTS', 100),
+        )
+    elif method == 'build_text_index':
+        from recommendation.text_index import fit_text_index
+        # Imported by fit_text_index, not part of the build time
+        import sklearn.feature_extraction.text  # noqa: F401
+
+        texts, _, _ = synthetic_texts(num_products, rng)
+        product_ids = list(range(1, num_products + 1))
+        run = lambda _: fit_text_index(product_ids, texts)
+    else:
+        from recommendation import text_index
+        from recommendation.neural_network import RecommendationModel
+        from recommendation.similarity import build_similar_products_table, load_similar_products_table
+
+        model = RecommendationModel()
+        state = synthetic_state(num_users, num_products, dim, architecture, rng)
+        if method == 'similar_products':
+            directory = tempfile.TemporaryDirectory()
+            build_similar_products_table(
+                directory.name, state.product_embeddings, state.product_ids, 'benchmark',
+                k=getattr(settings, 'RECOMMENDATION_SIMILAR_PRODUCTS', 100),
+            )
+            table, meta = load_similar_products_table(directory.name)
+            state = state.replace(similar_products_table=table, similar_products_meta=meta, version='benchmark')
+        # Published in memory, the refresh intervals keep the model and the index from polling the database
+        model.state = state
+        model.last_refresh = time.monotonic()
+        if method == 'search_products':
+            texts, vocabulary, term_p = synthetic_texts(num_products, rng)
+            text_index._text_index = text_index.TextIndex(text_index.fit_text_index(range(1, num_products + 1), texts))
+            text_index._checked_at = time.monotonic()
+            queries = [
+                ' '.join(vocabulary[rng.choice(len(vocabulary), rng.integers(1, 4), p=term_p)])
+                for _ in range(calls)
+            ]
+            run = lambda i: model.search_products(queries[i])[:PAGE_SIZE]
+        elif method == 'recommendations':
+            users = rng.integers(1, num_users + 1, calls).tolist()
+            run = lambda i: model.get_recommendations_for_user(users[i])[:PAGE_SIZE]
+        else:
+            products = rng.integers(1, num_products + 1, calls).tolist()
+            run = lambda i: model.get_similar_products(products[i])[:PAGE_SIZE]
+
+    setup_rss = peak_rss_mb()
+    latencies = []
+    started = time.perf_counter()
+    for i in range(calls):
+        call_started = time.perf_counter()
+        run(i)
+        latencies.append(time.perf_counter() - call_started)
+    total = time.perf_counter() - started
+
+    latencies = np.array(latencies) * 1000
+    return {
+        'method': method,
+        'users': num_users,
+        'products': num_products,
+        'events': num_events,
+        'calls': calls,
+        'total_s': round(total, 3),
+        'mean_ms': round(float(latencies.mean()), 3),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 3),
+        'setup_rss_mb': round(setup_rss, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the recommendation engine (training, index builds, recommendations, similar products, search) '
+        'on synthetic in-memory datasets of growing size, without HTTP or the database. '
+        'Every measurement runs in a fresh process, so its peak RSS is its own.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--methods', nargs='+', choices=METHODS, default=METHODS,
+                            help='Methods to benchmark (default: all)')
+        parser.add_argument('--users', type=int, default=2000, help='Users at scale 1 (default: 2000)')
+        parser.add_argument('--products', type=int, default=10000, help='Products at scale 1 (default: 10000)')
+        parser.add_argument('--events', type=int, default=200000, help='Navigations at scale 1 (default: 200000)')
+        parser.add_argument('--scales', type=float, nargs='+', default=[0.1, 1, 10],
+                            help='Dataset sizes as multiples of scale 1 (default: 0.1 1 10)')
+        parser.add_argument('--queries', type=int, default=200,
+                            help='Calls per run of the recommendation, similar and search methods (default: 200)')
+        parser.add_argument('--dim', type=int, default=50, help='Embedding size (default: 50)')
+        parser.add_argument('--architecture', choices=['mlp', 'dot'], default=None,
+                            help='Model architecture, RECOMMENDATION_ARCHITECTURE by default')
+        parser.add_argument('--train-epochs', type=int, default=1,
+                            help='Epochs of the train runs, full training runs 10 (default: 1)')
+        parser.add_argument('--format', choices=['table', 'csv'], default='table', help='Output format (default: table)')
+        parser.add_argument('--output', default=None, help='Write the results to this file instead of stdout')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of the datasets (default: 0)')
+        # Internal: run one measurement in this process and print it as JSON
+        parser.add_argument('--child', choices=METHODS, default=None, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        from recommendation.neural_network import get_architecture
+
+        options['architecture'] = options['architecture'] or get_architecture()
+        if options['child']:
+            with override_settings(
+                RECOMMENDATION_ARCHITECTURE=options['architecture'],
+                RECOMMENDATION_REFRESH_INTERVAL=10 ** 9,
+                TEXT_INDEX_REFRESH_INTERVAL=10 ** 9,
+            ):
+                self.stdout.write(json.dumps(run_method(options['child'], options)))
+            return
+
+        manage_py = os.path.join(settings.BASE_DIR, 'manage.py')
+        # Child processes use the same settings module as this command
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'smartbuy.settings'))
+
+        rows = []
+        for scale in options['scales']:
+            sizes = {name: max(1, int(options[name] * scale)) for name in ('users', 'products', 'events')}
+            for method in options['methods']:
+                self.stderr.write(
+                    f'{method} at scale {scale:g}: {sizes["users"]} users, {sizes["products"]} products, '
+                    f'{sizes["events"]} events...'
+                )
+                command = [
+                    sys.executable, manage_py, 'benchmark_engine', '--child', method,
+                    '--users', str(sizes['users']), '--products', str(sizes['products']),
+                    '--events', str(sizes['events']), '--queries', str(options['queries']),
+                    '--dim', str(options['dim']), '--architecture', options['architecture'],
+                    '--train-epochs', str(options['train_epochs']), '--seed', str(options['seed']),
+                ]
+                result = subprocess.run(command, env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+                if result.returncode:
+                    raise CommandError(f'{method} at scale {scale:g} failed:\n{result.stderr[-2000:]}')
+                rows.append(dict(json.loads(result.stdout.strip().splitlines()[-1]), scale=f'{scale:g}'))
+
+        output = open(options['output'], 'w', newline='') if options['output'] else self.stdout
+        try:
+            if options['format'] == 'csv':
+                writer = csv.DictWriter(output, fieldnames=COLUMNS, lineterminator='\n')
+                writer.writeheader()
+                writer.writerows(rows)
+            else:
+                widths = {column: max(len(column), *(len(str(row[column])) for row in rows)) for column in COLUMNS}
+                output.write('  '.join(column.rjust(widths[column]) for column in COLUMNS) + '\n')
+                for row in rows:
+                    output.write('  '.join(str(row[column]).rjust(widths[column]) for column in COLUMNS) + '\n')
+        finally:
+            if options['output']:
+                output.close()
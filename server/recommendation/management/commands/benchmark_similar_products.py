@@ -0,0 +1,74 @@
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from recommendation.ann import IVFIndex, normalize
+
+
+def exact_similar(embeddings, product_idx):
+    """The exact path get_similar_products used before the ANN index"""
+    product_embedding = embeddings[product_idx]
+    similarities = np.dot(embeddings, product_embedding) / (
+        np.linalg.norm(embeddings, axis=1) * np.linalg.norm(product_embedding)
+    )
+    product_similarities = [(idx, sim) for idx, sim in enumerate(similarities)]
+    product_similarities.sort(key=lambda x: x[1], reverse=True)
+    return [idx for idx, _ in product_similarities[1:]]
+
+
+class Command(BaseCommand):
+    help = 'Compare the IVF similar-products index with exact search on synthetic embeddings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000],
+                            help='Catalog sizes to test (default: 100000 1000000)')
+        parser.add_argument('--dim', type=int, default=50, help='Embedding size (default: 50)')
+        parser.add_argument('--k', type=int, default=10, help='Neighbours per query (default: 10)')
+        parser.add_argument('--queries', type=int, default=200, help='ANN queries per run (default: 200)')
+        parser.add_argument('--exact-queries', type=int, default=5,
+                            help='Queries timed on the old exact path, which is slow (default: 5)')
+        parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 4, 8, 16, 32],
+                            help='nprobe values to test (default: 1 4 8 16 32)')
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        k = options['k']
+
+        for size in options['sizes']:
+            # Clustered vectors, like trained embeddings of related products
+            centers = rng.normal(size=(max(1, size // 200), options['dim']))
+            embeddings = (
+                centers[rng.integers(0, len(centers), size)]
+                + 0.5 * rng.normal(size=(size, options['dim']))
+            ).astype(np.float32)
+            queries = rng.choice(size, options['queries'], replace=False)
+
+            started = time.perf_counter()
+            index = IVFIndex.build(embeddings)
+            build_time = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for product_idx in queries[:options['exact_queries']]:
+                exact_similar(embeddings, product_idx)
+            exact_ms = (time.perf_counter() - started) / options['exact_queries'] * 1000
+
+            # Ground truth for recall
+            normalized = normalize(embeddings)
+            truth = {}
+            for product_idx in queries:
+                similarities = normalized @ normalized[product_idx]
+                similarities[product_idx] = -np.inf
+                truth[product_idx] = set(np.argpartition(-similarities, k)[:k].tolist())
+
+            self.stdout.write(
+                f'\n{size} products, {index.n_lists} lists, built in {build_time:.2f}s, '
+                f'exact path {exact_ms:.1f} ms/query'
+            )
+            self.stdout.write(f'{"nprobe":>8} {"ms/query":>10} {"recall@" + str(k):>10}')
+            for nprobe in options['nprobe']:
+                recall = 0
+                started = time.perf_counter()
+                for product_idx in queries:
+                    rows, _ = index.search(embeddings[product_idx], k=k, nprobe=nprobe, exclude=product_idx)
+                    recall += len(truth[product_idx].intersection(rows.tolist())) / k
+                latency = (time.perf_counter() - started) / len(queries) * 1000
+                self.stdout.write(f'{nprobe:>8} {latency:>10.3f} {recall / len(queries):>10.3f}')
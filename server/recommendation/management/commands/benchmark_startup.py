@@ -0,0 +1,75 @@
+import os
+import sys
+import json
+import time
+import subprocess
+from statistics import median
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter, like a web worker that just booted
+FIRST_REQUEST_SCRIPT = '''
+import sys, json, time
+started = time.perf_counter()
+import django
+django.setup()
+from django.test import Client
+from django.urls import get_resolver
+get_resolver().url_patterns  # Imports the URLconf and with it every view module
+client = Client()
+setup = time.perf_counter()
+first = client.get(sys.argv[1])
+first_done = time.perf_counter()
+client.get(sys.argv[1])
+second_done = time.perf_counter()
+print(json.dumps({
+    'setup': setup - started,
+    'first': first_done - setup,
+    'second': second_done - first_done,
+    'status': first.status_code,
+    'tensorflow': 'tensorflow' in sys.modules,
+    'sklearn': 'sklearn' in sys.modules,
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Measure cold start: `manage.py check` wall time and first-request latency of a fresh process'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3, help='Runs per measurement (default: 3)')
+        parser.add_argument('--path', default='/recommendation/',
+                            help='URL requested by the fresh process (default: /recommendation/)')
+
+    def handle(self, *args, **options):
+        manage_py = os.path.join(settings.BASE_DIR, 'manage.py')
+        # Child processes use the same settings module as this command
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'smartbuy.settings'))
+
+        check_times = []
+        for _ in range(options['runs']):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, manage_py, 'check'], env=env, check=True, capture_output=True)
+            check_times.append(time.perf_counter() - started)
+        self.stdout.write(f'manage.py check: {median(check_times):.2f}s median of {options["runs"]} runs')
+
+        results = []
+        for _ in range(options['runs']):
+            started = time.perf_counter()
+            output = subprocess.run(
+                [sys.executable, '-c', FIRST_REQUEST_SCRIPT, options['path']],
+                env=env, cwd=settings.BASE_DIR, check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            result['total'] = time.perf_counter() - started
+            results.append(result)
+
+        last = results[-1]
+        self.stdout.write(self.style.SUCCESS(
+            f'GET {options["path"]} (status {last["status"]}), median of {options["runs"]} fresh processes:\n'
+            f'  process start to ready: {median(r["setup"] for r in results):.2f}s\n'
+            f'  first request: {median(r["first"] for r in results) * 1000:.1f}ms\n'
+            f'  second request: {median(r["second"] for r in results) * 1000:.1f}ms\n'
+            f'  interpreter start to first response: {median(r["total"] for r in results):.2f}s\n'
+            f'  tensorflow imported: {last["tensorflow"]}, sklearn imported: {last["sklearn"]}'
+        ))
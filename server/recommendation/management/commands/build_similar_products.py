@@ -0,0 +1,45 @@
+import os
+import time
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from recommendation.similarity import build_similar_products_table
+from recommendation.snapshots import PRODUCT_EMBEDDINGS_FILE, PRODUCT_IDS_FILE, get_latest_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the precomputed similar-products table of the published model'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--k',
+            type=int,
+            default=getattr(settings, 'RECOMMENDATION_SIMILAR_PRODUCTS', 100),
+            help='Neighbours stored per product (default: RECOMMENDATION_SIMILAR_PRODUCTS)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Threads used for the matrix multiplies (default: one per core, at most 8)'
+        )
+
+    def handle(self, *args, **options):
+        snapshot = get_latest_snapshot()
+        if snapshot is None:
+            self.stdout.write(self.style.ERROR('No published model found. Run train_recommender first.'))
+            return
+
+        started = time.monotonic()
+        build_similar_products_table(
+            snapshot.path,
+            np.load(os.path.join(snapshot.path, PRODUCT_EMBEDDINGS_FILE), mmap_mode='r'),
+            np.load(os.path.join(snapshot.path, PRODUCT_IDS_FILE), mmap_mode='r'),
+            snapshot.version,
+            k=options['k'],
+            workers=options['workers'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Built similar products for model {snapshot.version} '
+            f'({snapshot.num_products} products) in {time.monotonic() - started:.1f}s'
+        ))
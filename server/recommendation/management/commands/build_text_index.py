@@ -0,0 +1,52 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from recommendation.text_index import build_text_index, count_changed_products, get_latest_text_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product search index from the whole catalog and publish it for the web workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rebuild even if few products changed since the last build'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and check whether to rebuild every --interval seconds'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=3600,
+            help='Seconds between checks in --loop mode (default: 3600)'
+        )
+
+    def handle(self, *args, **options):
+        min_changes = getattr(settings, 'TEXT_INDEX_REBUILD_MIN_CHANGES', 1000)
+
+        while True:
+            # Changed products are searchable through the workers' deltas,
+            # a rebuild refits the vocabulary and idf and empties the deltas
+            snapshot = get_latest_text_index()
+            if options['force'] or snapshot is None or count_changed_products(snapshot) >= min_changes:
+                started = time.monotonic()
+                snapshot = build_text_index()
+                if snapshot:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'Published text index {snapshot.version} with {snapshot.num_products} products '
+                        f'and {snapshot.num_terms} terms in {time.monotonic() - started:.1f}s'
+                    ))
+                else:
+                    self.stdout.write('Not enough products to build a text index')
+            else:
+                self.stdout.write('Published text index is up to date, nothing to build')
+
+            if not options['loop']:
+                return
+            # --force only applies to the first run of the loop
+            options['force'] = False
+            time.sleep(options['interval'])
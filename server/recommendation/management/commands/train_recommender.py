@@ -0,0 +1,58 @@
+import time
+from django.core.management.base import BaseCommand
+from recommendation.training import RecommendationTrainer
+
+
+class Command(BaseCommand):
+    help = 'Train the recommendation model and publish it for the web workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Retrain even if the published model is still fresh'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild the model from the whole navigation history instead of fine-tuning'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and check whether to retrain every --interval seconds'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=600,
+            help='Seconds between checks in --loop mode (default: 600)'
+        )
+
+    def handle(self, *args, **options):
+        recommendation_model = RecommendationTrainer()
+
+        while True:
+            started = time.monotonic()
+            try:
+                trained = recommendation_model.train(force=options['force'], full=options['full'])
+            except Exception as e:
+                if not options['loop']:
+                    raise
+                self.stdout.write(self.style.ERROR(f'Training failed: {e}'))
+                trained = False
+
+            if trained:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Published model {recommendation_model.version} '
+                    f'in {time.monotonic() - started:.1f}s'
+                ))
+            else:
+                self.stdout.write('Published model is up to date, nothing to train')
+
+            if not options['loop']:
+                return
+            # --force and --full only apply to the first run of the loop
+            options['force'] = False
+            options['full'] = False
+            time.sleep(options['interval'])
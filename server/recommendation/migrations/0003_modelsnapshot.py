@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendation', '0002_remove_productembedding_product_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModelSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=50, unique=True)),
+                ('path', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('embedding_size', models.IntegerField(default=50)),
+                ('num_users', models.IntegerField(default=0)),
+                ('num_products', models.IntegerField(default=0)),
+                ('num_events', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'get_latest_by': 'created_at',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendation', '0003_modelsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modelsnapshot',
+            name='last_navigation_id',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
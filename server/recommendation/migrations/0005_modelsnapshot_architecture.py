@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendation', '0004_modelsnapshot_last_navigation_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modelsnapshot',
+            name='architecture',
+            field=models.CharField(choices=[('mlp', 'Concatenated embeddings with dense layers'), ('dot', 'Biased dot product of embeddings')], default='mlp', max_length=10),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendation', '0005_modelsnapshot_architecture'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TextIndexSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=50, unique=True)),
+                ('path', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('num_products', models.IntegerField(default=0)),
+                ('num_terms', models.IntegerField(default=0)),
+                ('products_updated_before', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'get_latest_by': 'created_at',
+            },
+        ),
+    ]
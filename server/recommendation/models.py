@@ -0,0 +1,53 @@
+from django.db import models
+
+ARCHITECTURE_CHOICES = [
+    ('mlp', 'Concatenated embeddings with dense layers'),
+    ('dot', 'Biased dot product of embeddings'),
+]
+
+
+class ModelSnapshot(models.Model):
+    """
+    Manifest entry for a trained recommendation model.
+    The artifacts themselves (weights, ID maps, embeddings, indexes)
+    live on disk in the directory pointed to by `path`.
+    """
+    version = models.CharField(max_length=50, unique=True)
+    path = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+    architecture = models.CharField(max_length=10, choices=ARCHITECTURE_CHOICES, default='mlp')
+    embedding_size = models.IntegerField(default=50)
+    num_users = models.IntegerField(default=0)
+    num_products = models.IntegerField(default=0)
+    num_events = models.IntegerField(default=0)
+    # Highest ProductNavigation id seen by this model, incremental training resumes after it
+    last_navigation_id = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-created_at']
+        get_latest_by = 'created_at'
+
+    def __str__(self):
+        return f'Recommendation model {self.version}'
+
+
+class TextIndexSnapshot(models.Model):
+    """
+    Manifest entry for a product text index. Text indexes are built by
+    `manage.py build_text_index`, independently of the model, and live on
+    disk in the directory pointed to by `path`.
+    """
+    version = models.CharField(max_length=50, unique=True)
+    path = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+    num_products = models.IntegerField(default=0)
+    num_terms = models.IntegerField(default=0)
+    # Products updated after this may be missing, web workers index them on top
+    products_updated_before = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+        get_latest_by = 'created_at'
+
+    def __str__(self):
+        return f'Text index {self.version}'
@@ -1,257 +1,286 @@
-from django.db.models import Count
-from store.models import Product, ProductNavigation
-import numpy as np
-from tensorflow.keras.models import Model
-from tensorflow.keras.layers import Input, Embedding, Flatten, Dense, Concatenate
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from datetime import timedelta
-from django.utils import timezone
-
-class RecommendationModel:
-    """
-    A class for managing the recommendation model using collaborative filtering
-    with embeddings and neural networks
-    """
-    def __init__(self):
-        self.model = None
-        self.user_mapping = {}  # Maps user IDs to indices
-        self.product_mapping = {}  # Maps product IDs to indices
-        self.reverse_product_mapping = {}  # Maps indices to product IDs
-        self.product_embeddings = None
-        self.text_embeddings = None
-        self.last_trained = None
-        
-    def _create_model(self, num_users, num_products, embedding_size=50):
-        """
-        Create a neural network model for collaborative filtering
-        """
-        # User embedding
-        user_input = Input(shape=(1,), name='user_input')
-        user_embedding = Embedding(num_users, embedding_size, name='user_embedding')(user_input)
-        user_vec = Flatten(name='flatten_users')(user_embedding)
-        
-        # Product embedding
-        product_input = Input(shape=(1,), name='product_input')
-        product_embedding = Embedding(num_products, embedding_size, name='product_embedding')(product_input)
-        product_vec = Flatten(name='flatten_products')(product_embedding)
-        
-        # Concatenate embeddings
-        concat = Concatenate()([user_vec, product_vec])
-        
-        # Hidden layers
-        dense1 = Dense(128, activation='relu')(concat)
-        dense2 = Dense(64, activation='relu')(dense1)
-        
-        # Output layer
-        output = Dense(1, activation='sigmoid')(dense2)
-        
-        # Create and compile model
-        model = Model(inputs=[user_input, product_input], outputs=output)
-        model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
-        
-        return model
-    
-    def train(self, force=False):
-        """
-        Train the recommendation model if it hasn't been trained recently
-        """
-        # Check if we need to retrain
-        if not force and self.last_trained and timezone.now() - self.last_trained < timedelta(hours=24):
-            return
-            
-        # Get all product navigation data
-        navigations = ProductNavigation.objects.select_related('user', 'destination_product').all()
-        
-        if not navigations.exists():
-            return
-            
-        # Prepare data
-        data = []
-        users = set()
-        products = set()
-        
-        for nav in navigations:
-            # Skip if user is anonymous
-            if not nav.user:
-                continue
-                
-            user_id = nav.user.id
-            product_id = nav.destination_product.id
-            
-            users.add(user_id)
-            products.add(product_id)
-            
-            # Each navigation is a positive interaction
-            data.append((user_id, product_id, 1))
-        
-        # Create mapping dictionaries
-        self.user_mapping = {user_id: idx for idx, user_id in enumerate(users)}
-        self.product_mapping = {product_id: idx for idx, product_id in enumerate(products)}
-        self.reverse_product_mapping = {idx: product_id for product_id, idx in self.product_mapping.items()}
-        
-        # Convert to numpy arrays
-        user_indices = np.array([self.user_mapping[d[0]] for d in data])
-        product_indices = np.array([self.product_mapping[d[1]] for d in data])
-        labels = np.array([d[2] for d in data])
-        
-        # Create and train model
-        self.model = self._create_model(len(users), len(products))
-        self.model.fit(
-            [user_indices, product_indices],
-            labels,
-            epochs=10,
-            batch_size=64,
-            verbose=0
-        )
-        
-        # Extract product embeddings for similarity calculations
-        product_embedding_layer = self.model.get_layer('product_embedding')
-        self.product_embeddings = product_embedding_layer.get_weights()[0]
-        
-        
-        # Generate text embeddings for search
-        self._generate_text_embeddings()
-        
-        self.last_trained = timezone.now()
-    
-    def _generate_text_embeddings(self):
-        """Generate text embeddings for products using TF-IDF"""
-        products = Product.objects.all()
-        
-        # Combine name and description for better semantic search
-        texts = [f"{p.name} {p.description or ''}" for p in products]
-        
-        # Create TF-IDF vectors
-        vectorizer = TfidfVectorizer(min_df=2, max_df=0.95, stop_words='english')
-        tfidf_matrix = vectorizer.fit_transform(texts)
-        
-        self.text_vectorizer = vectorizer
-        self.text_embeddings = tfidf_matrix
-        self.product_ids_for_search = [p.id for p in products]
-    
-    def get_recommendations_for_user(self, user_id, filter_func=None):
-        """
-        Get personalized recommendations for a user
-        
-        Args:
-            user_id: The ID of the user
-            filter_func: Function to filter candidate products
-        
-        Returns:
-            List of recommended product IDs
-        """
-        self.train()
-        
-        if not self.model or user_id not in self.user_mapping:
-            return self.get_popular_products(filter_func)
-        
-        user_idx = self.user_mapping[user_id]
-        user_input = np.array([user_idx] * len(self.product_mapping))
-        product_input = np.array(list(range(len(self.product_mapping))))
-        
-        predictions = self.model.predict([user_input, product_input], verbose=0).flatten()
-        
-        # Map predictions back to product IDs
-        product_scores = [(self.reverse_product_mapping[idx], score) 
-                          for idx, score in enumerate(predictions)]
-        
-        if filter_func:
-            product_ids = [pid for pid, _ in product_scores]
-            products = Product.objects.prefetch_related('categories').filter(id__in=product_ids)
-            product_map = {product.id: product for product in products}
-
-            product_scores = [
-                (pid, score) for pid, score in product_scores
-                if pid in product_map and filter_func(product_map[pid])
-            ]
-
-        # Sort by score (highest first)
-        product_scores.sort(key=lambda x: x[1], reverse=True)
-        
-        return [pid for pid, _ in product_scores]
-    
-    def get_popular_products(self, filter_func=None):
-        """
-        Get most popular products based on navigation data
-        
-        Args:
-            filter_func: Function to filter candidate products
-        
-        Returns:
-            List of popular product IDs
-        """
-
-        products = Product.objects.annotate(
-            navigation_count=Count('destination_navigations')
-        ).order_by('-navigation_count')
-
-        if filter_func:
-            products = [p.id for p in products if filter_func(p)]
-
-        return products
-    
-    def get_similar_products(self, product_id):
-        """
-        Get similar products based on embedding similarity
-        
-        Args:
-            product_id: The ID of the product to find similar items for
-            filter_func: Function to filter candidate products
-        
-        Returns:
-            List of similar product IDs
-        """
-        self.train()  # Ensure model is trained
-        
-        if self.product_embeddings is None or product_id not in self.product_mapping:
-            return self.get_popular_products()
-        
-        # Get product embedding
-        product_idx = self.product_mapping[product_id]
-        product_embedding = self.product_embeddings[product_idx]
-        
-        # Calculate similarity with all products
-        similarities = np.dot(self.product_embeddings, product_embedding) / (
-            np.linalg.norm(self.product_embeddings, axis=1) * np.linalg.norm(product_embedding)
-        )
-        
-        # Map similarities to product IDs
-        product_similarities = [(self.reverse_product_mapping[idx], sim) 
-                                for idx, sim in enumerate(similarities)]
-        
-        # Sort by similarity (highest first)
-        product_similarities.sort(key=lambda x: x[1], reverse=True)
-        
-        # Skip the first product (which is the input product itself)
-        return [pid for pid, _ in product_similarities[1:]]
-    
-    def search_products(self, query):
-        """
-        Search for products using text embeddings
-        
-        Args:
-            query: The search query
-        
-        Returns:
-            List of product IDs matching the query
-        """
-        self.train()  # Ensure model is trained
-        
-        if self.text_embeddings is None or not query:
-            return []
-        
-        # Transform query to TF-IDF vector
-        query_vec = self.text_vectorizer.transform([query])
-        
-        # Calculate cosine similarity
-        similarities = cosine_similarity(query_vec, self.text_embeddings).flatten()
-        
-        # Get sorted indices
-        sorted_indices = similarities.argsort()[::-1]
-        
-        # Map to product IDs
-        results = [self.product_ids_for_search[idx] for idx in sorted_indices 
-                  if similarities[idx] > 0.1]  # Apply similarity threshold
-        
-        return results
+import time
+import threading
+from types import MappingProxyType
+from django.conf import settings
+from store.catalog import get_catalog
+import numpy as np
+from recommendation.inference import mlp_scores
+from recommendation.ranking import RankedSlice
+from recommendation.data import IdMap
+from recommendation.similarity import load_similar_products_table
+from recommendation.snapshots import get_latest_snapshot, load_snapshot
+from recommendation.text_index import get_text_index
+
+def get_architecture():
+    return getattr(settings, 'RECOMMENDATION_ARCHITECTURE', 'mlp')
+
+
+class ModelState:
+    """
+    Everything needed to serve one model version. A state is never modified
+    once published: a new model replaces the whole object, so a request that
+    holds a reference always sees mappings and embeddings of the same version.
+    """
+    fields = {
+        'model': None,  # Keras model, only loaded by the trainer
+        'user_mapping': IdMap(np.empty(0, dtype=np.int64)),  # Maps user IDs to indices
+        'product_mapping': IdMap(np.empty(0, dtype=np.int64)),  # Maps product IDs to indices
+        'product_ids': np.empty(0, dtype=np.int64),  # Maps indices to product IDs
+        'product_embeddings': None,
+        'similarity_index': None,  # IVFIndex over product_embeddings
+        'similar_products_table': None,  # Precomputed top-K product IDs per product index
+        'similar_products_meta': None,
+        # Ranking is done with NumPy on the exported weights
+        'user_embeddings': None,
+        'product_bias': None,  # 'dot' architecture
+        'dense_layers': None,  # 'mlp' architecture, (kernel, bias) per Dense layer
+        'architecture': None,
+        'last_trained': None,
+        'last_navigation_id': 0,  # High-water mark of navigations used for training
+        'version': None,
+        'snapshot_path': None,
+    }
+
+    def __init__(self, **values):
+        unknown = set(values) - set(self.fields)
+        if unknown:
+            raise TypeError(f"Unknown model state fields: {', '.join(sorted(unknown))}")
+        for name, default in self.fields.items():
+            value = values.get(name, default)
+            if isinstance(value, dict):
+                # Read-only view, so a shared state can't be changed by accident
+                value = MappingProxyType(dict(value))
+            elif isinstance(value, np.ndarray) and value.flags.writeable:
+                value = value.view()
+                value.flags.writeable = False
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('ModelState is immutable, publish a new one with replace()')
+
+    def replace(self, **changes):
+        """Return a copy of this state with some fields changed"""
+        values = {name: getattr(self, name) for name in self.fields}
+        values.update(changes)
+        return ModelState(**values)
+
+    @property
+    def similar_products_stale(self):
+        """True if there is no precomputed similar-products table for this model"""
+        return (
+            self.similar_products_table is None
+            or self.similar_products_meta.get('version') != self.version
+        )
+
+
+class RecommendationModel:
+    """
+    Serves the published recommendation model: collaborative filtering with
+    embeddings and neural networks, scored with NumPy only. Training lives in
+    recommendation.training.RecommendationTrainer, so web workers never
+    import TensorFlow or scikit-learn.
+
+    The served model is a single ModelState reference. Readers take one local
+    reference per call, writers publish a new state with one assignment.
+    """
+    def __init__(self):
+        self.state = ModelState()
+        self.last_refresh = None
+        self._train_lock = threading.Lock()  # Only one training run at a time
+        self._load_lock = threading.Lock()  # Serializes loading and publishing states
+
+    @property
+    def version(self):
+        return self.state.version
+
+    @property
+    def similar_products_stale(self):
+        return self.state.similar_products_stale
+        
+    def _publish(self, state):
+        """Swap in a new state, unless a newer model was published meanwhile"""
+        with self._load_lock:
+            if self.state.version is None or (state.version and state.version >= self.state.version):
+                self.state = state
+
+    def refresh(self):
+        """
+        Pick up a newer published snapshot. The manifest is checked at most
+        once per RECOMMENDATION_REFRESH_INTERVAL seconds. A request never
+        waits for another thread that is already loading a snapshot.
+        """
+        interval = getattr(settings, 'RECOMMENDATION_REFRESH_INTERVAL', 60)
+        now = time.monotonic()
+        if self.last_refresh is not None and now - self.last_refresh < interval:
+            return
+        self.last_refresh = now
+        if not self.load_latest(blocking=False):
+            state = self.state
+            if state.snapshot_path:
+                # The similar-products table may have been rebuilt for the same model
+                table, meta = load_similar_products_table(state.snapshot_path)
+                if meta != state.similar_products_meta:
+                    self._publish(state.replace(similar_products_table=table, similar_products_meta=meta))
+
+    def load_latest(self, blocking=True):
+        """
+        Load the newest saved snapshot, if any
+
+        Args:
+            blocking: Wait for a load already running in another thread
+
+        Returns:
+            True if a snapshot was loaded
+        """
+        if not self._load_lock.acquire(blocking=blocking):
+            return False
+        try:
+            snapshot = get_latest_snapshot()
+            # Versions are timestamps, a model published by this process may be newer than the manifest
+            if snapshot is None or (self.state.version is not None and snapshot.version <= self.state.version):
+                return False
+
+            # Everything is loaded before the single assignment that publishes it
+            self.state = self._build_state(snapshot, load_snapshot(snapshot))
+            return True
+        finally:
+            self._load_lock.release()
+
+    def _build_state(self, snapshot, artifacts):
+        """Create the ModelState of a loaded snapshot"""
+        return ModelState(
+            user_mapping=artifacts['user_mapping'],
+            product_mapping=artifacts['product_mapping'],
+            product_ids=artifacts['product_ids'],
+            product_embeddings=artifacts['product_embeddings'],
+            similarity_index=artifacts['similarity_index'],
+            similar_products_table=artifacts['similar_products_table'],
+            similar_products_meta=artifacts['similar_products_meta'],
+            user_embeddings=artifacts['user_embeddings'],
+            product_bias=artifacts['product_bias'],
+            dense_layers=artifacts['dense_layers'],
+            architecture=snapshot.architecture,
+            last_navigation_id=snapshot.last_navigation_id,
+            version=snapshot.version,
+            snapshot_path=snapshot.path,
+            last_trained=snapshot.created_at,
+        )
+    
+    def get_recommendations_for_user(self, user_id, filter_func=None, state=None):
+        """
+        Get personalized recommendations for a user
+        
+        Args:
+            user_id: The ID of the user
+            filter_func: Function mapping an array of product IDs to a boolean mask
+            state: ModelState to score with, the last published one by default
+        
+        Returns:
+            RankedSlice of recommended product IDs
+        """
+        if state is None:
+            self.refresh()
+            state = self.state
+        
+        if state.user_embeddings is None or user_id not in state.user_mapping:
+            return self.get_popular_products(filter_func)
+        
+        user_vector = state.user_embeddings[state.user_mapping[user_id]]
+        if state.architecture == 'dot':
+            # Score every product at once, the user bias doesn't change the ranking
+            predictions = state.product_embeddings @ user_vector + state.product_bias
+        elif state.dense_layers is not None:
+            predictions = mlp_scores(user_vector, state.product_embeddings, state.dense_layers)
+        else:
+            return self.get_popular_products(filter_func)
+        
+        # Sorted lazily, highest score first, only as far as the pages requested
+        ranked = RankedSlice(state.product_ids, predictions)
+        
+        if filter_func:
+            ranked = ranked.filter(filter_func(state.product_ids))
+        
+        return ranked
+    
+    def get_popular_products(self, filter_func=None):
+        """
+        Get most popular products based on navigation data
+        
+        Args:
+            filter_func: Function mapping an array of product IDs to a boolean mask
+        
+        Returns:
+            RankedSlice of popular product IDs
+        """
+
+        # Read the maintained counters through the catalog snapshot
+        product_ids = get_catalog().ordered_ids('popularity')
+
+        if filter_func:
+            product_ids = product_ids[filter_func(product_ids)]
+
+        return RankedSlice.from_sorted(product_ids)
+    
+    def get_similar_products(self, product_id, k=None):
+        """
+        Get similar products based on embedding similarity
+        
+        Args:
+            product_id: The ID of the product to find similar items for
+            k: Number of neighbours, RECOMMENDATION_SIMILAR_PRODUCTS by default
+        
+        Returns:
+            RankedSlice of similar product IDs
+        """
+        self.refresh()  # Use the last published model
+        state = self.state
+        
+        if state.product_embeddings is None or product_id not in state.product_mapping:
+            return self.get_popular_products()
+        
+        # Get product embedding
+        product_idx = state.product_mapping[product_id]
+        product_embedding = state.product_embeddings[product_idx]
+        
+        k = k or getattr(settings, 'RECOMMENDATION_SIMILAR_PRODUCTS', 100)
+        
+        # Precomputed neighbours of the current model version
+        if not state.similar_products_stale and k <= state.similar_products_meta['k']:
+            neighbours = state.similar_products_table[product_idx][:k]
+            return RankedSlice.from_sorted(neighbours[neighbours >= 0])
+        
+        # Approximate nearest neighbours, skipping the input product itself
+        indices, _ = state.similarity_index.search(
+            product_embedding,
+            k=k,
+            nprobe=getattr(settings, 'RECOMMENDATION_ANN_NPROBE', 8),
+            exclude=product_idx,
+        )
+        
+        return RankedSlice.from_sorted(state.product_ids[indices])
+    
+    def search_products(self, query, filter_func=None):
+        """
+        Search for products using text embeddings.
+        The text index has its own lifecycle (see recommendation.text_index),
+        at most RECOMMENDATION_SEARCH_MAX_RESULTS products are returned.
+        
+        Args:
+            query: The search query
+            filter_func: Function mapping an array of product IDs to a boolean mask,
+                applied while searching so it doesn't cut into the top results
+        
+        Returns:
+            RankedSlice of product IDs matching the query
+        """
+        if not query:
+            return RankedSlice.empty()
+        
+        product_ids, _ = get_text_index().search(
+            query,
+            k=getattr(settings, 'RECOMMENDATION_SEARCH_MAX_RESULTS', 1000),
+            min_score=0.1,
+            accept=filter_func,
+        )
+        
+        return RankedSlice.from_sorted(product_ids)
@@ -0,0 +1,49 @@
+from recommendation.ranking import RankedSlice
+from store.catalog import SORTS, get_catalog
+from store.models import Product
+from store.serializers import ProductCardReadSerializer
+
+
+def filter_candidates(candidates, filter_func=None):
+    """
+    Keep the ranked candidates that pass filter_func, or only those that
+    still exist without one. The whole candidate list is checked in one
+    vectorized call over the catalog snapshot and the rank order is kept.
+
+    Args:
+        candidates: RankedSlice or list of product IDs, best first
+        filter_func: Function mapping an array of product IDs to a boolean mask
+
+    Returns:
+        RankedSlice
+    """
+    if not isinstance(candidates, RankedSlice):
+        candidates = RankedSlice.from_sorted(list(candidates))
+    product_ids = candidates.candidate_ids()
+    mask = filter_func(product_ids) if filter_func else get_catalog().filter_mask(product_ids)
+    return candidates.filter(mask)
+
+
+def sort_candidates(candidates, sort_param=None):
+    """
+    Order candidates by one of the catalog SORTS.
+    Without a known sort the candidates keep their rank order.
+    """
+    if sort_param not in SORTS:
+        return candidates
+    if isinstance(candidates, RankedSlice):
+        # The order is given by the sort, no need to rank the candidates
+        candidates = candidates.candidate_ids()
+    return RankedSlice.from_sorted(get_catalog().sort(candidates, sort_param))
+
+
+def hydrate_products(product_ids):
+    """
+    Load the products of one page for ProductCardReadSerializer, in one
+    query whatever the page size
+
+    Returns:
+        List of Product in the order of product_ids, missing products are skipped
+    """
+    products = ProductCardReadSerializer.setup_queryset(Product.objects.all()).in_bulk(product_ids)
+    return [products[pid] for pid in product_ids if pid in products]
@@ -0,0 +1,94 @@
+import numpy as np
+
+
+def top_k_indices(scores, k):
+    """
+    Indices of the k highest scores, best first, equal scores by index.
+    Uses np.argpartition so only the selected k are sorted. The result is
+    always the first k of the full ranking, so a longer top-k extends a
+    shorter one even when scores tie.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        top = np.argpartition(-scores, k - 1)[:k]
+        # Which of the scores equal to the k-th made it is arbitrary, take the lowest indices
+        threshold = scores[top].min()
+        above = np.flatnonzero(scores > threshold)
+        top = np.concatenate([above, np.flatnonzero(scores == threshold)[:k - len(above)]])
+    else:
+        top = np.arange(len(scores))
+    return top[np.lexsort((top, -scores[top]))]
+
+
+class RankedSlice:
+    """
+    Product IDs ordered by descending score, sorted lazily.
+    Only a prefix of the ranking is ever sorted: it starts with `buffer_size`
+    items and doubles when a position past it is requested, so serving the
+    first pages of a large catalog never sorts the whole score vector.
+
+    Supports len(), indexing, slicing and iteration, which is all
+    PageNumberPagination needs.
+    """
+    def __init__(self, ids, scores, buffer_size=100):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.scores = np.asarray(scores)
+        self.buffer_size = buffer_size
+        self.order = np.empty(0, dtype=np.int64)  # Sorted prefix of the ranking
+
+    @classmethod
+    def from_sorted(cls, ids):
+        """Wrap IDs that are already ordered best first"""
+        ids = np.asarray(ids, dtype=np.int64)
+        ranked = cls(ids, -np.arange(len(ids), dtype=np.float64))
+        ranked.order = np.arange(len(ids))
+        return ranked
+
+    @classmethod
+    def empty(cls):
+        return cls.from_sorted([])
+
+    def filter(self, mask):
+        """Keep only the candidates where mask is True"""
+        return RankedSlice(self.ids[mask], self.scores[mask], self.buffer_size)
+
+    def candidate_ids(self):
+        """All candidate IDs in no particular order, without sorting anything"""
+        return self.ids
+
+    def _extend(self, size):
+        size = min(size, len(self.ids))
+        if size <= len(self.order):
+            return
+        size = min(max(size, 2 * len(self.order), self.buffer_size), len(self.ids))
+        self.order = top_k_indices(self.scores, size)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, step = item.indices(len(self))
+            if stop <= start:
+                return []
+            self._extend(stop)
+            return self.ids[self.order[start:stop:step]].tolist()
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError('RankedSlice index out of range')
+        self._extend(item + 1)
+        return int(self.ids[self.order[item]])
+
+    def __iter__(self):
+        position = 0
+        while position < len(self):
+            self._extend(position + 1)
+            for idx in self.order[position:].tolist():
+                yield int(self.ids[idx])
+            position = len(self.order)
+
+    def tolist(self):
+        return list(self)
@@ -0,0 +1,123 @@
+import os
+import heapq
+import numpy as np
+
+OFFSETS_FILE = 'search_offsets.npy'
+DOCS_FILE = 'search_docs.npy'
+WEIGHTS_FILE = 'search_weights.npy'
+
+
+class InvertedIndex:
+    """
+    Term -> postings index over an L2 normalized TF-IDF matrix.
+    The postings of a term are the rows containing it, sorted by descending
+    weight, so a search only touches documents that share a term with the
+    query and can stop early (threshold algorithm): after reading the first
+    `depth` postings of every query term, no unseen document can score more
+    than the sum of query weight times the weight at `depth` of each term.
+
+    Args:
+        offsets: Postings of term t are docs[offsets[t]:offsets[t + 1]]
+        docs: Row of every posting
+        weights: TF-IDF weight of every posting
+        matrix: The CSR matrix itself, used to score candidates exactly
+    """
+    def __init__(self, offsets, docs, weights, matrix):
+        self.offsets = offsets
+        self.docs = docs
+        self.weights = weights
+        self.matrix = matrix
+
+    @classmethod
+    def build(cls, matrix):
+        csc = matrix.tocsc()
+        terms = np.repeat(np.arange(csc.shape[1]), np.diff(csc.indptr))
+        order = np.lexsort((-csc.data, terms))
+        return cls(
+            csc.indptr.astype(np.int64),
+            csc.indices[order].astype(np.int64),
+            csc.data[order],
+            matrix,
+        )
+
+    def save(self, directory):
+        np.save(os.path.join(directory, OFFSETS_FILE), self.offsets)
+        np.save(os.path.join(directory, DOCS_FILE), self.docs)
+        np.save(os.path.join(directory, WEIGHTS_FILE), self.weights)
+
+    @classmethod
+    def load(cls, directory, matrix):
+        """Memory-map a saved index, None if the directory doesn't contain one"""
+        if not os.path.exists(os.path.join(directory, OFFSETS_FILE)):
+            return None
+        return cls(
+            np.load(os.path.join(directory, OFFSETS_FILE), mmap_mode='r'),
+            np.load(os.path.join(directory, DOCS_FILE), mmap_mode='r'),
+            np.load(os.path.join(directory, WEIGHTS_FILE), mmap_mode='r'),
+            matrix,
+        )
+
+    def search(self, columns, weights, k, min_score=0.0, accept=None, block_size=256):
+        """
+        Top-k rows by cosine similarity with an encoded query
+
+        Args:
+            columns: Term columns of the query
+            weights: L2 normalized query weights
+            k: Maximum number of results
+            min_score: Only rows scoring more than this are returned
+            accept: Optional function mapping an array of rows to a boolean
+                mask, rows it rejects are never returned
+            block_size: Postings read per term before the first bound check,
+                doubled after every check
+
+        Returns:
+            Tuple of (rows, scores), best first
+        """
+        if not len(columns) or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        query = np.zeros(self.matrix.shape[1])
+        query[columns] = weights
+        starts = np.asarray(self.offsets[columns], dtype=np.int64)
+        lengths = np.asarray(self.offsets[columns + 1], dtype=np.int64) - starts
+
+        heap = []  # (score, row) of the best k so far, worst on top
+        seen = np.zeros(self.matrix.shape[0], dtype=bool)
+        depth = 0
+        while True:
+            end = depth + block_size
+            candidates = np.unique(np.concatenate([
+                self.docs[start + depth:start + min(end, length)]
+                for start, length in zip(starts.tolist(), lengths.tolist())
+            ]))
+            candidates = candidates[~seen[candidates]]
+            seen[candidates] = True
+            if accept is not None and len(candidates):
+                candidates = candidates[accept(candidates)]
+
+            if len(candidates):
+                scores = self.matrix[candidates] @ query
+                floor = max(min_score, heap[0][0]) if len(heap) == k else min_score
+                keep = scores > floor
+                for score, row in zip(scores[keep].tolist(), candidates[keep].tolist()):
+                    if len(heap) < k:
+                        heapq.heappush(heap, (score, row))
+                    elif score > heap[0][0]:
+                        heapq.heapreplace(heap, (score, row))
+
+            # Highest score any unseen row can still reach
+            remaining = lengths > end
+            bound = float(np.dot(
+                weights[remaining], self.weights[starts[remaining] + end]
+            )) if remaining.any() else 0.0
+            if bound <= min_score or (len(heap) == k and heap[0][0] >= bound):
+                break
+            depth = end
+            block_size *= 2
+
+        heap.sort(reverse=True)
+        return (
+            np.array([row for _, row in heap], dtype=np.int64),
+            np.array([score for score, _ in heap]),
+        )
@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from store.models import Product
+from recommendation.text_index import invalidate_text_index
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def index_product_text(sender, **kwargs):
+    # The product is read back from the database, once it's committed,
+    # deleted ones are missing from the catalog
+    transaction.on_commit(invalidate_text_index)
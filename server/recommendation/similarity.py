@@ -0,0 +1,114 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from recommendation.ann import normalize
+
+# Tables built before the file name was versioned, META_FILE names the table of newer builds
+TABLE_FILE = 'similar_products.npy'
+TABLE_FILE_PATTERN = 'similar_products-{}.npy'
+META_FILE = 'similar_products.json'
+# Default number of threads, more cores rarely speed up the memory-bound multiplies
+MAX_WORKERS = 8
+# Upper bound of the rows per matrix multiply, larger blocks are no faster
+MAX_BLOCK_SIZE = 1024
+# Bytes per similarity computed at once: the float32 score and the int64 position argpartition returns
+BYTES_PER_SIMILARITY = 4 + 8
+
+
+def build_similar_products_table(directory, embeddings, product_ids, version, k=100, block_size=None, workers=None):
+    """
+    Compute the exact top-k most similar products for every product and store
+    them as a memory-mappable (num_products, k) array of product IDs, padded
+    with -1. Similarities are computed in blocks of rows, NumPy releases the
+    GIL inside the matrix multiplies so the blocks run in parallel threads.
+    All blocks in flight together fit in RECOMMENDATION_SIMILAR_PRODUCTS_MEMORY.
+
+    Args:
+        directory: Snapshot directory the table is written to
+        embeddings: Product embeddings, row i belongs to product_ids[i]
+        product_ids: Array of product IDs
+        version: Model version the table is built for
+        k: Neighbours stored per product
+        block_size: Rows per matrix multiply, derived from the memory budget by default
+        workers: Number of threads, one per core up to MAX_WORKERS by default
+    """
+    vectors = normalize(embeddings)
+    product_ids = np.asarray(product_ids, dtype=np.int64)
+    n = len(vectors)
+    requested_k = k
+    k = min(k, max(n - 1, 0))
+    workers = workers or min(os.cpu_count() or 1, MAX_WORKERS)
+    if block_size is None:
+        budget = getattr(settings, 'RECOMMENDATION_SIMILAR_PRODUCTS_MEMORY', 1024 ** 3)
+        block_size = min(MAX_BLOCK_SIZE, max(1, budget // (max(n, 1) * BYTES_PER_SIMILARITY * workers)))
+
+    # Every build writes its own table file, readers only find it through the meta file,
+    # which is replaced last, so they never pair a table with the meta of another build
+    built_at = timezone.now()
+    table_file = TABLE_FILE_PATTERN.format(built_at.strftime('%Y%m%d%H%M%S%f'))
+    tmp_path = os.path.join(directory, table_file + '.tmp')
+    table = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.int64, shape=(n, k))
+
+    def fill_block(start):
+        end = min(start + block_size, n)
+        similarities = vectors[start:end] @ vectors.T
+        # A product is not similar to itself
+        similarities[np.arange(end - start), np.arange(start, end)] = -np.inf
+        # The k largest end up in the last k columns, without a negated copy of the block
+        top = np.argpartition(similarities, n - k, axis=1)[:, n - k:]
+        top_scores = np.take_along_axis(similarities, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        table[start:end] = product_ids[np.take_along_axis(top, order, axis=1)]
+
+    if k > 0:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(fill_block, range(0, n, block_size)))
+    table.flush()
+    del table
+    os.replace(tmp_path, os.path.join(directory, table_file))
+
+    meta_path = os.path.join(directory, META_FILE)
+    previous = read_meta(directory)
+    with open(meta_path + '.tmp', 'w') as meta_file:
+        json.dump(
+            {'version': version, 'k': requested_k, 'table': table_file, 'built_at': built_at.isoformat()}, meta_file
+        )
+    os.replace(meta_path + '.tmp', meta_path)
+
+    # The previous table stays for workers that read the previous meta file just before
+    keep = {table_file, previous.get('table', TABLE_FILE) if previous else None}
+    for name in os.listdir(directory):
+        is_table = name == TABLE_FILE or (name.startswith('similar_products-') and name.endswith('.npy'))
+        if is_table and name not in keep:
+            os.remove(os.path.join(directory, name))
+
+
+def read_meta(directory):
+    """Metadata of the current table of a snapshot, None if none was built"""
+    try:
+        with open(os.path.join(directory, META_FILE)) as meta_file:
+            return json.load(meta_file)
+    except FileNotFoundError:
+        return None
+
+
+def load_similar_products_table(directory):
+    """
+    Open the table of a snapshot read-only and memory-mapped
+
+    Returns:
+        Tuple of (table, metadata), (None, None) if the table wasn't built
+    """
+    for attempt in range(2):
+        meta = read_meta(directory)
+        if meta is None:
+            return None, None
+        try:
+            return np.load(os.path.join(directory, meta.get('table', TABLE_FILE)), mmap_mode='r'), meta
+        except FileNotFoundError:
+            # Deleted by two rebuilds since the meta file was read, the new meta file names a newer table
+            if attempt:
+                raise
@@ -0,0 +1,194 @@
+import os
+import shutil
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from recommendation.ann import IVFIndex
+from recommendation.data import IdMap
+from recommendation.models import ModelSnapshot
+from recommendation.similarity import build_similar_products_table, load_similar_products_table
+
+WEIGHTS_FILE = 'model.weights.h5'
+USER_IDS_FILE = 'user_ids.npy'
+USER_IDS_ORDER_FILE = 'user_ids_order.npy'
+PRODUCT_IDS_FILE = 'product_ids.npy'
+PRODUCT_IDS_ORDER_FILE = 'product_ids_order.npy'
+PRODUCT_EMBEDDINGS_FILE = 'product_embeddings.npy'
+USER_EMBEDDINGS_FILE = 'user_embeddings.npy'
+PRODUCT_BIAS_FILE = 'product_bias.npy'
+# Dense layers of the 'mlp' architecture, for inference without TensorFlow
+DENSE_KERNEL_FILE = 'dense_{}_kernel.npy'
+DENSE_BIAS_FILE = 'dense_{}_bias.npy'
+
+
+def get_artifacts_dir():
+    return getattr(
+        settings,
+        'RECOMMENDATION_ARTIFACTS_DIR',
+        os.path.join(settings.BASE_DIR, 'recommendation_artifacts')
+    )
+
+
+def load_array(path, name):
+    """
+    Memory-map a saved array read-only. The pages are shared by all worker
+    processes of the host, so a published model costs one copy of RAM.
+    """
+    return np.load(os.path.join(path, name), mmap_mode='r')
+
+
+def load_id_map(path, ids_file, order_file):
+    ids = load_array(path, ids_file)
+    # Snapshots published before the order files get it sorted on load
+    if not os.path.exists(os.path.join(path, order_file)):
+        return IdMap(ids)
+    return IdMap(ids, load_array(path, order_file))
+
+
+def save_snapshot(state, num_events=0):
+    """
+    Write a trained ModelState to a new versioned directory and publish it
+    by registering it in the ModelSnapshot manifest.
+    Web workers only see the snapshot once the manifest row exists.
+
+    Args:
+        state: The ModelState of a freshly trained model
+        num_events: Number of navigation events used for training
+
+    Returns:
+        The created ModelSnapshot
+    """
+    version = timezone.now().strftime('%Y%m%d%H%M%S%f')
+    path = os.path.join(get_artifacts_dir(), version)
+    # Artifacts are written to a temporary directory and renamed into place,
+    # so a reader never sees a partially written snapshot
+    tmp_path = path + '.tmp'
+    os.makedirs(tmp_path, exist_ok=True)
+
+    state.model.save_weights(os.path.join(tmp_path, WEIGHTS_FILE))
+    np.save(os.path.join(tmp_path, USER_IDS_FILE), state.user_mapping.ids)
+    np.save(os.path.join(tmp_path, USER_IDS_ORDER_FILE), state.user_mapping.order)
+    np.save(os.path.join(tmp_path, PRODUCT_IDS_FILE), state.product_mapping.ids)
+    np.save(os.path.join(tmp_path, PRODUCT_IDS_ORDER_FILE), state.product_mapping.order)
+    np.save(os.path.join(tmp_path, PRODUCT_EMBEDDINGS_FILE), state.product_embeddings)
+
+    state.similarity_index.save(tmp_path)
+    build_similar_products_table(
+        tmp_path,
+        state.product_embeddings,
+        state.product_mapping.ids,
+        version,
+        k=getattr(settings, 'RECOMMENDATION_SIMILAR_PRODUCTS', 100),
+    )
+
+    # Web workers score with these arrays, the Keras weights are only for the trainer
+    np.save(os.path.join(tmp_path, USER_EMBEDDINGS_FILE), state.user_embeddings)
+    if state.architecture == 'dot':
+        np.save(os.path.join(tmp_path, PRODUCT_BIAS_FILE), state.product_bias)
+    else:
+        for i, (kernel, bias) in enumerate(state.dense_layers):
+            np.save(os.path.join(tmp_path, DENSE_KERNEL_FILE.format(i)), kernel)
+            np.save(os.path.join(tmp_path, DENSE_BIAS_FILE.format(i)), bias)
+
+    os.replace(tmp_path, path)
+
+    snapshot = ModelSnapshot.objects.create(
+        version=version,
+        path=path,
+        architecture=state.architecture,
+        embedding_size=state.product_embeddings.shape[1],
+        num_users=len(state.user_mapping),
+        num_products=len(state.product_mapping),
+        num_events=num_events,
+        last_navigation_id=state.last_navigation_id,
+    )
+    prune_snapshots()
+    return snapshot
+
+
+def get_latest_snapshot():
+    """Return the newest snapshot whose artifacts are still on disk"""
+    for snapshot in ModelSnapshot.objects.all():
+        if os.path.isdir(snapshot.path):
+            return snapshot
+    return None
+
+
+def load_snapshot(snapshot):
+    """
+    Read the artifacts of a snapshot from disk. Arrays are memory-mapped,
+    not copied into the worker.
+
+    Returns:
+        Dictionary with weights path, ID maps, embeddings and dense layers
+    """
+    path = snapshot.path
+    product_mapping = load_id_map(path, PRODUCT_IDS_FILE, PRODUCT_IDS_ORDER_FILE)
+
+    artifacts = {
+        'weights_path': os.path.join(path, WEIGHTS_FILE),
+        'user_mapping': load_id_map(path, USER_IDS_FILE, USER_IDS_ORDER_FILE),
+        'product_mapping': product_mapping,
+        'product_ids': product_mapping.ids,
+        'product_embeddings': load_array(path, PRODUCT_EMBEDDINGS_FILE),
+        'user_embeddings': None,
+        'product_bias': None,
+        'dense_layers': None,
+    }
+
+    # Snapshots published before the index existed get one built on load
+    artifacts['similarity_index'] = (
+        IVFIndex.load(path) or IVFIndex.build(artifacts['product_embeddings'])
+    )
+
+    artifacts['similar_products_table'], artifacts['similar_products_meta'] = load_similar_products_table(path)
+
+    # 'mlp' snapshots published before the export can't be scored without TensorFlow
+    if os.path.exists(os.path.join(path, USER_EMBEDDINGS_FILE)):
+        artifacts['user_embeddings'] = load_array(path, USER_EMBEDDINGS_FILE)
+    if snapshot.architecture == 'dot':
+        artifacts['product_bias'] = load_array(path, PRODUCT_BIAS_FILE)
+    elif os.path.exists(os.path.join(path, DENSE_KERNEL_FILE.format(0))):
+        dense_layers = []
+        while os.path.exists(os.path.join(path, DENSE_KERNEL_FILE.format(len(dense_layers)))):
+            i = len(dense_layers)
+            dense_layers.append((
+                load_array(path, DENSE_KERNEL_FILE.format(i)),
+                load_array(path, DENSE_BIAS_FILE.format(i)),
+            ))
+        artifacts['dense_layers'] = tuple(dense_layers)
+
+    return artifacts
+
+
+def get_expired_snapshots(snapshots):
+    """
+    Snapshots that can be deleted: past the newest RECOMMENDATION_KEEP_SNAPSHOTS,
+    never the current or the previous one, and replaced more than
+    RECOMMENDATION_SNAPSHOT_GRACE_PERIOD seconds ago. Workers still serving
+    a replaced snapshot, or loading it from a manifest they just read,
+    switch to its successor within that time.
+
+    Args:
+        snapshots: Manifest entries, newest first
+
+    Returns:
+        List of the expired entries
+    """
+    keep = max(2, getattr(settings, 'RECOMMENDATION_KEEP_SNAPSHOTS', 3))
+    grace_period = timedelta(seconds=getattr(settings, 'RECOMMENDATION_SNAPSHOT_GRACE_PERIOD', 600))
+    replaced_before = timezone.now() - grace_period
+    snapshots = list(snapshots)
+    return [
+        snapshot
+        for successor, snapshot in zip(snapshots[keep - 1:], snapshots[keep:])
+        if successor.created_at <= replaced_before
+    ]
+
+
+def prune_snapshots():
+    """Delete the expired snapshots, see get_expired_snapshots"""
+    for snapshot in get_expired_snapshots(ModelSnapshot.objects.all()):
+        shutil.rmtree(snapshot.path, ignore_errors=True)
+        snapshot.delete()
@@ -1,3 +1,616 @@
-from django.test import TestCase
-
-# Create your tests here.
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from core.models import User
+from recommendation import neural_network
+from recommendation.ann import IVFIndex, normalize
+from recommendation.cursors import get_cursor_cache
+from recommendation.data import load_navigations
+from recommendation.inference import mlp_scores, sigmoid
+from recommendation.models import ModelSnapshot
+from recommendation.neural_network import ModelState, RecommendationModel
+from recommendation.pipeline import filter_candidates, hydrate_products
+from recommendation.ranking import RankedSlice
+from recommendation.search import InvertedIndex
+from recommendation.similarity import build_similar_products_table, load_similar_products_table
+from recommendation.snapshots import prune_snapshots
+from recommendation.text_index import build_text_index, invalidate_text_index, poll_text_index
+from store import archive
+from store.catalog import invalidate_catalog
+from store.models import NavigationArchive, Product, ProductNavigation
+from store.tests import QueryBudgetTestCase
+
+
+class RecommendationQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        invalidate_text_index()
+        get_cursor_cache().clear()
+
+    def test_popular_products(self):
+        self.assertQueryBudget('/recommendation/', 1)
+
+    def test_personalized_products(self):
+        # Authentication and the user's navigation count come on top of the page
+        self.assertQueryBudget('/recommendation/', 4, user=self.data['users'][0])
+
+    def test_search(self):
+        self.assertQueryBudget('/recommendation/?query=wireless+phone', 1)
+
+    def test_filter_and_sort(self):
+        category = self.data['categories'][0]
+        self.assertQueryBudget(
+            f'/recommendation/?categories={category.id}&price_min=50&price_max=400&sort=priceLowToHigh', 1
+        )
+        self.assertQueryBudget('/recommendation/?query=phone&sort=newest', 1)
+
+    def test_later_page_from_cursor(self):
+        client = self.client_for()
+        cursor = client.get('/recommendation/?page_size=5').json()['cursor']
+        count, response = self.count_queries(client, f'/recommendation/?page_size=5&page=2&cursor={cursor}')
+        self.assertEqual(response.json()['cursor'], cursor)
+        self.assertLessEqual(count, 1)
+
+    def test_similar_products(self):
+        self.assertQueryBudget(f'/similar/{self.data["products"][0].id}/', 1)
+
+    def test_requests_without_cursor_reuse_the_ranking(self):
+        client = self.client_for(self.data['users'][0])
+        cursors = {client.get('/recommendation/').json()['cursor'] for _ in range(5)}
+        self.assertEqual(len(cursors), 1)
+        self.assertEqual(len(get_cursor_cache()._cache), 1)
+        # Another filter is another ranking
+        client.get('/recommendation/?sort=newest')
+        self.assertEqual(len(get_cursor_cache()._cache), 2)
+
+    def page_ids(self, client, path):
+        return [product['id'] for product in client.get(path).json()['results']]
+
+    def test_pages_past_the_stored_ranking(self):
+        client = self.client_for(self.data['users'][0])
+        expected = self.page_ids(client, '/recommendation/?page_size=5&page=3')
+        get_cursor_cache().clear()
+        with override_settings(RECOMMENDATION_CURSOR_MAX_ITEMS=10):
+            data = client.get('/recommendation/?page_size=5').json()
+            self.assertEqual(data['count'], len(self.data['products']))
+            self.assertEqual(self.page_ids(client, f'/recommendation/?page_size=5&page=3&cursor={data["cursor"]}'), expected)
+
+    def test_product_edits_start_a_new_ranking(self):
+        client = self.client_for()
+        cursor = client.get('/recommendation/?sort=priceLowToHigh').json()['cursor']
+        product = self.data['products'][5]
+        product.price = 0
+        product.save()
+        invalidate_catalog()
+        data = client.get(f'/recommendation/?sort=priceLowToHigh&cursor={cursor}').json()
+        self.assertNotEqual(data['cursor'], cursor)
+        self.assertEqual(data['results'][0]['id'], product.id)
+
+
+class RankedSliceTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # Mostly ties, some products share a score with dozens of others
+        self.scores = rng.integers(0, 5, 500).astype(np.float32)
+        self.ids = rng.permutation(np.arange(1000, 1500))
+        self.expected = self.ids[np.argsort(-self.scores, kind='stable')].tolist()
+
+    def test_iteration_across_extensions_yields_each_product_once(self):
+        ranked = RankedSlice(self.ids, self.scores, buffer_size=7)
+        self.assertEqual(list(ranked), self.expected)
+
+    def test_pages_match_the_full_ranking(self):
+        ranked = RankedSlice(self.ids, self.scores, buffer_size=7)
+        pages = [ranked[start:start + 10] for start in range(0, 500, 10)]
+        self.assertEqual(sum(pages, []), self.expected)
+
+
+class IVFIndexTests(SimpleTestCase):
+    def test_recall_against_exact_search(self):
+        rng = np.random.default_rng(0)
+        # Clustered like trained product embeddings
+        centers = rng.normal(size=(40, 16))
+        vectors = (centers[rng.integers(0, 40, 4000)] + 0.5 * rng.normal(size=(4000, 16))).astype(np.float32)
+        index = IVFIndex.build(vectors)
+        normalized = normalize(vectors)
+
+        recall = []
+        for row in range(0, 4000, 40):
+            similarities = normalized @ normalized[row]
+            similarities[row] = -np.inf
+            exact = set(np.argsort(-similarities)[:10].tolist())
+            # At the default nprobe
+            rows, _ = index.search(vectors[row], k=10, exclude=row)
+            self.assertNotIn(row, rows.tolist())
+            recall.append(len(exact.intersection(rows.tolist())) / 10)
+        self.assertGreaterEqual(np.mean(recall), 0.9)
+
+
+class InvertedIndexTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = np.random.default_rng(0)
+        # Zipf-like term frequencies, so that postings are long and early termination matters
+        vocabulary = [f'term{i}' for i in range(60)]
+        p = 1 / np.arange(1, len(vocabulary) + 1)
+        texts = [' '.join(rng.choice(vocabulary, rng.integers(3, 15), p=p / p.sum())) for _ in range(400)]
+        cls.vectorizer = TfidfVectorizer()
+        cls.matrix = cls.vectorizer.fit_transform(texts).tocsr()
+        cls.index = InvertedIndex.build(cls.matrix)
+        cls.queries = ['term0', 'term0 term1', 'term3 term17 term40', 'term1 term2 term5 term59']
+
+    def encode(self, query):
+        vector = self.vectorizer.transform([query])
+        return vector.indices.astype(np.int64), vector.data
+
+    def brute_force(self, columns, weights, k, min_score=0.0, accept=None):
+        query = np.zeros(self.matrix.shape[1])
+        query[columns] = weights
+        scores = self.matrix @ query
+        rows = np.flatnonzero(scores > min_score)
+        if accept is not None:
+            rows = rows[accept(rows)]
+        # Same tie break as the index, the higher row first
+        rows = rows[np.lexsort((-rows, -scores[rows]))][:k]
+        return rows, scores[rows]
+
+    def assertSameResults(self, query, k, **kwargs):
+        columns, weights = self.encode(query)
+        # Small blocks, so that the search reads postings over several rounds
+        rows, scores = self.index.search(columns, weights, k, block_size=2, **kwargs)
+        expected_rows, expected_scores = self.brute_force(columns, weights, k, **kwargs)
+        np.testing.assert_array_equal(rows, expected_rows)
+        np.testing.assert_allclose(scores, expected_scores)
+
+    def test_top_k_matches_brute_force(self):
+        for query in self.queries:
+            for k in (1, 5, 50, 1000):
+                with self.subTest(query=query, k=k):
+                    self.assertSameResults(query, k)
+
+    def test_min_score_matches_brute_force(self):
+        for query in self.queries:
+            for min_score in (0.1, 0.3, 0.6):
+                with self.subTest(query=query, min_score=min_score):
+                    self.assertSameResults(query, 10, min_score=min_score)
+
+    def test_accept_matches_brute_force(self):
+        accept = lambda rows: rows % 3 == 0
+        for query in self.queries:
+            with self.subTest(query=query):
+                self.assertSameResults(query, 10, accept=accept)
+                self.assertSameResults(query, 10, accept=accept, min_score=0.2)
+
+    def test_stops_before_scoring_every_match(self):
+        scored = []
+
+        class CountingMatrix:
+            shape = self.matrix.shape
+
+            def __getitem__(_, rows):
+                scored.extend(rows.tolist())
+                return self.matrix[rows]
+
+        index = InvertedIndex(self.index.offsets, self.index.docs, self.index.weights, CountingMatrix())
+        columns, weights = self.encode('term0 term1')
+        index.search(columns, weights, 5, block_size=2)
+        matches = np.flatnonzero(self.matrix[:, columns].getnnz(axis=1))
+        self.assertLess(len(scored), len(matches) / 2)
+
+    def test_empty_query(self):
+        rows, scores = self.index.search(np.empty(0, dtype=np.int64), np.empty(0), 10)
+        self.assertEqual(len(rows), 0)
+        self.assertEqual(len(scores), 0)
+
+
+class ModelStateTests(SimpleTestCase):
+    def test_state_is_immutable(self):
+        embeddings = np.ones((3, 2), dtype=np.float32)
+        state = ModelState(product_embeddings=embeddings, similar_products_meta={'version': '1'})
+        with self.assertRaises(AttributeError):
+            state.version = '2'
+        with self.assertRaises(ValueError):
+            state.product_embeddings[0, 0] = 2
+        with self.assertRaises(TypeError):
+            state.similar_products_meta['version'] = '2'
+        # The caller's own array stays writable
+        embeddings[0, 0] = 2
+        self.assertEqual(state.product_embeddings[0, 0], 2)
+
+    def test_replace_returns_a_new_state(self):
+        state = ModelState(version='1')
+        replaced = state.replace(version='2')
+        self.assertEqual(state.version, '1')
+        self.assertEqual(replaced.version, '2')
+        with self.assertRaises(TypeError):
+            state.replace(unknown=1)
+
+
+class RecommendationModelPublishTests(SimpleTestCase):
+    def setUp(self):
+        self.model = RecommendationModel()
+        self.model.state = ModelState(version='20260102000000000000')
+
+    def test_publish_rejects_older_version(self):
+        self.model._publish(ModelState(version='20260101000000000000'))
+        self.assertEqual(self.model.version, '20260102000000000000')
+        self.model._publish(ModelState(version='20260103000000000000'))
+        self.assertEqual(self.model.version, '20260103000000000000')
+
+    def test_load_latest_ignores_older_snapshot(self):
+        snapshot = SimpleNamespace(version='20260101000000000000')
+        with mock.patch.object(neural_network, 'get_latest_snapshot', return_value=snapshot), \
+                mock.patch.object(neural_network, 'load_snapshot') as load_snapshot:
+            self.assertFalse(self.model.load_latest())
+        load_snapshot.assert_not_called()
+        self.assertEqual(self.model.version, '20260102000000000000')
+
+    @override_settings(RECOMMENDATION_REFRESH_INTERVAL=0)
+    def test_refresh_does_not_wait_for_a_running_load(self):
+        state = self.model.state
+        refreshed = threading.Event()
+
+        def refresh():
+            self.model.refresh()
+            refreshed.set()
+
+        # Another thread is loading a snapshot
+        with self.model._load_lock, mock.patch.object(neural_network, 'get_latest_snapshot') as get_latest_snapshot:
+            threading.Thread(target=refresh, daemon=True).start()
+            self.assertTrue(refreshed.wait(5))
+        get_latest_snapshot.assert_not_called()
+        self.assertIs(self.model.state, state)
+
+
+class SnapshotPruningTests(TestCase):
+    def create_snapshots(self, directory, ages):
+        """One snapshot directory per age in minutes, the newest first"""
+        now = timezone.now()
+        for i, age in enumerate(ages):
+            path = os.path.join(directory, f'snapshot-{i}')
+            os.makedirs(path)
+            snapshot = ModelSnapshot.objects.create(version=f'v{len(ages) - i}', path=path)
+            ModelSnapshot.objects.filter(id=snapshot.id).update(created_at=now - timedelta(minutes=age))
+
+    @override_settings(RECOMMENDATION_KEEP_SNAPSHOTS=1, RECOMMENDATION_SNAPSHOT_GRACE_PERIOD=600)
+    def test_replaced_snapshots_outlive_the_grace_period(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # Replaced 1, 5, 20 and 30 minutes ago
+            self.create_snapshots(directory, [1, 5, 20, 30, 40])
+            prune_snapshots()
+            # The previous one is always kept, the one replaced 5 minutes ago is in its grace period
+            self.assertEqual(list(ModelSnapshot.objects.values_list('version', flat=True)), ['v5', 'v4', 'v3'])
+            self.assertEqual(sorted(os.listdir(directory)), ['snapshot-0', 'snapshot-1', 'snapshot-2'])
+
+
+class CandidatePipelineTests(TestCase):
+    def setUp(self):
+        invalidate_catalog()
+        self.products = [Product.objects.create(name=f'Product {i}', price=10 * (i + 1)) for i in range(10)]
+        ids = [product.id for product in self.products]
+        # Best first, with an ID that never existed
+        self.ranking = [ids[5], ids[2], 999999, ids[7], ids[0], ids[9], ids[3], ids[8], ids[1], ids[6], ids[4]]
+
+    def test_filtered_and_deleted_products_are_dropped_in_rank_order(self):
+        deleted = self.products[7].id
+        self.products[7].delete()
+        invalidate_catalog()
+        expected = [product_id for product_id in self.ranking if product_id not in (999999, deleted)]
+        ranked = filter_candidates(self.ranking)
+        self.assertEqual(len(ranked), len(expected))
+        # Consecutive pages neither repeat nor skip products
+        self.assertEqual(ranked[0:3] + ranked[3:6] + ranked[6:9], expected)
+
+        cheap_ids = [product.id for product in self.products[:5]]
+        cheap = filter_candidates(self.ranking, lambda ids: np.isin(ids, cheap_ids))
+        self.assertEqual(list(cheap), [product_id for product_id in expected if product_id in cheap_ids])
+
+    def test_hydration_keeps_the_page_order(self):
+        page = self.ranking[:6]
+        # Deleted after the catalog snapshot was taken
+        deleted = self.products[0].id
+        self.products[0].delete()
+        products = hydrate_products(page)
+        self.assertEqual(
+            [product.id for product in products],
+            [product_id for product_id in page if product_id not in (999999, deleted)],
+        )
+
+
+class InferenceTests(SimpleTestCase):
+    def predict(self, architecture, num_users=3, num_products=50):
+        """Keras scores of every product for every user, with the weights the workers serve"""
+        from recommendation.training import RecommendationTrainer
+
+        trainer = RecommendationTrainer()
+        model = trainer._create_model(num_users, num_products, embedding_size=8, architecture=architecture)
+        # Spread out weights, the fresh initialization scores everything close to 0.5
+        rng = np.random.default_rng(0)
+        for layer in model.layers:
+            layer.set_weights([rng.normal(scale=0.5, size=w.shape).astype(np.float32) for w in layer.get_weights()])
+        users, products = np.meshgrid(np.arange(num_users), np.arange(num_products), indexing='ij')
+        predictions = model.predict([users.reshape(-1, 1), products.reshape(-1, 1)], verbose=0)
+        return model, trainer._extract_embeddings(model, architecture), predictions.reshape(num_users, num_products)
+
+    def test_mlp_scores_match_keras(self):
+        _, (product_embeddings, user_embeddings, _, dense_layers), predictions = self.predict('mlp')
+        for user, expected in enumerate(predictions):
+            # Blocks of 16 leave a partial last block
+            for block_size in (16, 65536):
+                scores = mlp_scores(user_embeddings[user], product_embeddings, dense_layers, block_size=block_size)
+                self.assertTrue(np.allclose(scores, expected, atol=1e-5))
+
+    def test_dot_scores_match_keras(self):
+        model, (product_embeddings, user_embeddings, product_bias, _), predictions = self.predict('dot')
+        user_bias = model.get_layer('user_bias').get_weights()[0].ravel()
+        for user, expected in enumerate(predictions):
+            # The served score leaves out the user bias, it doesn't change the ranking
+            scores = product_embeddings @ user_embeddings[user] + product_bias
+            self.assertTrue(np.allclose(sigmoid(scores + user_bias[user]), expected, atol=1e-5))
+
+
+class SingleFlightTrainingTests(SimpleTestCase):
+    def test_concurrent_train_returns_immediately(self):
+        from recommendation.training import RecommendationTrainer
+
+        trainer = RecommendationTrainer()
+        started, release = threading.Event(), threading.Event()
+
+        def slow_train(force, full):
+            started.set()
+            release.wait(5)
+            return True
+
+        results = []
+        with mock.patch.object(trainer, '_train', side_effect=slow_train) as train:
+            thread = threading.Thread(target=lambda: results.append(trainer.train()))
+            thread.start()
+            self.assertTrue(started.wait(5))
+            # Returns without waiting, the running training isn't repeated
+            self.assertFalse(trainer.train(force=True))
+            release.set()
+            thread.join(5)
+        self.assertEqual(results, [True])
+        train.assert_called_once_with(False, False)
+        # Free again once the first run is over
+        self.assertFalse(trainer._train_lock.locked())
+
+
+class NavigationLoaderTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(NAVIGATION_ARCHIVE_DIR=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        users = [
+            User.objects.create_user(
+                email=f'loader{i}@example.com', first_name='Test', last_name='User', dob='1990-01-01',
+                password='password',
+            )
+            for i in range(3)
+        ]
+        products = [Product.objects.create(name=f'Product {i}', price=100) for i in range(4)]
+        specs = [(user, product) for user in users + [None] for product in products]
+
+        # An archived day, anonymous navigations included, then hot rows
+        day = timezone.localdate() - timedelta(days=10)
+        archived = ProductNavigation.objects.bulk_create([
+            ProductNavigation(user=user, destination_product=product) for user, product in specs
+        ])
+        ProductNavigation.objects.filter(id__in=[n.id for n in archived]).update(
+            created_at=archive.day_bounds(day)[0] + timedelta(hours=12)
+        )
+        self.expected = self.rows(ProductNavigation.objects.filter(user__isnull=False))
+        archive.archive_day(day)
+        ProductNavigation.objects.bulk_create([
+            ProductNavigation(user=user, destination_product=product) for user, product in specs
+        ])
+        self.expected += self.rows(ProductNavigation.objects.filter(user__isnull=False))
+
+    def rows(self, navigations):
+        return [
+            (navigation_id, user_id, product_id, int(created_at.timestamp()))
+            for navigation_id, user_id, product_id, created_at in navigations.order_by('id').values_list(
+                'id', 'user_id', 'destination_product_id', 'created_at'
+            )
+        ]
+
+    def load(self, after_id=0, archives=None, chunk_size=5):
+        if archives is None:
+            archives = list(NavigationArchive.objects.filter(max_id__gt=after_id))
+        events = load_navigations(
+            ProductNavigation.objects.filter(user__isnull=False, id__gt=after_id),
+            chunk_size=chunk_size, archives=archives, after_id=after_id,
+        )
+        rows = list(zip(*(events[name].tolist() for name in ('ids', 'user_ids', 'product_ids', 'created_at'))))
+        return sorted(rows), len(events['ids'])
+
+    def test_matches_the_rows_of_the_archive_and_the_table(self):
+        rows, _ = self.load()
+        self.assertEqual(rows, self.expected)
+        self.assertEqual(self.load(chunk_size=1000)[0], self.expected)
+
+    def test_loads_only_the_rows_after_the_high_water_mark(self):
+        # Halfway through the archived day
+        after_id = self.expected[4][0]
+        rows, _ = self.load(after_id=after_id)
+        self.assertEqual(rows, [row for row in self.expected if row[0] > after_id])
+
+    def test_stale_counts_neither_overflow_nor_leave_rows_behind(self):
+        segment = NavigationArchive.objects.get()
+        # Compacted to more events than the manifest row says
+        segment.num_user_events = 0
+        self.assertEqual(self.load(archives=[segment])[0], self.expected)
+        # Or to fewer
+        segment.num_user_events = 100
+        rows, size = self.load(archives=[segment])
+        self.assertEqual(rows, self.expected)
+        self.assertEqual(size, len(self.expected))
+
+
+class IncrementalTrainingTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(RECOMMENDATION_ARTIFACTS_DIR=directory.name, RECOMMENDATION_ARCHITECTURE='mlp')
+        override.enable()
+        self.addCleanup(override.disable)
+        self.users = [self.create_user(i) for i in range(3)]
+        self.products = [Product.objects.create(name=f'Product {i}', price=100) for i in range(4)]
+        self.navigate(self.users, self.products)
+
+    def create_user(self, i):
+        return User.objects.create_user(
+            email=f'trainee{i}@example.com', first_name='Test', last_name='User', dob='1990-01-01', password='password'
+        )
+
+    def navigate(self, users, products):
+        return ProductNavigation.objects.bulk_create([
+            ProductNavigation(user=user, destination_product=product) for user in users for product in products
+        ])
+
+    def test_fine_tunes_a_grown_copy_on_new_navigations(self):
+        from recommendation.training import RecommendationTrainer
+
+        trainer = RecommendationTrainer()
+        self.assertTrue(trainer.train(force=True))
+        first = trainer.state
+
+        user = self.create_user(3)
+        product = Product.objects.create(name='Product 4', price=100)
+        new_navigations = self.navigate([user, self.users[0]], [product, self.products[0]])
+
+        grown = {}
+
+        def grow_model(state, users, products):
+            user_ids, product_ids, model = RecommendationTrainer._grow_model(trainer, state, users, products)
+            # Before fine-tuning changes them
+            grown['users'] = model.get_layer('user_embedding').get_weights()[0].copy()
+            grown['products'] = model.get_layer('product_embedding').get_weights()[0].copy()
+            return user_ids, product_ids, model
+
+        with mock.patch.object(trainer, '_grow_model', side_effect=grow_model):
+            self.assertTrue(trainer.train(force=True))
+        second = trainer.state
+
+        # New IDs are appended, old ones keep their index and their embedding rows
+        old_users, old_products = first.user_mapping.ids.tolist(), first.product_mapping.ids.tolist()
+        self.assertEqual(second.user_mapping.ids.tolist(), old_users + [user.id])
+        self.assertEqual(second.product_mapping.ids.tolist(), old_products + [product.id])
+        self.assertEqual(second.user_embeddings.shape, (4, first.user_embeddings.shape[1]))
+        self.assertEqual(second.product_embeddings.shape, (5, first.product_embeddings.shape[1]))
+        self.assertTrue(np.array_equal(grown['users'][:3], first.user_embeddings))
+        self.assertTrue(np.array_equal(grown['products'][:4], first.product_embeddings))
+
+        # Only the navigations after the high-water mark were trained on
+        self.assertEqual(second.last_navigation_id, max(navigation.id for navigation in new_navigations))
+        self.assertEqual(ModelSnapshot.objects.get(version=second.version).num_events, len(new_navigations))
+
+
+@override_settings(TEXT_INDEX_MAX_DELTA=5)
+class TextIndexPollTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(RECOMMENDATION_ARTIFACTS_DIR=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        invalidate_catalog()
+        # Every term is in two products, like the base vectorizer needs
+        self.products = [
+            Product.objects.create(name=f'{color} {kind}', price=100)
+            for color in ['red', 'green', 'blue', 'black'] for kind in ['speaker', 'phone']
+        ]
+
+    def search(self, text_index, query):
+        return text_index.search(query, 10)[0].tolist()
+
+    def test_delta_without_base_is_capped(self):
+        with self.assertLogs('recommendation.text_index', 'WARNING') as logs:
+            text_index = poll_text_index(None)
+        self.assertIn('build_text_index', logs.output[0])
+        # The most recently saved products
+        self.assertEqual(sorted(text_index.delta), sorted(p.id for p in self.products[-5:]))
+        self.assertTrue(text_index.truncated)
+
+        self.products[0].save()
+        with self.assertNoLogs('recommendation.text_index', 'WARNING'):
+            text_index = poll_text_index(text_index)
+        self.assertEqual(len(text_index.delta), 5)
+        self.assertIn(self.products[0].id, text_index.delta)
+        self.assertNotIn(self.products[3].id, text_index.delta)
+
+    @override_settings(TEXT_INDEX_MAX_DELTA=50)
+    def test_deleted_products_are_not_found(self):
+        self.assertIsNotNone(build_text_index())
+        new = Product.objects.create(name='Wireless orange speaker', price=100)
+        red_speaker, red_phone = self.products[:2]
+        text_index = poll_text_index(None)
+        self.assertEqual(sorted(self.search(text_index, 'red')), [red_speaker.id, red_phone.id])
+        self.assertEqual(self.search(text_index, 'orange'), [new.id])
+
+        # One product of the base, one of the delta
+        with self.captureOnCommitCallbacks(execute=True):
+            red_speaker.delete()
+            new.delete()
+        text_index = poll_text_index(text_index)
+        self.assertEqual(self.search(text_index, 'red'), [red_phone.id])
+        self.assertEqual(self.search(text_index, 'orange'), [])
+
+
+class SimilarProductsTableTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        rng = np.random.default_rng(0)
+        self.embeddings = rng.normal(size=(20, 4)).astype(np.float32)
+        self.product_ids = np.arange(100, 120)
+
+    def build(self, k):
+        build_similar_products_table(self.directory, self.embeddings, self.product_ids, 'v1', k=k)
+        return load_similar_products_table(self.directory)
+
+    def test_rebuild_switches_table_and_meta_together(self):
+        table, meta = self.build(k=10)
+        self.assertEqual(table.shape, (20, 10))
+        self.assertEqual(meta['k'], 10)
+
+        # A worker that read the first meta file still finds its table
+        first_table = meta['table']
+        table, meta = self.build(k=3)
+        self.assertEqual(table.shape, (20, 3))
+        self.assertEqual(meta['k'], 3)
+        self.assertNotEqual(meta['table'], first_table)
+        self.assertTrue(os.path.exists(os.path.join(self.directory, first_table)))
+
+        # Tables older than the previous one are deleted
+        self.build(k=5)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, first_table)))
+        tables = [name for name in os.listdir(self.directory) if name.endswith('.npy')]
+        self.assertEqual(len(tables), 2)
+
+    @override_settings(RECOMMENDATION_SIMILAR_PRODUCTS_MEMORY=3 * 20 * 12)
+    def test_small_memory_budget_gives_the_exact_table(self):
+        # Three rows per block on one thread
+        build_similar_products_table(self.directory, self.embeddings, self.product_ids, 'v1', k=5, workers=1)
+        table, _ = load_similar_products_table(self.directory)
+        vectors = self.embeddings / np.linalg.norm(self.embeddings, axis=1, keepdims=True)
+        similarities = vectors @ vectors.T
+        np.fill_diagonal(similarities, -np.inf)
+        expected = self.product_ids[np.argsort(-similarities, axis=1, kind='stable')[:, :5]]
+        self.assertTrue(np.array_equal(np.asarray(table), expected))
+
+    def test_neighbours_exclude_the_product_itself(self):
+        table, _ = self.build(k=5)
+        self.assertFalse((table == self.product_ids[:, None]).any())
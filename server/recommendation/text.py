@@ -0,0 +1,33 @@
+import re
+from collections import Counter
+import numpy as np
+
+# Same tokens as the default TfidfVectorizer token_pattern, after lowercasing
+TOKEN_PATTERN = re.compile(r'(?u)\b\w\w+\b')
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def encode_query(query, vocabulary, idf):
+    """
+    TF-IDF encode a query the way the trained TfidfVectorizer does
+    (raw term counts times idf, L2 normalized) without importing sklearn.
+    Stop words need no special handling, they never made it into the vocabulary.
+
+    Args:
+        query: The search query
+        vocabulary: Mapping of term -> column of the TF-IDF matrix
+        idf: Inverse document frequency per column
+
+    Returns:
+        Tuple of (columns, weights) arrays, empty if no term is known
+    """
+    counts = Counter(vocabulary[token] for token in tokenize(query) if token in vocabulary)
+    columns = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    weights = np.fromiter(counts.values(), dtype=np.float64, count=len(counts)) * idf[columns]
+    norm = np.linalg.norm(weights)
+    if norm:
+        weights /= norm
+    return columns, weights
@@ -0,0 +1,395 @@
+import os
+import json
+import time
+import shutil
+import logging
+import threading
+from collections import ChainMap, Counter
+from datetime import timedelta
+import numpy as np
+from scipy import sparse
+from django.conf import settings
+from django.utils import timezone
+
+from store.catalog import get_catalog
+from store.models import Product
+from recommendation.models import TextIndexSnapshot
+from recommendation.ranking import top_k_indices
+from recommendation.search import InvertedIndex
+from recommendation.snapshots import get_artifacts_dir, get_expired_snapshots, load_array
+from recommendation.text import encode_query, tokenize
+
+VOCABULARY_FILE = 'vocabulary.json'
+IDF_FILE = 'idf.npy'
+DATA_FILE = 'data.npy'
+INDICES_FILE = 'indices.npy'
+INDPTR_FILE = 'indptr.npy'
+PRODUCT_IDS_FILE = 'product_ids.npy'
+META_FILE = 'text_index.json'
+
+# Products saved just before a poll may commit after it, so every poll
+# looks this far back again. Re-indexing a product is idempotent.
+POLL_OVERLAP = timedelta(seconds=30)
+
+logger = logging.getLogger(__name__)
+
+_text_index = None
+_checked_at = None
+_lock = threading.Lock()
+
+
+def product_text(name, description):
+    # Combine name and description for better semantic search
+    return f"{name} {description or ''}"
+
+
+def fit_text_index(product_ids, texts):
+    """
+    Fit a TF-IDF vectorizer on product texts, in memory.
+    scikit-learn is imported here, web workers never build an index.
+
+    Returns:
+        BaseTextIndex without a version, None if too few products share a term
+    """
+    from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, TfidfVectorizer
+
+    max_df = 0.95
+    vectorizer = TfidfVectorizer(min_df=2, max_df=max_df, stop_words='english')
+    try:
+        matrix = vectorizer.fit_transform(texts).tocsr()
+    except ValueError:
+        return None
+    return BaseTextIndex(
+        vocabulary={term: int(column) for term, column in vectorizer.vocabulary_.items()},
+        idf=vectorizer.idf_,
+        matrix=matrix,
+        index=InvertedIndex.build(matrix),
+        product_ids=np.array(product_ids, dtype=np.int64),
+        stop_words=ENGLISH_STOP_WORDS,
+        max_df=max_df,
+    )
+
+
+def build_text_index(chunk_size=10000):
+    """
+    Fit a TF-IDF vectorizer on the whole catalog and publish it as a new
+    text index snapshot. Only the text columns are read from the database.
+
+    Returns:
+        The created TextIndexSnapshot, None if there is nothing to index
+    """
+    # Products updated from now on are added as a delta by the web workers
+    started = timezone.now()
+    rows = Product.objects.order_by('id').values_list('id', 'name', 'description').iterator(chunk_size=chunk_size)
+    product_ids = []
+    texts = []
+    for product_id, name, description in rows:
+        product_ids.append(product_id)
+        texts.append(product_text(name, description))
+    if not product_ids:
+        return None
+
+    base = fit_text_index(product_ids, texts)
+    if base is None:
+        # Too few products for a term to appear twice, everything stays in the delta
+        return None
+
+    version = timezone.now().strftime('%Y%m%d%H%M%S%f')
+    path = os.path.join(get_artifacts_dir(), 'text_index', version)
+    tmp_path = path + '.tmp'
+    os.makedirs(tmp_path, exist_ok=True)
+
+    with open(os.path.join(tmp_path, VOCABULARY_FILE), 'w') as f:
+        json.dump(base.vocabulary, f)
+    with open(os.path.join(tmp_path, META_FILE), 'w') as f:
+        json.dump({'stop_words': sorted(base.stop_words), 'max_df': base.max_df}, f)
+    np.save(os.path.join(tmp_path, IDF_FILE), base.idf)
+    # The CSR arrays are saved as plain .npy files so they can be memory-mapped
+    np.save(os.path.join(tmp_path, DATA_FILE), base.matrix.data)
+    np.save(os.path.join(tmp_path, INDICES_FILE), base.matrix.indices)
+    np.save(os.path.join(tmp_path, INDPTR_FILE), base.matrix.indptr)
+    np.save(os.path.join(tmp_path, PRODUCT_IDS_FILE), base.product_ids)
+    base.index.save(tmp_path)
+    os.replace(tmp_path, path)
+
+    snapshot = TextIndexSnapshot.objects.create(
+        version=version,
+        path=path,
+        num_products=len(base.product_ids),
+        num_terms=len(base.vocabulary),
+        products_updated_before=started,
+    )
+    prune_text_indexes()
+    return snapshot
+
+
+def get_latest_text_index():
+    """Return the newest text index snapshot whose files are still on disk"""
+    for snapshot in TextIndexSnapshot.objects.all():
+        if os.path.isdir(snapshot.path):
+            return snapshot
+    return None
+
+
+def prune_text_indexes():
+    """Delete the expired text indexes, see get_expired_snapshots"""
+    for snapshot in get_expired_snapshots(TextIndexSnapshot.objects.all()):
+        shutil.rmtree(snapshot.path, ignore_errors=True)
+        snapshot.delete()
+
+
+def count_changed_products(snapshot):
+    """Number of products saved since the snapshot was built, they are only in the workers' deltas"""
+    return Product.objects.filter(updated_at__gte=snapshot.products_updated_before).count()
+
+
+class BaseTextIndex:
+    """The memory-mapped arrays of a published text index snapshot"""
+    def __init__(self, version=None, vocabulary=None, idf=None, matrix=None, index=None,
+                 product_ids=None, stop_words=(), max_df=1.0, updated_before=None):
+        self.version = version
+        self.vocabulary = vocabulary or {}
+        self.idf = np.empty(0) if idf is None else idf
+        self.matrix = matrix
+        self.index = index
+        self.product_ids = np.empty(0, dtype=np.int64) if product_ids is None else product_ids
+        self.stop_words = frozenset(stop_words)
+        self.max_df = max_df
+        self.updated_before = updated_before
+
+    @classmethod
+    def load(cls, snapshot):
+        path = snapshot.path
+        with open(os.path.join(path, VOCABULARY_FILE)) as f:
+            vocabulary = json.load(f)
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        idf = load_array(path, IDF_FILE)
+        product_ids = load_array(path, PRODUCT_IDS_FILE)
+        matrix = sparse.csr_matrix(
+            (load_array(path, DATA_FILE), load_array(path, INDICES_FILE), load_array(path, INDPTR_FILE)),
+            shape=(len(product_ids), len(idf)),
+            copy=False,
+        )
+        return cls(
+            snapshot.version, vocabulary, idf, matrix, InvertedIndex.load(path, matrix), product_ids,
+            meta['stop_words'], meta['max_df'], snapshot.products_updated_before,
+        )
+
+
+class TextIndex:
+    """
+    Searchable product text: the published base index plus a delta of the
+    products saved since it was built.
+
+    Delta products are encoded with the base vocabulary and idf. Terms the
+    base doesn't know get extra columns, with an idf estimated from the
+    delta, so a new product is searchable by its new words right away.
+    The base rows of delta products are skipped when searching, and so are
+    the products missing from the catalog, which have been deleted.
+    A text index is never modified, polling creates a new one.
+
+    Args:
+        base: BaseTextIndex
+        delta: {product_id: Counter of terms} of products saved since the base,
+            least recently saved first
+        high_water: updated_at of the newest product seen
+        catalog_ids: Sorted IDs of the existing products, None to skip none
+        truncated: True if the delta was capped at TEXT_INDEX_MAX_DELTA
+    """
+    def __init__(self, base, delta=None, high_water=None, catalog_ids=None, truncated=False):
+        self.base = base
+        self.delta = delta or {}
+        self.high_water = high_water
+        self.catalog_ids = catalog_ids
+        self.truncated = truncated
+
+        base_terms = len(base.idf)
+        self.delta_ids = np.array(sorted(self.delta), dtype=np.int64)
+        if catalog_ids is None:
+            self.removed_ids = np.empty(0, dtype=np.int64)
+        else:
+            known_ids = np.union1d(base.product_ids, self.delta_ids)
+            self.removed_ids = known_ids[~np.isin(known_ids, catalog_ids, assume_unique=True)]
+        # Base rows that are never returned
+        self.skipped_ids = np.union1d(self.delta_ids, self.removed_ids)
+        document_frequency = Counter()
+        for terms in self.delta.values():
+            document_frequency.update(term for term in terms if term not in base.vocabulary)
+        num_documents = len(base.product_ids) + len(self.delta)
+        extra_terms = sorted(
+            term for term, count in document_frequency.items() if count <= base.max_df * num_documents
+        )
+        self.extra_vocabulary = {term: base_terms + i for i, term in enumerate(extra_terms)}
+        # Smoothed idf, like TfidfVectorizer
+        extra_idf = np.array([
+            np.log((1 + num_documents) / (1 + document_frequency[term])) + 1 for term in extra_terms
+        ])
+        self.vocabulary = ChainMap(base.vocabulary, self.extra_vocabulary)
+        self.idf = np.concatenate([np.asarray(base.idf, dtype=np.float64), extra_idf])
+
+        data, indices, indptr = [], [], [0]
+        for product_id in self.delta_ids.tolist():
+            columns = []
+            counts = []
+            for term, count in self.delta[product_id].items():
+                column = self.vocabulary.get(term)
+                if column is not None:
+                    columns.append(column)
+                    counts.append(count)
+            weights = np.array(counts, dtype=np.float64) * self.idf[columns]
+            norm = np.linalg.norm(weights)
+            data.extend((weights / norm if norm else weights).tolist())
+            indices.extend(columns)
+            indptr.append(len(indices))
+        self.delta_matrix = sparse.csr_matrix(
+            (data, indices, indptr), shape=(len(self.delta_ids), len(self.idf))
+        )
+
+    def __len__(self):
+        return len(self.base.product_ids) + len(self.delta_ids)
+
+    def tokenize(self, text):
+        """Terms of a product text, as the base vectorizer counts them"""
+        return Counter(token for token in tokenize(text) if token not in self.base.stop_words)
+
+    def search(self, query, k, min_score=0.0, accept=None):
+        """
+        Top-k products by cosine similarity with the query
+
+        Args:
+            query: The search query
+            k: Maximum number of results
+            min_score: Only products scoring more than this are returned
+            accept: Optional function mapping an array of product IDs to a boolean mask
+
+        Returns:
+            Tuple of (product IDs, scores), best first
+        """
+        columns, weights = encode_query(query, self.vocabulary, self.idf)
+        product_ids = [np.empty(0, dtype=np.int64)]
+        scores = [np.empty(0)]
+        if not len(columns):
+            return product_ids[0], scores[0]
+
+        base = self.base
+        in_base = columns < len(base.idf)
+        if base.index is not None and in_base.any():
+            def accept_rows(rows):
+                ids = base.product_ids[rows]
+                # Products in the delta are scored with their current text
+                mask = ~np.isin(ids, self.skipped_ids)
+                if accept is not None:
+                    mask &= accept(ids)
+                return mask
+
+            rows, base_scores = base.index.search(
+                columns[in_base], weights[in_base], k, min_score, accept=accept_rows
+            )
+            product_ids.append(base.product_ids[rows])
+            scores.append(base_scores)
+
+        if len(self.delta_ids):
+            query_vector = np.zeros(len(self.idf))
+            query_vector[columns] = weights
+            delta_scores = self.delta_matrix @ query_vector
+            keep = (delta_scores > min_score) & ~np.isin(self.delta_ids, self.removed_ids)
+            if accept is not None:
+                keep &= accept(self.delta_ids)
+            product_ids.append(self.delta_ids[keep])
+            scores.append(delta_scores[keep])
+
+        product_ids = np.concatenate(product_ids)
+        scores = np.concatenate(scores)
+        top = top_k_indices(scores, k)
+        return product_ids[top], scores[top]
+
+
+def poll_text_index(text_index):
+    """
+    Bring a text index up to date: switch to a newer published base, add
+    the products saved since the last poll to the delta, and skip the
+    products deleted from the catalog.
+
+    The delta keeps the TEXT_INDEX_MAX_DELTA most recently saved products,
+    it's re-encoded on every change. Older changes are searchable with
+    their text in the base index once build_text_index ran. Changes are
+    found through updated_at, QuerySet.update() calls must set it.
+
+    Returns:
+        The same text index if nothing changed, a new one otherwise
+    """
+    snapshot = get_latest_text_index()
+    version = snapshot.version if snapshot else None
+    if text_index is None or text_index.base.version != version:
+        base = BaseTextIndex.load(snapshot) if snapshot else BaseTextIndex()
+        # Without a base every product is in the delta, up to TEXT_INDEX_MAX_DELTA of them
+        since = base.updated_before
+        text_index = TextIndex(base, high_water=since)
+    else:
+        since = text_index.high_water
+
+    max_delta = getattr(settings, 'TEXT_INDEX_MAX_DELTA', 5000)
+    products = Product.objects.all()
+    if since is not None:
+        products = products.filter(updated_at__gte=since - POLL_OVERLAP)
+    # Newest first, so that only the products the delta keeps are read
+    changed = list(products.order_by('-updated_at', '-id').values_list(
+        'id', 'name', 'description', 'updated_at'
+    )[:max_delta + 1])
+    changed.reverse()
+
+    delta = dict(text_index.delta)
+    high_water = text_index.high_water
+    for product_id, name, description, updated_at in changed:
+        # Moved to the end, the most recently saved
+        delta.pop(product_id, None)
+        delta[product_id] = text_index.tokenize(product_text(name, description))
+        high_water = updated_at if high_water is None else max(high_water, updated_at)
+    truncated = text_index.truncated or len(delta) > max_delta
+    if len(delta) > max_delta:
+        for product_id in list(delta)[:len(delta) - max_delta]:
+            del delta[product_id]
+        if not text_index.truncated:
+            logger.warning(
+                'More than %d products changed since the text index was built (%s), the least recently saved '
+                'are searched with their indexed text or not at all. Run `manage.py build_text_index`.',
+                max_delta, version or 'no index built yet',
+            )
+
+    catalog_ids = get_catalog().ids
+    if delta == text_index.delta and catalog_ids is text_index.catalog_ids:
+        return text_index
+    return TextIndex(text_index.base, delta, high_water, catalog_ids, truncated)
+
+
+def get_text_index():
+    """
+    The current text index of this process.
+    Products saved in this process are indexed on the next search, through
+    signals. Products saved by other processes and newly published base
+    indexes are picked up at most TEXT_INDEX_REFRESH_INTERVAL seconds later.
+    """
+    global _text_index, _checked_at
+    interval = getattr(settings, 'TEXT_INDEX_REFRESH_INTERVAL', 5)
+    text_index = _text_index
+    if text_index is not None and _checked_at is not None and time.monotonic() - _checked_at < interval:
+        return text_index
+
+    # Only one thread polls, the others keep searching the previous index
+    if not _lock.acquire(blocking=text_index is None):
+        return text_index
+    try:
+        if _text_index is not None and _text_index is not text_index:
+            return _text_index
+        _text_index = poll_text_index(text_index)
+        _checked_at = time.monotonic()
+        return _text_index
+    finally:
+        _lock.release()
+
+
+def invalidate_text_index():
+    """Poll for changed products on the next search"""
+    global _checked_at
+    _checked_at = None
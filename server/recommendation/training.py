@@ -0,0 +1,275 @@
+from django.conf import settings
+from store.models import NavigationArchive, ProductNavigation
+import numpy as np
+from tensorflow.keras.models import Model
+from tensorflow.keras.layers import Input, Embedding, Flatten, Dense, Concatenate, Dot, Add, Activation
+from datetime import timedelta
+from django.utils import timezone
+from recommendation.ann import IVFIndex
+from recommendation.data import IdMap, load_navigations
+from recommendation.neural_network import ModelState, RecommendationModel, get_architecture
+from recommendation.similarity import load_similar_products_table
+from recommendation.snapshots import save_snapshot
+
+
+class RecommendationTrainer(RecommendationModel):
+    """
+    Trains the recommendation model with Keras and publishes it as a snapshot.
+    Only the trainer process (`manage.py train_recommender`) imports this
+    module, web workers serve the exported weights with NumPy.
+    """
+    def _build_state(self, snapshot, artifacts):
+        """Also load the Keras model, incremental training fine-tunes it"""
+        model = self._create_model(
+            snapshot.num_users, snapshot.num_products, snapshot.embedding_size, snapshot.architecture
+        )
+        model.load_weights(artifacts['weights_path'])
+        return super()._build_state(snapshot, artifacts).replace(model=model)
+
+    def _create_model(self, num_users, num_products, embedding_size=50, architecture=None):
+        """
+        Create a neural network model for collaborative filtering.
+        The architecture is chosen with the RECOMMENDATION_ARCHITECTURE setting:
+        'mlp' (default) or 'dot'
+        """
+        architecture = architecture or get_architecture()
+        if architecture == 'dot':
+            return self._create_dot_model(num_users, num_products, embedding_size)
+
+        # User embedding
+        user_input = Input(shape=(1,), name='user_input')
+        user_embedding = Embedding(num_users, embedding_size, name='user_embedding')(user_input)
+        user_vec = Flatten(name='flatten_users')(user_embedding)
+        
+        # Product embedding
+        product_input = Input(shape=(1,), name='product_input')
+        product_embedding = Embedding(num_products, embedding_size, name='product_embedding')(product_input)
+        product_vec = Flatten(name='flatten_products')(product_embedding)
+        
+        # Concatenate embeddings
+        concat = Concatenate()([user_vec, product_vec])
+        
+        # Hidden layers
+        dense1 = Dense(128, activation='relu')(concat)
+        dense2 = Dense(64, activation='relu')(dense1)
+        
+        # Output layer
+        output = Dense(1, activation='sigmoid')(dense2)
+        
+        # Create and compile model
+        model = Model(inputs=[user_input, product_input], outputs=output)
+        model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
+        
+        return model
+
+    def _create_dot_model(self, num_users, num_products, embedding_size=50):
+        """
+        Create a biased matrix factorization model: the score is the dot product
+        of the user and product embeddings plus a per-user and per-product bias.
+        Ranking all products for a user is then a single matrix-vector product.
+        """
+        user_input = Input(shape=(1,), name='user_input')
+        user_embedding = Embedding(num_users, embedding_size, name='user_embedding')(user_input)
+        user_vec = Flatten(name='flatten_users')(user_embedding)
+        user_bias = Flatten(name='flatten_user_bias')(Embedding(num_users, 1, name='user_bias')(user_input))
+
+        product_input = Input(shape=(1,), name='product_input')
+        product_embedding = Embedding(num_products, embedding_size, name='product_embedding')(product_input)
+        product_vec = Flatten(name='flatten_products')(product_embedding)
+        product_bias = Flatten(name='flatten_product_bias')(Embedding(num_products, 1, name='product_bias')(product_input))
+
+        dot = Dot(axes=1)([user_vec, product_vec])
+        logit = Add()([dot, user_bias, product_bias])
+        output = Activation('sigmoid')(logit)
+
+        model = Model(inputs=[user_input, product_input], outputs=output)
+        model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
+
+        return model
+    
+    def train(self, force=False, full=False):
+        """
+        Train the recommendation model if it is stale.
+        Meant to be called from the trainer process (`manage.py train_recommender`),
+        never from a request.
+
+        When a published model exists, training is incremental: the previous
+        embeddings are kept, grown for newly seen users and products and
+        fine-tuned only on navigations recorded after the last high-water mark.
+
+        Training is single-flight: while one thread trains, other calls return
+        immediately and the previous model keeps being served.
+
+        Args:
+            force: Train even if the published model is still fresh
+            full: Rebuild the model from the entire navigation history
+
+        Returns:
+            True if a new model was trained and published
+        """
+        if not self._train_lock.acquire(blocking=False):
+            return False
+        try:
+            return self._train(force, full)
+        finally:
+            self._train_lock.release()
+
+    def _train(self, force, full):
+        # Start from the newest published snapshot before deciding to retrain
+        self.load_latest()
+        state = self.state
+
+        # A model of another architecture can't be fine-tuned
+        incremental = state.model is not None and not full and state.architecture == get_architecture()
+
+        # Get product navigation data, only the new rows when fine-tuning.
+        # Old navigations are in the archive, new ones may be if the model is old enough.
+        after_id = state.last_navigation_id if incremental else 0
+        navigations = ProductNavigation.objects.filter(user__isnull=False, id__gt=after_id)
+        archives = list(NavigationArchive.objects.filter(max_id__gt=after_id))
+
+        # Check if we need to retrain
+        if not force and not self.needs_training(state, navigations):
+            return False
+
+        if not incremental and not navigations.exists() and not archives:
+            return False
+            
+        # Load user/product ID columns straight into arrays
+        events = load_navigations(navigations, archives=archives, after_id=after_id)
+        state = self.fit(state, events, incremental)
+
+        snapshot = save_snapshot(state, num_events=len(events['user_ids']))
+        table, meta = load_similar_products_table(snapshot.path)
+        self._publish(state.replace(
+            similar_products_table=table,
+            similar_products_meta=meta,
+            version=snapshot.version,
+            snapshot_path=snapshot.path,
+            last_trained=snapshot.created_at,
+        ))
+        return True
+
+    def fit(self, state, events, incremental=False, epochs=None):
+        """
+        Fit a model on navigation events, without touching the database
+
+        Args:
+            state: ModelState of the published model
+            events: Event arrays, as returned by load_navigations
+            incremental: Fine-tune a grown copy of the model of state instead of building a new one
+            epochs: Passes over the events, 10 for a new model and
+                RECOMMENDATION_INCREMENTAL_EPOCHS when fine-tuning by default
+
+        Returns:
+            The new ModelState, not saved or published yet
+        """
+        last_navigation_id = int(events['ids'].max()) if len(events['ids']) else state.last_navigation_id
+        
+        if incremental:
+            # Keep existing indices and append the newly seen IDs
+            user_ids, product_ids, model = self._grow_model(state, events['user_ids'], events['product_ids'])
+            user_mapping = IdMap(user_ids)
+            product_mapping = IdMap(product_ids)
+            user_indices = user_mapping.lookup(events['user_ids'])
+            product_indices = product_mapping.lookup(events['product_ids'])
+            architecture = state.architecture
+            default_epochs = getattr(settings, 'RECOMMENDATION_INCREMENTAL_EPOCHS', 2)
+        else:
+            # Create ID maps, np.unique returns the IDs already sorted
+            users, user_indices = np.unique(events['user_ids'], return_inverse=True)
+            products, product_indices = np.unique(events['product_ids'], return_inverse=True)
+            user_mapping = IdMap(users, np.arange(len(users)))
+            product_mapping = IdMap(products, np.arange(len(products)))
+            architecture = get_architecture()
+            model = self._create_model(len(users), len(products), architecture=architecture)
+            default_epochs = 10
+        
+        if len(user_indices):
+            # Each navigation is a positive interaction
+            labels = np.ones(len(user_indices), dtype=np.float32)
+            
+            model.fit(
+                [user_indices, product_indices],
+                labels,
+                epochs=epochs or default_epochs,
+                batch_size=64,
+                verbose=0
+            )
+        
+        # Extract product embeddings and index them for similarity search
+        product_embeddings, user_embeddings, product_bias, dense_layers = self._extract_embeddings(model, architecture)
+        
+        return ModelState(
+            model=model,
+            user_mapping=user_mapping,
+            product_mapping=product_mapping,
+            product_ids=product_mapping.ids,
+            product_embeddings=product_embeddings,
+            similarity_index=IVFIndex.build(product_embeddings),
+            user_embeddings=user_embeddings,
+            product_bias=product_bias,
+            dense_layers=dense_layers,
+            architecture=architecture,
+            last_navigation_id=last_navigation_id,
+        )
+
+    def needs_training(self, state, new_navigations):
+        """
+        A model is retrained when there is none yet, when it is older than
+        24 hours or when RECOMMENDATION_RETRAIN_MIN_EVENTS new navigations
+        have been recorded since it was trained
+        """
+        if state.model is None or state.last_trained is None:
+            return True
+        if timezone.now() - state.last_trained >= timedelta(hours=24):
+            return True
+        min_events = getattr(settings, 'RECOMMENDATION_RETRAIN_MIN_EVENTS', 1000)
+        return new_navigations.filter(id__gt=state.last_navigation_id).count() >= min_events
+
+    def _grow_model(self, state, users, products):
+        """
+        Append newly seen users and products to the ID arrays and build a copy
+        of the model with large enough embedding tables. The published model
+        is never fitted in place, it is still serving requests.
+
+        Returns:
+            Tuple of (user_ids, product_ids, model), position == index
+        """
+        user_ids = np.concatenate([state.user_mapping.ids, np.setdiff1d(users, state.user_mapping.ids)])
+        product_ids = np.concatenate([state.product_mapping.ids, np.setdiff1d(products, state.product_mapping.ids)])
+
+        old_model = state.model
+        embedding_size = old_model.get_layer('product_embedding').get_weights()[0].shape[1]
+        model = self._create_model(len(user_ids), len(product_ids), embedding_size, state.architecture)
+
+        # Both models share the architecture, so layers line up one to one
+        for old_layer, layer in zip(old_model.layers, model.layers):
+            weights = old_layer.get_weights()
+            if isinstance(layer, Embedding):
+                # New rows keep their fresh random initialization
+                grown = layer.get_weights()[0]
+                grown[:weights[0].shape[0]] = weights[0]
+                weights = [grown]
+            layer.set_weights(weights)
+
+        return user_ids, product_ids, model
+
+    def _extract_embeddings(self, model, architecture):
+        """
+        Copy the weights needed for inference out of the Keras model: the
+        embedding tables, plus the product biases for 'dot' or the Dense
+        layers for 'mlp'
+
+        Returns:
+            Tuple of (product_embeddings, user_embeddings, product_bias, dense_layers)
+        """
+        product_embeddings = model.get_layer('product_embedding').get_weights()[0]
+        user_embeddings = model.get_layer('user_embedding').get_weights()[0]
+        if architecture == 'dot':
+            product_bias = model.get_layer('product_bias').get_weights()[0].ravel()
+            return product_embeddings, user_embeddings, product_bias, None
+        dense_layers = tuple(
+            tuple(layer.get_weights()) for layer in model.layers if isinstance(layer, Dense)
+        )
+        return product_embeddings, user_embeddings, None, dense_layers
@@ -1,171 +1,249 @@
-"""
-Django settings for smartbuy project.
-
-Generated by 'django-admin startproject' using Django 5.1.7.
-
-For more information on this file, see
-https://docs.djangoproject.com/en/5.1/topics/settings/
-
-For the full list of settings and their values, see
-https://docs.djangoproject.com/en/5.1/ref/settings/
-"""
-
-from pathlib import Path
-from datetime import timedelta
-import os
-import environ
-
-env = environ.Env()
-environ.Env.read_env('.env')
-
-# Build paths inside the project like this: BASE_DIR / 'subdir'.
-BASE_DIR = Path(__file__).resolve().parent.parent
-
-
-# Quick-start development settings - unsuitable for production
-# See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
-
-# SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = env('SECRET_KEY')
-# SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
-
-ALLOWED_HOSTS = ['*']
-
-
-# Application definition
-
-INSTALLED_APPS = [
-    'django.contrib.admin',
-    'django.contrib.auth',
-    'django.contrib.contenttypes',
-    'django.contrib.sessions',
-    'django.contrib.messages',
-    'django.contrib.staticfiles',
-    'rest_framework',
-    'rest_framework_simplejwt',
-    'corsheaders',
-    'core.apps.CoreConfig',
-    'store.apps.StoreConfig',
-    'recommendation.apps.RecommendationConfig'
-]
-
-MIDDLEWARE = [
-    'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'corsheaders.middleware.CorsMiddleware',
-]
-
-ROOT_URLCONF = 'smartbuy.urls'
-
-TEMPLATES = [
-    {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
-        'APP_DIRS': True,
-        'OPTIONS': {
-            'context_processors': [
-                'django.template.context_processors.debug',
-                'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
-            ],
-        },
-    },
-]
-
-WSGI_APPLICATION = 'smartbuy.wsgi.application'
-
-
-# Database
-# https://docs.djangoproject.com/en/5.1/ref/settings/#databases
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
-}
-
-
-# Password validation
-# https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
-
-AUTH_PASSWORD_VALIDATORS = [
-    {
-        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
-    },
-]
-
-
-# Internationalization
-# https://docs.djangoproject.com/en/5.1/topics/i18n/
-
-LANGUAGE_CODE = 'en-us'
-
-TIME_ZONE = 'Europe/Kyiv'
-
-USE_I18N = True
-
-USE_TZ = True
-
-
-# Static files (CSS, JavaScript, Images)
-# https://docs.djangoproject.com/en/5.1/howto/static-files/
-
-STATIC_URL = 'static/'
-STATIC_ROOT = os.path.join(BASE_DIR, 'static')
-
-# Default primary key field type
-# https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
-
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
-
-REST_FRAMEWORK = {
-    'DEFAULT_PERMISSION_CLASSES': (
-        'rest_framework.permissions.IsAuthenticated',
-    ),
-    'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 10
-}
-
-
-SIMPLE_JWT = {
-    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
-    'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
-    'USER_ID_FIELD': 'id',
-    'USER_ID_CLAIM': 'id',
-    'ALGORITHM': 'HS256',
-    'SIGNING_KEY': SECRET_KEY,
-}
-
-AUTH_USER_MODEL = 'core.User'
-CORS_ALLOW_CREDENTIALS = True
-CORS_ALLOWED_ORIGINS = [
-    'http://localhost:5173',
-]
-
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-MEDIA_URL = 'media/'
-
-SUPERUSER_EMAIL = env('SUPERUSER_EMAIL')
-SUPERUSER_PASSWORD = env('SUPERUSER_PASSWORD')
-ADMIN_EMAIL = env('ADMIN_EMAIL')
-ADMIN_PASSWORD = env('ADMIN_PASSWORD')
\ No newline at end of file
+"""
+Django settings for smartbuy project.
+
+Generated by 'django-admin startproject' using Django 5.1.7.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.1/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/5.1/ref/settings/
+"""
+
+from pathlib import Path
+from datetime import timedelta
+import os
+import environ
+
+env = environ.Env()
+environ.Env.read_env('.env')
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = env('SECRET_KEY')
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = True
+
+ALLOWED_HOSTS = ['*']
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'rest_framework',
+    'rest_framework_simplejwt',
+    'corsheaders',
+    'core.apps.CoreConfig',
+    'store.apps.StoreConfig',
+    'recommendation.apps.RecommendationConfig'
+]
+
+MIDDLEWARE = [
+    # First, so the queries of the other middleware are counted too
+    'core.middleware.QueryStatsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+]
+
+ROOT_URLCONF = 'smartbuy.urls'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'smartbuy.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Shared by all worker processes on the host
+    'recommendations': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'recommendations'),
+    },
+    'statistics': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'statistics'),
+    },
+}
+
+
+# Password validation
+# https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/5.1/topics/i18n/
+
+LANGUAGE_CODE = 'en-us'
+
+TIME_ZONE = 'Europe/Kyiv'
+
+USE_I18N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/5.1/howto/static-files/
+
+STATIC_URL = 'static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+REST_FRAMEWORK = {
+    'DEFAULT_PERMISSION_CLASSES': (
+        'rest_framework.permissions.IsAuthenticated',
+    ),
+    'DEFAULT_AUTHENTICATION_CLASSES': (
+        'rest_framework_simplejwt.authentication.JWTAuthentication',
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'PAGE_SIZE': 10
+}
+
+
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    'USER_ID_FIELD': 'id',
+    'USER_ID_CLAIM': 'id',
+    'ALGORITHM': 'HS256',
+    'SIGNING_KEY': SECRET_KEY,
+}
+
+AUTH_USER_MODEL = 'core.User'
+CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOWED_ORIGINS = [
+    'http://localhost:5173',
+]
+
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MEDIA_URL = 'media/'
+
+SUPERUSER_EMAIL = env('SUPERUSER_EMAIL')
+SUPERUSER_PASSWORD = env('SUPERUSER_PASSWORD')
+ADMIN_EMAIL = env('ADMIN_EMAIL')
+ADMIN_PASSWORD = env('ADMIN_PASSWORD')
+
+RECOMMENDATION_ARTIFACTS_DIR = os.path.join(BASE_DIR, 'recommendation_artifacts')
+# Model snapshots and text indexes kept on disk, at least the current and the previous one.
+# Older ones are deleted once replaced for RECOMMENDATION_SNAPSHOT_GRACE_PERIOD seconds,
+# longer than workers take to switch to a new one
+RECOMMENDATION_KEEP_SNAPSHOTS = 3
+RECOMMENDATION_SNAPSHOT_GRACE_PERIOD = 600
+# 'mlp' - dense layers over concatenated embeddings, 'dot' - biased dot product (cheaper to serve)
+RECOMMENDATION_ARCHITECTURE = 'mlp'
+RECOMMENDATION_REFRESH_INTERVAL = 60
+RECOMMENDATION_RETRAIN_MIN_EVENTS = 1000
+RECOMMENDATION_INCREMENTAL_EPOCHS = 2
+RECOMMENDATION_LOADER_CHUNK_SIZE = 50000
+RECOMMENDATION_SIMILAR_PRODUCTS = 100
+# Bytes of similarity blocks computed at once while building the similar-products table,
+# the rows per block shrink as the catalog grows
+RECOMMENDATION_SIMILAR_PRODUCTS_MEMORY = 1024 * 1024 * 1024
+# Inverted lists scanned per similar-products query, higher is more accurate and slower
+RECOMMENDATION_ANN_NPROBE = 8
+# One stored ranking per user, query parameters, model version and catalog, reused for RECOMMENDATION_CURSOR_TTL
+# seconds. The first RECOMMENDATION_CURSOR_MAX_ITEMS products of a ranking are stored, later pages rank again.
+RECOMMENDATION_CURSOR_CACHE = 'recommendations'
+RECOMMENDATION_CURSOR_TTL = 600
+RECOMMENDATION_CURSOR_MAX_ITEMS = 1000
+RECOMMENDATION_SEARCH_MAX_RESULTS = 1000
+# Seconds between polls for products saved by other processes, and for a newer text index
+TEXT_INDEX_REFRESH_INTERVAL = 5
+# build_text_index --loop rebuilds once this many products changed since the last build
+TEXT_INDEX_REBUILD_MIN_CHANGES = 1000
+# Products saved since the last build that each worker keeps in its in-memory delta,
+# a warning asks to run build_text_index when more changed
+TEXT_INDEX_MAX_DELTA = 5000
+
+# Trending scores halve every this many hours, run reconcile_popularity after changing it
+POPULARITY_TRENDING_HALF_LIFE_HOURS = 24
+
+# 'best_effort' - product views are queued and inserted in batches by a background thread,
+# 'sync' - every view is inserted before the response is sent
+NAVIGATION_DURABILITY = 'best_effort'
+NAVIGATION_FLUSH_SIZE = 500
+NAVIGATION_FLUSH_INTERVAL = 2
+# Seconds during which repeat views of a product by the same user are recorded once, 0 records every view
+NAVIGATION_DEDUPE_WINDOW = 0
+# Navigations older than this many days are moved to daily segment files by `manage.py archive_navigations`
+NAVIGATION_RETENTION_DAYS = 90
+NAVIGATION_ARCHIVE_DIR = os.path.join(BASE_DIR, 'navigation_archive')
+# Seconds between checks for segments archived by other processes
+NAVIGATION_ARCHIVE_REFRESH_INTERVAL = 60
+
+# Dashboard statistics are cached for this many seconds, writes to products, categories and orders clear them
+STATISTICS_CACHE = 'statistics'
+STATISTICS_CACHE_TTL = 60
+
+# Per-request SQL query counts and timings, sent as response headers when QUERY_STATS_HEADERS is on
+# and aggregated per endpoint at /statistics/queries
+QUERY_STATS_ENABLED = True
+QUERY_STATS_HEADERS = DEBUG
+QUERY_STATS_SLOWEST = 5
+
+# Seconds between checks of the in-memory catalog snapshot for changes made by other processes
+CATALOG_REFRESH_INTERVAL = 60
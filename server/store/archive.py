@@ -0,0 +1,273 @@
+import os
+import logging
+import threading
+from datetime import datetime, time, timedelta
+from time import monotonic
+from zipfile import BadZipFile
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from store.models import NavigationArchive, ProductNavigation
+
+# user_id of anonymous navigations and source_product_id of external ones
+NO_ID = -1
+EVENT_COLUMNS = ('ids', 'user_ids', 'product_ids', 'source_product_ids', 'created_at')
+SEGMENT_COLUMNS = EVENT_COLUMNS + ('search_queries',)
+
+logger = logging.getLogger(__name__)
+
+_user_counts = None  # (archive marker, user IDs, counts)
+_checked_at = None
+_lock = threading.Lock()
+
+
+def get_archive_dir():
+    return getattr(settings, 'NAVIGATION_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'navigation_archive'))
+
+
+def day_bounds(day):
+    """Start and end of a local calendar day"""
+    return (
+        timezone.make_aware(datetime.combine(day, time.min)),
+        timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min)),
+    )
+
+
+def rows_to_columns(rows):
+    """Columns of (id, user_id, destination, source, search query, created_at) rows"""
+    ids, user_ids, product_ids, source_ids, queries, created_at = zip(*rows)
+    return {
+        'ids': np.array(ids, dtype=np.int64),
+        'user_ids': np.array([NO_ID if u is None else u for u in user_ids], dtype=np.int64),
+        'product_ids': np.array(product_ids, dtype=np.int64),
+        'source_product_ids': np.array([NO_ID if s is None else s for s in source_ids], dtype=np.int64),
+        'created_at': np.fromiter((int(dt.timestamp()) for dt in created_at), dtype=np.int64, count=len(rows)),
+        'search_queries': np.array([q or '' for q in queries], dtype=str),
+    }
+
+
+def build_segment(columns):
+    """
+    Add the daily aggregates to the event columns: navigations per product
+    and per (user, product) pair
+    """
+    product_ids, product_counts = np.unique(columns['product_ids'], return_counts=True)
+    with_user = columns['user_ids'] != NO_ID
+    pairs, pair_counts = np.unique(
+        np.stack([columns['user_ids'][with_user], columns['product_ids'][with_user]], axis=1).reshape(-1, 2),
+        axis=0, return_counts=True,
+    )
+    return dict(
+        columns,
+        daily_product_ids=product_ids,
+        daily_product_counts=product_counts,
+        daily_user_ids=pairs[:, 0],
+        daily_user_product_ids=pairs[:, 1],
+        daily_user_counts=pair_counts,
+    )
+
+
+def write_segment(day, segment):
+    """Save a segment next to the others, the file only appears once complete"""
+    directory = get_archive_dir()
+    os.makedirs(directory, exist_ok=True)
+    ids = segment['ids']
+    path = os.path.join(directory, f'{day.isoformat()}-{ids[0]}-{ids[-1]}.npz')
+    tmp_path = path[:-len('.npz')] + '.tmp.npz'
+    np.savez_compressed(tmp_path, **segment)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_segment(archive, names=EVENT_COLUMNS):
+    """Load some columns of an archived segment, the others are not decompressed"""
+    with np.load(archive.path) as segment:
+        return {name: segment[name] for name in names}
+
+
+def iter_archived_navigations(archives=None, names=EVENT_COLUMNS):
+    """
+    Yield (archive, columns) for every archived segment, oldest first
+
+    Args:
+        archives: NavigationArchive rows, all of them if None
+        names: Columns to load
+    """
+    if archives is None:
+        archives = NavigationArchive.objects.all()
+    for archive in archives:
+        try:
+            yield archive, read_segment(archive, names)
+        except FileNotFoundError:
+            # Merged into a new segment by a compaction while reading
+            continue
+
+
+def archive_navigations(retention_days=None):
+    """
+    Move the navigations older than the retention period out of the table,
+    one segment file per local calendar day. Only whole days are archived.
+
+    Returns:
+        List of the created NavigationArchive rows
+    """
+    if retention_days is None:
+        retention_days = getattr(settings, 'NAVIGATION_RETENTION_DAYS', 90)
+    cutoff, _ = day_bounds(timezone.localdate() - timedelta(days=retention_days))
+
+    archives = []
+    while True:
+        oldest = ProductNavigation.objects.filter(created_at__lt=cutoff).order_by('created_at').values_list(
+            'created_at', flat=True
+        ).first()
+        if oldest is None:
+            return archives
+        archives.append(archive_day(timezone.localdate(oldest)))
+
+
+def archive_day(day, delete_batch_size=500):
+    start, end = day_bounds(day)
+    rows = list(ProductNavigation.objects.filter(created_at__gte=start, created_at__lt=end).order_by('id').values_list(
+        'id', 'user_id', 'destination_product_id', 'source_product_id', 'search_query', 'created_at'
+    ))
+    segment = build_segment(rows_to_columns(rows))
+    # Written before the rows are deleted, an interrupted run rewrites the same file
+    path = write_segment(day, segment)
+
+    ids = segment['ids'].tolist()
+    with transaction.atomic():
+        archive = NavigationArchive.objects.create(
+            day=day,
+            path=path,
+            min_id=ids[0],
+            max_id=ids[-1],
+            num_events=len(ids),
+            num_user_events=int((segment['user_ids'] != NO_ID).sum()),
+        )
+        # Moved, not deleted: no post_delete signals, the daily navigation rollups keep counting them
+        for i in range(0, len(ids), delete_batch_size):
+            ProductNavigation.objects.filter(id__in=ids[i:i + delete_batch_size])._raw_delete(
+                ProductNavigation.objects.db
+            )
+    transaction.on_commit(invalidate_archive_counts)
+    return archive
+
+
+def compact_archives():
+    """
+    Merge the segments of days archived in several runs, which happens when
+    navigations are recorded late with an old created_at. A day with a
+    segment that can't be read is left as it is, its rows are never deleted.
+
+    Returns:
+        Number of days merged
+    """
+    days = NavigationArchive.objects.values('day').annotate(segments=Count('id')).filter(
+        segments__gt=1
+    ).values_list('day', flat=True)
+
+    merged = 0
+    for day in list(days):
+        archives = list(NavigationArchive.objects.filter(day=day))
+        try:
+            segments = [read_segment(archive, SEGMENT_COLUMNS) for archive in archives]
+        except (OSError, BadZipFile, KeyError, ValueError):
+            logger.exception('Failed to read the archive segments of %s, the day is not compacted', day)
+            continue
+        columns = {name: np.concatenate([segment[name] for segment in segments]) for name in SEGMENT_COLUMNS}
+        order = np.argsort(columns['ids'], kind='stable')
+        segment = build_segment({name: values[order] for name, values in columns.items()})
+        path = write_segment(day, segment)
+
+        with transaction.atomic():
+            NavigationArchive.objects.filter(id__in=[archive.id for archive in archives]).delete()
+            NavigationArchive.objects.create(
+                day=day,
+                path=path,
+                min_id=int(segment['ids'][0]),
+                max_id=int(segment['ids'][-1]),
+                num_events=len(segment['ids']),
+                num_user_events=int((segment['user_ids'] != NO_ID).sum()),
+            )
+        for archive in archives:
+            if archive.path != path and os.path.exists(archive.path):
+                os.remove(archive.path)
+        merged += 1
+    if merged:
+        invalidate_archive_counts()
+    return merged
+
+
+def sum_counts(ids, counts):
+    """Sum the counts of equal IDs, returns (sorted unique IDs, totals)"""
+    if not ids:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    unique, inverse = np.unique(np.concatenate(ids), return_inverse=True)
+    return unique, np.bincount(inverse, weights=np.concatenate(counts), minlength=len(unique)).astype(np.int64)
+
+
+def archived_product_counts():
+    """
+    Archived navigations per product, read from the daily aggregates only
+
+    Returns:
+        Tuple of (sorted product IDs, counts)
+    """
+    ids, counts = [], []
+    for _, segment in iter_archived_navigations(names=('daily_product_ids', 'daily_product_counts')):
+        ids.append(segment['daily_product_ids'])
+        counts.append(segment['daily_product_counts'])
+    return sum_counts(ids, counts)
+
+
+def get_archived_user_counts():
+    """
+    Archived navigations per user, computed once per process and again only
+    after the archive changes. The archive is checked at most once per
+    NAVIGATION_ARCHIVE_REFRESH_INTERVAL seconds.
+
+    Returns:
+        Tuple of (sorted user IDs, counts)
+    """
+    global _user_counts, _checked_at
+    interval = getattr(settings, 'NAVIGATION_ARCHIVE_REFRESH_INTERVAL', 60)
+    user_counts = _user_counts
+    if user_counts is not None and _checked_at is not None and monotonic() - _checked_at < interval:
+        return user_counts[1:]
+
+    # Only one thread reads the archive, the others keep using the previous totals
+    if not _lock.acquire(blocking=user_counts is None):
+        return user_counts[1:]
+    try:
+        if _user_counts is not None and _user_counts is not user_counts:
+            return _user_counts[1:]
+        marker = tuple(NavigationArchive.objects.aggregate(count=Count('id'), max_id=Max('max_id')).values())
+        if user_counts is None or user_counts[0] != marker:
+            ids, counts = [], []
+            for _, segment in iter_archived_navigations(names=('daily_user_ids', 'daily_user_counts')):
+                ids.append(segment['daily_user_ids'])
+                counts.append(segment['daily_user_counts'])
+            user_counts = (marker, *sum_counts(ids, counts))
+        _user_counts = user_counts
+        _checked_at = monotonic()
+        return user_counts[1:]
+    finally:
+        _lock.release()
+
+
+def count_archived_user_navigations(user_id):
+    """Archived navigations of a user, see get_archived_user_counts"""
+    user_ids, counts = get_archived_user_counts()
+    position = int(np.searchsorted(user_ids, user_id))
+    if position < len(user_ids) and user_ids[position] == user_id:
+        return int(counts[position])
+    return 0
+
+
+def invalidate_archive_counts():
+    """Check the archive on next use"""
+    global _checked_at
+    _checked_at = None
@@ -0,0 +1,301 @@
+import time
+import threading
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from store.models import Category, Product, ProductPopularity
+from store.popularity import get_trending_half_life, get_trending_scale
+
+SORTS = ('newest', 'priceLowToHigh', 'priceHighToLow', 'popularity', 'trending')
+# Products saved just before a refresh may commit after it, so every patch
+# reads this far back again. Patching a row twice is harmless.
+PATCH_OVERLAP = timedelta(seconds=30)
+
+_catalog = None
+_checked_at = None
+_lock = threading.Lock()
+
+
+class Catalog:
+    """
+    Columnar snapshot of the product catalog: one NumPy array per column,
+    rows ordered by product ID, plus a product x category bitmap packed
+    eight categories to a byte. Filters are boolean masks and sorts are
+    argsorts over these arrays, no Product rows are loaded per request.
+
+    A catalog is never modified once built, refreshing creates a new one.
+    """
+    def __init__(self, ids, prices, created_at, category_ids, category_bits, navigations, trending, marker=None):
+        self.ids = ids
+        self.prices = prices
+        self.created_at = created_at
+        self.category_ids = category_ids  # Category ID of every bitmap column
+        self.category_bits = category_bits
+        self.navigations = navigations
+        self.trending = trending
+        self.marker = marker  # Summary of the product tables the catalog was built from
+        self._ranks = {}  # Position of every row in each sort order, computed on first use
+
+    @classmethod
+    def build(cls):
+        marker = get_catalog_marker()
+        rows = Product.objects.order_by('id').values_list('id', 'price', 'created_at')
+        count = len(rows)
+        ids = np.empty(count, dtype=np.int64)
+        prices = np.empty(count, dtype=np.float64)
+        created_at = np.empty(count, dtype=np.float64)
+        for i, (product_id, price, created) in enumerate(rows):
+            ids[i] = product_id
+            prices[i] = price
+            created_at[i] = created.timestamp()
+
+        category_ids = np.fromiter(
+            Category.objects.order_by('id').values_list('id', flat=True), dtype=np.int64
+        )
+        links = np.array(
+            Product.categories.through.objects.values_list('product_id', 'category_id'), dtype=np.int64
+        ).reshape(-1, 2)
+        bitmap = np.zeros((count, len(category_ids)), dtype=bool)
+        rows_found, row_positions = lookup(ids, links[:, 0])
+        columns_found, column_positions = lookup(category_ids, links[:, 1])
+        found = rows_found & columns_found
+        bitmap[row_positions[found], column_positions[found]] = True
+
+        navigations, trending = load_popularity(ids)
+        return cls(
+            ids, prices, created_at, category_ids, np.packbits(bitmap, axis=1),
+            navigations, trending, marker,
+        )
+
+    def with_popularity(self):
+        """Copy of the catalog with the popularity columns read again"""
+        navigations, trending = load_popularity(self.ids)
+        return Catalog(
+            self.ids, self.prices, self.created_at, self.category_ids, self.category_bits,
+            navigations, trending, self.marker,
+        )
+
+    def patch(self, marker):
+        """
+        Copy of the catalog with the products saved or deleted since it was
+        built patched in, reading only the changed rows. Added and removed
+        categories, or category links changed without saving their product,
+        need a full build, and so does a newest save that went back in time.
+
+        Args:
+            marker: The current get_catalog_marker()
+
+        Returns:
+            The patched Catalog, None if it must be rebuilt
+        """
+        if self.marker is None or self.marker[1] is None or marker[3] != self.marker[3]:
+            return None
+        if marker[1] is None or marker[1] < self.marker[1]:
+            # The newest products were deleted or rolled back
+            return None
+        rows = list(Product.objects.filter(updated_at__gte=self.marker[1] - PATCH_OVERLAP).order_by('id').values_list(
+            'id', 'price', 'created_at'
+        ))
+        changed_ids = np.array([product_id for product_id, _, _ in rows], dtype=np.int64)
+        keep = ~np.isin(self.ids, changed_ids)
+        if keep.sum() + len(changed_ids) != marker[0]:
+            # Products were deleted
+            keep &= np.isin(self.ids, np.fromiter(Product.objects.values_list('id', flat=True), dtype=np.int64))
+
+        links = np.array(
+            Product.categories.through.objects.filter(product_id__in=changed_ids.tolist()).values_list(
+                'product_id', 'category_id'
+            ),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        bitmap = np.zeros((len(changed_ids), len(self.category_ids)), dtype=bool)
+        rows_found, row_positions = lookup(changed_ids, links[:, 0])
+        columns_found, column_positions = lookup(self.category_ids, links[:, 1])
+        found = rows_found & columns_found
+        bitmap[row_positions[found], column_positions[found]] = True
+
+        # Saved products keep their counters until the next popularity refresh
+        previous_found, previous_rows = lookup(self.ids, changed_ids)
+        navigations = np.where(previous_found, self.navigations[previous_rows], 0) if len(self.ids) else 0
+        trending = np.where(previous_found, self.trending[previous_rows], 0.0) if len(self.ids) else 0.0
+
+        ids = np.concatenate([self.ids[keep], changed_ids])
+        order = np.argsort(ids, kind='stable')
+        catalog = Catalog(
+            ids[order],
+            np.concatenate([self.prices[keep], [float(price) for _, price, _ in rows]])[order],
+            np.concatenate([self.created_at[keep], [created.timestamp() for _, _, created in rows]])[order],
+            self.category_ids,
+            np.concatenate([self.category_bits[keep], np.packbits(bitmap, axis=1)])[order],
+            np.concatenate([self.navigations[keep], np.broadcast_to(navigations, len(changed_ids))])[order],
+            np.concatenate([self.trending[keep], np.broadcast_to(trending, len(changed_ids))])[order],
+            marker,
+        )
+        if len(catalog) != marker[0] or np.unpackbits(catalog.category_bits).sum() != marker[2]:
+            return None
+        return catalog
+
+    def __len__(self):
+        return len(self.ids)
+
+    def mask(self, price_min=None, price_max=None, category_ids=None, rows=None):
+        """
+        Boolean mask of the rows that pass the filters.
+        A product passes the category filter if it is in any of the categories.
+
+        Args:
+            price_min: Lowest price, no limit if None
+            price_max: Highest price, no limit if None
+            category_ids: Category IDs, no filter if empty
+            rows: Only compute the mask for these row positions
+        """
+        if rows is None:
+            rows = slice(None)
+        prices = self.prices[rows]
+        mask = np.ones(len(prices), dtype=bool)
+        if price_min is not None:
+            mask &= prices >= price_min
+        if price_max is not None:
+            mask &= prices <= price_max
+        if category_ids:
+            found, columns = lookup(self.category_ids, np.asarray(category_ids, dtype=np.int64))
+            selected = np.zeros(len(self.category_ids), dtype=bool)
+            selected[columns[found]] = True
+            query_bits = np.packbits(selected)
+            mask &= (self.category_bits[rows] & query_bits).any(axis=1)
+        return mask
+
+    def filter_mask(self, product_ids, price_min=None, price_max=None, category_ids=None):
+        """
+        Mask over product_ids of the products that exist and pass the filters
+
+        Returns:
+            Boolean array aligned with product_ids
+        """
+        found, rows = lookup(self.ids, product_ids)
+        mask = np.zeros(len(rows), dtype=bool)
+        mask[found] = self.mask(price_min, price_max, category_ids, rows=rows[found])
+        return mask
+
+    def ranks(self, sort_param):
+        """Position of every row in the given sort order"""
+        if sort_param not in self._ranks:
+            if sort_param == 'newest':
+                order = np.lexsort((self.ids, -self.created_at))
+            elif sort_param == 'priceLowToHigh':
+                order = np.lexsort((self.ids, self.prices))
+            elif sort_param == 'priceHighToLow':
+                order = np.lexsort((self.ids, -self.prices))
+            elif sort_param == 'popularity':
+                order = np.lexsort((self.ids, -self.navigations))
+            else:
+                order = np.lexsort((self.ids, -self.trending))
+            ranks = np.empty(len(order), dtype=np.int64)
+            ranks[order] = np.arange(len(order))
+            self._ranks[sort_param] = ranks
+        return self._ranks[sort_param]
+
+    def sort(self, product_ids, sort_param):
+        """
+        Order product IDs by one of SORTS, ties broken by product ID.
+        IDs that aren't in the catalog are dropped.
+
+        Returns:
+            Array of product IDs
+        """
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+        found, rows = lookup(self.ids, product_ids)
+        rows = rows[found]
+        return self.ids[rows[np.argsort(self.ranks(sort_param)[rows], kind='stable')]]
+
+    def ordered_ids(self, sort_param):
+        """All product IDs in the given sort order"""
+        order = np.empty(len(self.ids), dtype=np.int64)
+        order[self.ranks(sort_param)] = np.arange(len(self.ids))
+        return self.ids[order]
+
+
+def lookup(sorted_ids, values):
+    """
+    Positions of values in a sorted ID array
+
+    Returns:
+        Tuple of (found mask, positions), positions are only valid where found
+    """
+    values = np.asarray(values, dtype=np.int64)
+    positions = np.searchsorted(sorted_ids, values)
+    positions[positions == len(sorted_ids)] = 0
+    found = sorted_ids[positions] == values if len(sorted_ids) else np.zeros(len(values), dtype=bool)
+    return found, positions
+
+
+def load_popularity(ids):
+    """Navigation counts and trending scores decayed to now, aligned with the catalog rows"""
+    navigations = np.zeros(len(ids), dtype=np.int64)
+    trending = np.zeros(len(ids), dtype=np.float64)
+    counters = np.array(
+        ProductPopularity.objects.values_list('product_id', 'navigations', 'trending_score', 'trending_epoch'),
+        dtype=np.float64,
+    ).reshape(-1, 4)
+    found, rows = lookup(ids, counters[:, 0].astype(np.int64))
+    navigations[rows[found]] = counters[found, 1]
+    anchor = timezone.now().timestamp() / get_trending_half_life().total_seconds()
+    trending[rows[found]] = counters[found, 2] * get_trending_scale(counters[found, 3], anchor)
+    return navigations, trending
+
+
+def get_catalog_marker():
+    """
+    Cheap summary of the product tables. It changes when a product is
+    created, updated or deleted, or when category links are added or removed,
+    also by another process.
+    """
+    products = Product.objects.aggregate(count=Count('id'), updated_at=Max('updated_at'))
+    return (
+        products['count'],
+        products['updated_at'],
+        Product.categories.through.objects.count(),
+        Category.objects.count(),
+    )
+
+
+def get_catalog():
+    """
+    The current catalog snapshot of this process.
+    Changes made in this process are picked up at once through signals.
+    Changes by other processes, and the popularity counters, are checked at
+    most once per CATALOG_REFRESH_INTERVAL seconds.
+    """
+    global _catalog, _checked_at
+    interval = getattr(settings, 'CATALOG_REFRESH_INTERVAL', 60)
+    catalog = _catalog
+    if catalog is not None and _checked_at is not None and time.monotonic() - _checked_at < interval:
+        return catalog
+
+    # Only one thread refreshes, the others keep using the previous snapshot
+    if not _lock.acquire(blocking=catalog is None):
+        return catalog
+    try:
+        if _catalog is not None and _catalog is not catalog:
+            return _catalog
+        marker = get_catalog_marker() if catalog is not None else None
+        if catalog is None:
+            catalog = Catalog.build()
+        elif catalog.marker != marker:
+            catalog = catalog.patch(marker) or Catalog.build()
+        else:
+            catalog = catalog.with_popularity()
+        _catalog = catalog
+        _checked_at = time.monotonic()
+        return catalog
+    finally:
+        _lock.release()
+
+
+def invalidate_catalog():
+    """Check the catalog against the database on next use, changed rows are patched in"""
+    global _checked_at
+    _checked_at = None
@@ -0,0 +1,40 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from store.archive import archive_navigations, compact_archives
+
+
+class Command(BaseCommand):
+    help = 'Move navigations older than the retention period to daily archive segments and merge split days'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Retention period in days (default: NAVIGATION_RETENTION_DAYS)'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and archive every --interval seconds'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=86400,
+            help='Seconds between runs in --loop mode (default: 86400)'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else getattr(settings, 'NAVIGATION_RETENTION_DAYS', 90)
+        while True:
+            archives = archive_navigations(days)
+            merged = compact_archives()
+            self.stdout.write(self.style.SUCCESS(
+                f'Archived {sum(archive.num_events for archive in archives)} navigations older than {days} days '
+                f'into {len(archives)} daily segments, merged {merged} split days'
+            ))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,40 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+from store.metrics import backfill_daily_metrics
+from store.models import NavigationArchive, Order, Product, ProductNavigation
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily metric rollups (revenue, orders, new products, navigations) from the tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Number of past days to recompute, today included (default: 365)'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute every day since the oldest order, product or navigation'
+        )
+
+    def handle(self, *args, **options):
+        end = timezone.localdate()
+        start = end - timedelta(days=options['days'] - 1)
+        if options['all']:
+            oldest = [
+                model.objects.aggregate(oldest=Min('created_at'))['oldest']
+                for model in (Order, Product, ProductNavigation)
+            ]
+            days = [timezone.localdate(created_at) for created_at in oldest if created_at]
+            oldest_archive = NavigationArchive.objects.aggregate(oldest=Min('day'))['oldest']
+            if oldest_archive:
+                days.append(oldest_archive)
+            start = min(days, default=end)
+
+        rows = backfill_daily_metrics(start, end)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {rows} daily metrics from {start} to {end}'))
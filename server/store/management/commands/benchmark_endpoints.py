@@ -0,0 +1,203 @@
+import io
+import sys
+import json
+import time
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from wsgiref.util import setup_testing_defaults
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.utils import timezone
+from core.models import Session, User
+from store.models import Category, Product, ProductNavigation, ProductPopularity
+
+# Endpoint name -> (path template, who requests it). Product pages record a navigation per request.
+ENDPOINTS = {
+    'products': ('/products?page={page}', 'anonymous'),
+    'product': ('/product/{product_id}/', 'anonymous'),
+    'recommendation': ('/recommendation/', 'user'),
+    'similar': ('/similar/{product_id}/', 'anonymous'),
+    'popular-categories': ('/popular-categories', 'anonymous'),
+    'statistics': ('/statistics', 'admin'),
+}
+
+
+class WSGITarget:
+    """Calls the Django WSGI application in this process, the whole middleware stack included"""
+    def __init__(self):
+        self.application = get_wsgi_application()
+
+    def get(self, path, token=None):
+        path, _, query = path.partition('?')
+        environ = {'PATH_INFO': path, 'QUERY_STRING': query, 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr}
+        if token:
+            environ['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        setup_testing_defaults(environ)
+        status = []
+        result = self.application(environ, lambda response_status, headers, exc_info=None: status.append(response_status))
+        try:
+            for _ in result:
+                pass
+        finally:
+            # Fires request_finished, which closes the database connection of the thread
+            result.close()
+        return int(status[0].split()[0])
+
+
+class HTTPTarget:
+    """Requests a running server"""
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def get(self, path, token=None):
+        request = urllib.request.Request(self.base_url + path)
+        if token:
+            request.add_header('Authorization', f'Bearer {token}')
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+def summarize(latencies, statuses, wall_time):
+    latencies = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    codes, counts = np.unique(statuses, return_counts=True)
+    return {
+        'requests': len(latencies),
+        'errors': int(sum(1 for status in statuses if status >= 400)),
+        'status_codes': {str(code): int(count) for code, count in zip(codes, counts)},
+        'throughput_rps': round(len(latencies) / wall_time, 1),
+        'mean_ms': round(float(latencies.mean()), 2),
+        'p50_ms': round(float(p50), 2),
+        'p95_ms': round(float(p95), 2),
+        'p99_ms': round(float(p99), 2),
+        'max_ms': round(float(latencies.max()), 2),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Request the main API endpoints concurrently and report p50/p95/p99 latency and throughput as JSON. '
+        'Runs the WSGI application in this process by default, or requests a running server with --base-url.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoints', nargs='+', choices=list(ENDPOINTS), default=list(ENDPOINTS),
+                            help='Endpoints to benchmark (default: all)')
+        parser.add_argument('--requests', type=int, default=500, help='Measured requests per endpoint (default: 500)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients (default: 8)')
+        parser.add_argument('--warmup', type=int, default=20,
+                            help='Unmeasured requests per endpoint before measuring (default: 20)')
+        parser.add_argument('--users', type=int, default=50,
+                            help='Users the authenticated requests are spread over (default: 50)')
+        parser.add_argument('--pages', type=int, default=10, help='Product list pages requested (default: 10)')
+        parser.add_argument('--base-url', default=None,
+                            help='Request a running server, e.g. http://127.0.0.1:8000, instead of the WSGI app')
+        parser.add_argument('--output', default=None, help='Write the JSON report to this file instead of stdout')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of the request mix (default: 0)')
+
+    def handle(self, *args, **options):
+        if options['base_url'] and not urlsplit(options['base_url']).scheme:
+            raise CommandError('--base-url needs a scheme, e.g. http://127.0.0.1:8000')
+        rng = np.random.default_rng(options['seed'])
+
+        # Hot products are requested more often, like in production
+        popularity = list(ProductPopularity.objects.values_list('product_id', 'navigations'))
+        if not popularity:
+            popularity = [(product_id, 0) for product_id in Product.objects.values_list('id', flat=True)]
+        if not popularity:
+            raise CommandError('No products found in database. Run generate_fixture_data first.')
+        product_ids = np.array([product_id for product_id, _ in popularity])
+        weights = np.array([navigations + 1 for _, navigations in popularity], dtype=np.float64)
+        product_p = weights / weights.sum()
+
+        users = list(User.objects.filter(is_admin=False, is_superuser=False).order_by('id')[:options['users']])
+        admin = User.objects.filter(is_admin=True).first()
+        accounts = {'user': users, 'admin': [admin] if admin else []}
+        for name in options['endpoints']:
+            role = ENDPOINTS[name][1]
+            if role != 'anonymous' and not accounts[role]:
+                raise CommandError(f'{name} needs a {role} account, none found')
+
+        target = HTTPTarget(options['base_url']) if options['base_url'] else WSGITarget()
+        count = options['warmup'] + options['requests']
+        report = {
+            'started_at': timezone.now().isoformat(),
+            'target': options['base_url'] or 'wsgi',
+            'concurrency': options['concurrency'],
+            'requests_per_endpoint': options['requests'],
+            'dataset': {
+                'products': len(product_ids),
+                'categories': Category.objects.count(),
+                'users': User.objects.count(),
+                'navigations': ProductNavigation.objects.count(),
+            },
+            'endpoints': {},
+        }
+        # Sessions of the benchmark accounts, deleted afterwards
+        sessions = []
+        tokens = {'anonymous': [None], 'user': [], 'admin': []}
+        try:
+            for role, role_users in accounts.items():
+                for user in role_users:
+                    session = Session.objects.create(user=user)
+                    sessions.append(session.id)
+                    tokens[role].append(user.generate_tokens(session.id)[0])
+
+            for name in options['endpoints']:
+                template, role = ENDPOINTS[name]
+                # Drawn up front so the request mix is the same in every run
+                pages = rng.integers(1, options['pages'] + 1, count).tolist()
+                products = rng.choice(product_ids, count, p=product_p).tolist()
+                clients = rng.integers(len(tokens[role]), size=count).tolist()
+                requests = [
+                    (template.format(page=page, product_id=product_id), tokens[role][client])
+                    for page, product_id, client in zip(pages, products, clients)
+                ]
+                for path, token in requests[:options['warmup']]:
+                    target.get(path, token)
+                self.stderr.write(f'{name}: {options["requests"]} requests...')
+                report['endpoints'][name] = dict(
+                    path=template,
+                    **self.run(target, requests[options['warmup']:], options['concurrency']),
+                )
+        finally:
+            Session.objects.filter(id__in=sessions).delete()
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Report written to {options["output"]}'))
+        else:
+            self.stdout.write(output)
+
+    def run(self, target, requests, concurrency):
+        latencies = [None] * len(requests)
+        statuses = [None] * len(requests)
+        next_request = iter(range(len(requests)))
+        lock = threading.Lock()
+
+        def client():
+            while True:
+                with lock:
+                    i = next(next_request, None)
+                if i is None:
+                    return
+                path, token = requests[i]
+                started = time.perf_counter()
+                statuses[i] = target.get(path, token)
+                latencies[i] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for future in [executor.submit(client) for _ in range(concurrency)]:
+                future.result()
+        return summarize(latencies, statuses, time.perf_counter() - started)
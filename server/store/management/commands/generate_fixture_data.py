@@ -0,0 +1,205 @@
+import time
+import uuid
+from datetime import timedelta
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from store.metrics import backfill_daily_metrics
+from store.models import Category, Product, ProductNavigation
+from store.popularity import reconcile_popularity
+from store.statistics import invalidate_statistics
+
+User = get_user_model()
+
+BRANDS = ['Acme', 'Nova', 'Orion', 'Vertex', 'Zenith', 'Pulse', 'Lumen', 'Apex', 'Sonic', 'Echo']
+ADJECTIVES = ['wireless', 'smart', 'portable', 'gaming', 'premium', 'compact', 'ultra', 'mini', 'pro', 'classic']
+NOUNS = [
+    'phone', 'laptop', 'speaker', 'headphones', 'monitor', 'keyboard', 'mouse', 'camera', 'watch', 'tablet',
+    'charger', 'router', 'printer', 'television', 'microphone', 'projector', 'drone', 'console',
+]
+FIRST_NAMES = ['Olena', 'Andrii', 'Maria', 'Taras', 'Iryna', 'Dmytro', 'Sofia', 'Ivan', 'Anna', 'Petro']
+LAST_NAMES = ['Shevchenko', 'Kovalenko', 'Bondarenko', 'Tkachenko', 'Kravchenko', 'Melnyk', 'Boyko', 'Koval']
+
+
+def power_law(n, alpha, rng):
+    """Probabilities proportional to rank^-alpha, ranks shuffled over n items"""
+    weights = np.arange(1, n + 1, dtype=np.float64) ** -alpha
+    return rng.permutation(weights / weights.sum())
+
+
+def insert_navigations(rows):
+    """
+    Insert (user_id, source_product_id, destination_product_id, search_query, created_at) rows.
+    Written as one INSERT statement, bulk_create would replace created_at with the current time.
+    """
+    meta = ProductNavigation._meta
+    fields = [meta.get_field(name) for name in ('user', 'source_product', 'destination_product', 'search_query', 'created_at')]
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    sql = f'INSERT INTO {connection.ops.quote_name(meta.db_table)} ({columns}) VALUES (%s, %s, %s, %s, %s)'
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            (*row[:4], connection.ops.adapt_datetimefield_value(row[4]))
+            for row in rows
+        ])
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk-create categories, products, users and navigations with power-law popularity, '
+        'to reproduce production scale locally'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=50, help='Categories to create (default: 50)')
+        parser.add_argument('--products', type=int, default=10000, help='Products to create (default: 10000)')
+        parser.add_argument('--users', type=int, default=2000, help='Users to create (default: 2000)')
+        parser.add_argument('--navigations', type=int, default=500000,
+                            help='Navigations to create over all products and users (default: 500000)')
+        parser.add_argument('--days', type=int, default=90,
+                            help='Navigations and products are spread over this many past days (default: 90)')
+        parser.add_argument('--alpha', type=float, default=1.1,
+                            help='Power-law exponent of product and category popularity (default: 1.1)')
+        parser.add_argument('--user-alpha', type=float, default=0.8,
+                            help='Power-law exponent of user activity (default: 0.8)')
+        parser.add_argument('--anonymous', type=float, default=0.2,
+                            help='Share of navigations without a user (default: 0.2)')
+        parser.add_argument('--password', default='password', help='Password of the created users (default: password)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per insert (default: 5000)')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed, for reproducible data')
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        batch_size = options['batch_size']
+        now = timezone.now()
+        period = timedelta(days=options['days'])
+        started = time.perf_counter()
+
+        categories = self.create_categories(options['categories'], rng)
+        if options['products'] and not Category.objects.exists():
+            raise CommandError('Products need at least one category, pass --categories')
+        self.create_products(options['products'], options['alpha'], now - period, period, rng, batch_size)
+        self.create_users(options['users'], options['password'], rng, batch_size)
+        self.stdout.write(
+            f'Created {len(categories)} categories, {options["products"]} products and {options["users"]} users'
+        )
+
+        if options['navigations']:
+            self.create_navigations(options, now - period, period, rng)
+
+        self.stdout.write('Reconciling popularity counters and daily metrics...')
+        reconcile_popularity()
+        today = timezone.localdate()
+        backfill_daily_metrics(timezone.localdate(now - period), today)
+        invalidate_statistics()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Done in {time.perf_counter() - started:.1f}s. '
+            'Run train_recommender --full and build_text_index --force to serve the new data.'
+        ))
+
+    def create_categories(self, count, rng):
+        existing = set(Category.objects.values_list('name', flat=True))
+        names = []
+        number = len(existing)
+        while len(names) < count:
+            number += 1
+            name = f'{NOUNS[number % len(NOUNS)].title()}s {number}'
+            if name not in existing:
+                names.append(name)
+        return Category.objects.bulk_create([
+            Category(name=name, description=' '.join(rng.choice(ADJECTIVES, 3)) + ' ' + name.lower())
+            for name in names
+        ])
+
+    def create_products(self, count, alpha, since, period, rng, batch_size):
+        if not count:
+            return
+        category_ids = np.array(Category.objects.values_list('id', flat=True))
+        category_p = power_law(len(category_ids), alpha, rng)
+        links = Product.categories.through
+
+        for offset in range(0, count, batch_size):
+            size = min(batch_size, count - offset)
+            products = Product.objects.bulk_create([
+                Product(
+                    name=f'{rng.choice(BRANDS)} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}',
+                    description=' '.join(rng.choice(ADJECTIVES + NOUNS, 12)),
+                    price=round(float(rng.lognormal(4, 1)) + 1, 2),
+                )
+                for _ in range(size)
+            ])
+            # Creation dates are spread over the period, bulk_update leaves updated_at alone
+            offsets = np.sort(rng.integers(0, int(period.total_seconds()), size))
+            for product, seconds in zip(products, offsets.tolist()):
+                product.created_at = since + timedelta(seconds=seconds)
+            Product.objects.bulk_update(products, ['created_at'], batch_size=500)
+
+            product_links = []
+            for product in products:
+                num_categories = min(int(rng.integers(1, 4)), len(category_ids))
+                for category_id in rng.choice(category_ids, num_categories, replace=False, p=category_p).tolist():
+                    product_links.append(links(product_id=product.id, category_id=category_id))
+            links.objects.bulk_create(product_links)
+
+    def create_users(self, count, password, rng, batch_size):
+        if not count:
+            return
+        # Hashing is slow on purpose, every user shares one hash
+        password = make_password(password)
+        run = uuid.uuid4().hex[:8]
+        User.objects.bulk_create([
+            User(
+                email=f'user{i}.{run}@example.com',
+                first_name=str(rng.choice(FIRST_NAMES)),
+                last_name=str(rng.choice(LAST_NAMES)),
+                dob=timezone.localdate() - timedelta(days=int(rng.integers(18 * 365, 70 * 365))),
+                password=password,
+            )
+            for i in range(count)
+        ], batch_size=batch_size)
+
+    def create_navigations(self, options, since, period, rng):
+        products = list(Product.objects.values_list('id', 'name'))
+        if not products:
+            raise CommandError('No products found in database. Please add products first.')
+        product_ids = np.array([product_id for product_id, _ in products])
+        queries = [' '.join(name.lower().split()[-2:]) for _, name in products]
+        product_p = power_law(len(products), options['alpha'], rng)
+        user_ids = np.array(User.objects.filter(is_admin=False, is_superuser=False).values_list('id', flat=True))
+        user_p = power_law(len(user_ids), options['user_alpha'], rng) if len(user_ids) else None
+
+        total = options['navigations']
+        batch_size = options['batch_size']
+        seconds = period.total_seconds()
+        for offset in range(0, total, batch_size):
+            size = min(batch_size, total - offset)
+            destinations = rng.choice(len(products), size, p=product_p)
+            sources = rng.choice(len(products), size, p=product_p)
+            users = rng.choice(user_ids, size, p=user_p) if user_p is not None else np.full(size, -1)
+            anonymous = (rng.random(size) < options['anonymous']) | (users == -1)
+            # 40% come from another product page, 30% from search, the rest from outside
+            kinds = rng.random(size)
+            # Each batch covers its own slice of the period so IDs grow with time, like recorded events
+            created_at = np.sort(rng.uniform(offset / total * seconds, (offset + size) / total * seconds, size))
+
+            rows = []
+            for i in range(size):
+                destination = int(destinations[i])
+                source, query = None, None
+                if kinds[i] < 0.4 and sources[i] != destination:
+                    source = int(product_ids[sources[i]])
+                elif 0.4 <= kinds[i] < 0.7:
+                    query = queries[destination]
+                rows.append((
+                    None if anonymous[i] else int(users[i]),
+                    source,
+                    int(product_ids[destination]),
+                    query,
+                    since + timedelta(seconds=float(created_at[i])),
+                ))
+            with transaction.atomic():
+                insert_navigations(rows)
+            self.stdout.write(f'  {offset + size}/{total} navigations')
@@ -0,0 +1,30 @@
+import time
+from django.core.management.base import BaseCommand
+from store.popularity import reconcile_popularity
+
+
+class Command(BaseCommand):
+    help = 'Recompute product and category popularity counters and trending scores from navigations'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and reconcile every --interval seconds'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=3600,
+            help='Seconds between runs in --loop mode (default: 3600)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            products, categories = reconcile_popularity()
+            self.stdout.write(self.style.SUCCESS(
+                f'Reconciled popularity of {products} products and {categories} categories'
+            ))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,117 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from store.archive import day_bounds
+from store.models import DailyMetric, NavigationArchive, Order, Product, ProductNavigation
+
+METRICS = [metric for metric, _ in DailyMetric.METRIC_CHOICES]
+# Longest range a chart can ask for, every day of it is returned
+MAX_RANGE_DAYS = 3660
+
+
+def add_to_metric(metric, delta, day=None):
+    """Add delta to the total of a metric on a local calendar day, today by default"""
+    if not delta:
+        return
+    day = day or timezone.localdate()
+    updated = DailyMetric.objects.filter(metric=metric, day=day).update(
+        value=F('value') + delta,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        DailyMetric.objects.get_or_create(metric=metric, day=day)
+        DailyMetric.objects.filter(metric=metric, day=day).update(value=F('value') + delta)
+
+
+def record_order_change(previous=None, current=None):
+    """
+    Update the order and revenue rollups after an order was created, changed
+    or deleted. Only completed orders count as revenue.
+
+    Args:
+        previous: (status, total, created_at) before the change, None for a new order
+        current: (status, total, created_at) after the change, None for a deleted order
+    """
+    deltas = defaultdict(Decimal)
+    for state, sign in ((previous, -1), (current, 1)):
+        if state is None:
+            continue
+        order_status, total, created_at = state
+        day = timezone.localdate(created_at)
+        deltas['orders', day] += sign
+        if order_status == 'completed':
+            deltas['revenue', day] += sign * Decimal(total)
+
+    with transaction.atomic():
+        for (metric, day), delta in deltas.items():
+            add_to_metric(metric, delta, day)
+
+
+def count_by_day(queryset, start, end, aggregate):
+    """(local day, value) of a queryset grouped by created_at day, over [start, end]"""
+    start_at, _ = day_bounds(start)
+    _, end_at = day_bounds(end)
+    return queryset.filter(created_at__gte=start_at, created_at__lt=end_at).annotate(
+        day=TruncDate('created_at')
+    ).values('day').annotate(value=aggregate).values_list('day', 'value')
+
+
+def backfill_daily_metrics(start, end):
+    """
+    Recompute the rollups of the days in [start, end] from the tables,
+    navigations also from the archive. Scans every row of the range once,
+    the incremental updates keep the rollups current afterwards.
+
+    Returns:
+        Number of DailyMetric rows written
+    """
+    values = defaultdict(Decimal)
+    sources = (
+        ('orders', Order.objects.all(), Count('id')),
+        ('revenue', Order.objects.filter(status='completed'), Sum('total')),
+        ('products', Product.objects.all(), Count('id')),
+        ('navigations', ProductNavigation.objects.all(), Count('id')),
+    )
+    for metric, queryset, aggregate in sources:
+        for day, value in count_by_day(queryset, start, end, aggregate):
+            values[metric, day] += value or 0
+    archived = NavigationArchive.objects.filter(day__gte=start, day__lte=end).values('day').annotate(
+        value=Sum('num_events')
+    ).values_list('day', 'value')
+    for day, value in archived:
+        values['navigations', day] += value
+
+    rollups = [
+        DailyMetric(metric=metric, day=day, value=value)
+        for (metric, day), value in values.items() if value
+    ]
+    with transaction.atomic():
+        DailyMetric.objects.filter(day__gte=start, day__lte=end).delete()
+        DailyMetric.objects.bulk_create(rollups)
+    return len(rollups)
+
+
+def get_daily_series(metrics, start, end):
+    """
+    Daily values of metrics over [start, end], read from the rollups only.
+    Days without a rollup are zero.
+
+    Returns:
+        Dictionary with the list of days and one list of values per metric
+    """
+    num_days = (end - start).days + 1
+    series = {metric: [0] * num_days for metric in metrics}
+    rollups = DailyMetric.objects.filter(metric__in=metrics, day__gte=start, day__lte=end).values_list(
+        'metric', 'day', 'value'
+    )
+    for metric, day, value in rollups:
+        series[metric][(day - start).days] = float(value) if metric == 'revenue' else int(value)
+    return {
+        'days': [(start + timedelta(days=i)).isoformat() for i in range(num_days)],
+        **series,
+    }
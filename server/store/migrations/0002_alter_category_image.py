@@ -1,18 +1,18 @@
-# Generated by Django 5.1.7 on 2025-04-02 15:48
-
-from django.db import migrations, models
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ('store', '0001_initial'),
-    ]
-
-    operations = [
-        migrations.AlterField(
-            model_name='category',
-            name='image',
-            field=models.FileField(blank=True, null=True, upload_to='categories/'),
-        ),
-    ]
+# Generated by Django 5.1.7 on 2025-04-02 15:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='image',
+            field=models.FileField(blank=True, null=True, upload_to='categories/'),
+        ),
+    ]
@@ -1,22 +1,22 @@
-# Generated by Django 5.1.7 on 2025-04-07 10:08
-
-from django.db import migrations, models
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ('store', '0002_alter_category_image'),
-    ]
-
-    operations = [
-        migrations.RemoveField(
-            model_name='product',
-            name='category',
-        ),
-        migrations.AddField(
-            model_name='product',
-            name='categories',
-            field=models.ManyToManyField(related_name='products', to='store.category'),
-        ),
-    ]
+# Generated by Django 5.1.7 on 2025-04-07 10:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0002_alter_category_image'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='product',
+            name='category',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='categories',
+            field=models.ManyToManyField(related_name='products', to='store.category'),
+        ),
+    ]
@@ -1,25 +1,25 @@
-# Generated by Django 5.1.7 on 2025-04-14 09:51
-
-import django.utils.timezone
-from django.db import migrations, models
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ('store', '0006_productnavigation_search_query_and_more'),
-    ]
-
-    operations = [
-        migrations.AddField(
-            model_name='cartitem',
-            name='created_at',
-            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
-            preserve_default=False,
-        ),
-        migrations.AddField(
-            model_name='cartitem',
-            name='updated_at',
-            field=models.DateTimeField(auto_now=True),
-        ),
-    ]
+# Generated by Django 5.1.7 on 2025-04-14 09:51
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0006_productnavigation_search_query_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cartitem',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='cartitem',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
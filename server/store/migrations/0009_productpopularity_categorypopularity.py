@@ -0,0 +1,59 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_popularity(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    Category = apps.get_model('store', 'Category')
+    ProductPopularity = apps.get_model('store', 'ProductPopularity')
+    CategoryPopularity = apps.get_model('store', 'CategoryPopularity')
+
+    ProductPopularity.objects.bulk_create([
+        ProductPopularity(product_id=product_id, navigations=count)
+        for product_id, count in Product.objects.annotate(
+            count=models.Count('destination_navigations')
+        ).values_list('id', 'count')
+    ])
+    CategoryPopularity.objects.bulk_create([
+        CategoryPopularity(category_id=category_id, navigations=count)
+        for category_id, count in Category.objects.annotate(
+            count=models.Count('products__destination_navigations')
+        ).values_list('id', 'count')
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0008_delete_productview'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryPopularity',
+            fields=[
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='store.category')),
+                ('navigations', models.PositiveBigIntegerField(default=0)),
+                ('trending_score', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-navigations'], name='store_categ_navigat_f4ff78_idx'), models.Index(fields=['-trending_score'], name='store_categ_trendin_0e651b_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductPopularity',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='store.product')),
+                ('navigations', models.PositiveBigIntegerField(default=0)),
+                ('trending_score', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-navigations'], name='store_produ_navigat_2ee58b_idx'), models.Index(fields=['-trending_score'], name='store_produ_trendin_dc41bc_idx')],
+            },
+        ),
+        migrations.RunPython(populate_popularity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0010_alter_product_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NavigationArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(db_index=True)),
+                ('path', models.CharField(max_length=500)),
+                ('min_id', models.BigIntegerField()),
+                ('max_id', models.BigIntegerField(db_index=True)),
+                ('num_events', models.PositiveIntegerField()),
+                ('num_user_events', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['day', 'min_id'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='productnavigation',
+            name='store_produ_user_id_41ca0b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='productnavigation',
+            name='store_produ_source__06d84e_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='productnavigation',
+            name='store_produ_destina_e63e14_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='productnavigation',
+            name='store_produ_search__622b28_idx',
+        ),
+    ]
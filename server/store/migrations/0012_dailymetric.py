@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0011_navigationarchive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('revenue', 'Revenue'), ('orders', 'Orders'), ('products', 'New products'), ('navigations', 'Navigations')], max_length=20)),
+                ('day', models.DateField()),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('metric', 'day'), name='unique_daily_metric')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0012_dailymetric'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categorypopularity',
+            name='trending_epoch',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='productpopularity',
+            name='trending_epoch',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,210 @@
+import os
+import time
+import atexit
+import logging
+import threading
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+
+from core.models import User
+from store.metrics import add_to_metric
+from store.models import Product, ProductNavigation
+from store.popularity import record_navigations
+
+logger = logging.getLogger(__name__)
+
+DURABILITIES = ('best_effort', 'sync')
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+class NavigationRecorder:
+    """
+    Write-behind buffer for ProductNavigation events.
+
+    Page views only append to an in-memory queue, a background thread
+    inserts the queued events with one bulk_create whenever `batch_size`
+    events are waiting or every `flush_interval` seconds, so concurrent
+    requests don't each take the database write lock.
+    bulk_create doesn't send post_save, so the popularity counters are
+    updated by the recorder itself.
+
+    With durability 'sync' every event is flushed before record() returns
+    and a database error is raised to the caller.
+    With 'best_effort' events still queued when the process is killed are
+    lost, a normal shutdown drains the queue.
+
+    Args:
+        batch_size: Queued events that trigger a flush
+        flush_interval: Seconds between flushes of a non-empty queue
+        dedupe_window: Seconds during which repeat views of a product by the
+            same user are recorded once, 0 records every view
+        durability: One of DURABILITIES
+        max_pending: Events kept queued while the database is failing,
+            the oldest are dropped beyond it
+    """
+    def __init__(self, batch_size=500, flush_interval=2.0, dedupe_window=0, durability='best_effort',
+                 max_pending=100000):
+        if durability not in DURABILITIES:
+            raise ValueError(f'Unknown navigation durability {durability!r}, expected one of {DURABILITIES}')
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dedupe_window = dedupe_window
+        self.durability = durability
+        self.max_pending = max_pending
+        self._queue = []
+        self._last_seen = {}  # (user_id, product_id) -> monotonic time of the last recorded view
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._pid = None
+
+    def record(self, destination_product_id, user_id=None, source_product_id=None, search_query=None):
+        """
+        Queue one navigation
+
+        Returns:
+            False if the view was dropped as a repeat within the dedupe window
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.dedupe_window and user_id is not None:
+                # Anonymous views can't be told apart, they are all recorded
+                key = (user_id, destination_product_id)
+                last_seen = self._last_seen.get(key)
+                if last_seen is not None and now - last_seen < self.dedupe_window:
+                    return False
+                self._last_seen[key] = now
+            self._queue.append(ProductNavigation(
+                user_id=user_id,
+                source_product_id=source_product_id,
+                search_query=search_query,
+                destination_product_id=destination_product_id,
+            ))
+            pending = len(self._queue)
+
+        if self.durability == 'sync':
+            self.flush()
+        else:
+            self._ensure_thread()
+            if pending >= self.batch_size:
+                self._wakeup.set()
+        return True
+
+    def flush(self):
+        """
+        Insert every queued event
+
+        Returns:
+            Number of events inserted
+        """
+        with self._flush_lock:
+            with self._lock:
+                navigations, self._queue = self._queue, []
+                self._forget_seen(time.monotonic())
+            if not navigations:
+                return 0
+            try:
+                return self._insert(navigations)
+            except Exception:
+                if self.durability == 'sync':
+                    # The request fails like a direct insert would
+                    raise
+                logger.exception('Failed to record %d navigations, they will be retried', len(navigations))
+                # The transaction was rolled back, but bulk_create may have set primary keys
+                for navigation in navigations:
+                    navigation.pk = None
+                with self._lock:
+                    self._queue[:0] = navigations
+                    del self._queue[:-self.max_pending]
+                return 0
+
+    def _insert(self, navigations):
+        try:
+            return self._insert_atomic(navigations)
+        except IntegrityError:
+            # A product or user was deleted after the view, drop its events
+            navigations = drop_dangling_navigations(navigations)
+            for navigation in navigations:
+                navigation.pk = None
+            return self._insert_atomic(navigations)
+
+    def _insert_atomic(self, navigations):
+        """
+        Insert the events and update the counters and the daily metric in one
+        transaction, so a failed flush leaves nothing behind to be inserted twice
+        """
+        with transaction.atomic():
+            ProductNavigation.objects.bulk_create(navigations, batch_size=self.batch_size)
+            record_navigations([navigation.destination_product_id for navigation in navigations])
+            add_to_metric('navigations', len(navigations))
+        return len(navigations)
+
+    def _forget_seen(self, now):
+        if self._last_seen:
+            self._last_seen = {
+                key: seen for key, seen in self._last_seen.items() if now - seen < self.dedupe_window
+            }
+
+    def _ensure_thread(self):
+        # A forked worker inherits the queue but not the thread
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                self._queue = []  # The parent process records these
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='navigation-recorder', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+            close_old_connections()
+
+    def stop(self):
+        """Stop the background thread and flush what is still queued"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+
+def drop_dangling_navigations(navigations):
+    """Keep the navigations whose products and user still exist"""
+    product_ids = {n.destination_product_id for n in navigations}
+    product_ids |= {n.source_product_id for n in navigations if n.source_product_id is not None}
+    user_ids = {n.user_id for n in navigations if n.user_id is not None}
+    existing_products = set(Product.objects.filter(id__in=product_ids).values_list('id', flat=True))
+    existing_users = set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+    return [
+        n for n in navigations
+        if n.destination_product_id in existing_products
+        and (n.source_product_id is None or n.source_product_id in existing_products)
+        and (n.user_id is None or n.user_id in existing_users)
+    ]
+
+
+def get_navigation_recorder():
+    """The navigation recorder of this process, configured from the NAVIGATION_* settings"""
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                recorder = NavigationRecorder(
+                    batch_size=getattr(settings, 'NAVIGATION_FLUSH_SIZE', 500),
+                    flush_interval=getattr(settings, 'NAVIGATION_FLUSH_INTERVAL', 2.0),
+                    dedupe_window=getattr(settings, 'NAVIGATION_DEDUPE_WINDOW', 0),
+                    durability=getattr(settings, 'NAVIGATION_DURABILITY', 'best_effort'),
+                )
+                atexit.register(recorder.stop)
+                _recorder = recorder
+    return _recorder
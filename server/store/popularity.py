@@ -0,0 +1,252 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Value, When
+from django.db.models.functions import Coalesce, Greatest, Power
+from django.utils import timezone
+
+from store.archive import archived_product_counts, iter_archived_navigations
+from store.models import Category, CategoryPopularity, NavigationArchive, Product, ProductNavigation, ProductPopularity
+
+# Trending scores never decay in the database. An event at time t adds
+# 2 ** ((t - anchor) / half_life) to the score of the row, the anchor being
+# the start of the period of this many half-lives the row was last written in
+# (trending_epoch), and scores are decayed to the current time when read.
+# Every process derives the period from the clock, rows of an older period
+# are moved to the current one when they are next written.
+TRENDING_PERIOD_HALF_LIVES = 256
+# Rows more half-lives than this behind count as zero, 2 ** -1000 doesn't underflow
+MIN_TRENDING_EXPONENT = -1000
+# Rows per UPDATE of reconcile_popularity
+RECONCILE_BATCH_SIZE = 500
+
+
+def record_navigations(product_ids):
+    """
+    Add navigations to the per-product and per-category counters.
+    Every navigation counts once for its product and once for each of the
+    product's categories, like Count('products__destination_navigations').
+
+    Args:
+        product_ids: Destination product ID of every recorded navigation
+    """
+    product_counts = Counter(product_ids)
+    if not product_counts:
+        return
+
+    category_counts = Counter()
+    product_categories = Product.categories.through.objects.filter(
+        product_id__in=list(product_counts)
+    ).values_list('product_id', 'category_id')
+    for product_id, category_id in product_categories:
+        category_counts[category_id] += product_counts[product_id]
+
+    with transaction.atomic():
+        increment_counters(ProductPopularity, 'product_id', product_counts)
+        increment_counters(CategoryPopularity, 'category_id', category_counts)
+
+
+def increment_counters(model, key, counts):
+    """
+    Add counts to the counters of several objects with one UPDATE per
+    distinct count, few with the long tail of a batch of navigations.
+    Objects without a counter yet get one created with their count.
+    """
+    ids_by_count = defaultdict(list)
+    for object_id, count in counts.items():
+        ids_by_count[count].append(object_id)
+    now = timezone.now()
+    half_life = get_trending_half_life()
+    epoch = get_trending_epoch(now, half_life)
+    weight = float(get_trending_weights([now.timestamp()], epoch, half_life)[0])
+    updated = 0
+    for count, object_ids in ids_by_count.items():
+        updated += model.objects.filter(**{f'{key}__in': object_ids}).update(
+            navigations=F('navigations') + count,
+            trending_score=anchored_trending_score(epoch * TRENDING_PERIOD_HALF_LIVES) + count * weight,
+            trending_epoch=epoch,
+            updated_at=now,
+        )
+    if updated < len(counts):
+        existing = set(model.objects.filter(**{f'{key}__in': list(counts)}).values_list(key, flat=True))
+        model.objects.bulk_create([
+            model(**{key: object_id}, navigations=count, trending_score=count * weight, trending_epoch=epoch)
+            for object_id, count in counts.items() if object_id not in existing
+        ], ignore_conflicts=True)
+
+
+def get_trending_half_life():
+    return timedelta(hours=getattr(settings, 'POPULARITY_TRENDING_HALF_LIFE_HOURS', 24))
+
+
+def get_trending_epoch(now, half_life):
+    """Period `now` falls in, the anchor of the trending scores written at `now`"""
+    return int(now.timestamp() // (TRENDING_PERIOD_HALF_LIVES * half_life.total_seconds()))
+
+
+def get_trending_weights(created_at, epoch, half_life):
+    """
+    Weight of every event in a trending score anchored to `epoch`,
+    doubling every `half_life` after the start of the period
+
+    Args:
+        created_at: Event times in seconds since the epoch
+    """
+    half_lives = np.asarray(created_at, dtype=np.float64) / half_life.total_seconds()
+    return np.power(2.0, half_lives - epoch * TRENDING_PERIOD_HALF_LIVES)
+
+
+def get_trending_scale(epochs, anchor):
+    """
+    Factors moving trending scores anchored to `epochs` to another anchor
+
+    Args:
+        anchor: Half-lives since the Unix epoch, now / half_life to decay the scores to now
+    """
+    exponents = np.asarray(epochs, dtype=np.float64) * TRENDING_PERIOD_HALF_LIVES - anchor
+    return np.power(2.0, np.maximum(exponents, MIN_TRENDING_EXPONENT))
+
+
+def anchored_trending_score(anchor, prefix=''):
+    """get_trending_scale as a database expression, times the trending_score of the row"""
+    exponent = F(f'{prefix}trending_epoch') * TRENDING_PERIOD_HALF_LIVES - Value(float(anchor))
+    return F(f'{prefix}trending_score') * Power(
+        Value(2.0), Greatest(exponent, Value(float(MIN_TRENDING_EXPONENT)), output_field=FloatField()),
+    )
+
+
+def reconcile_popularity():
+    """
+    Recompute all counters from the navigation table and the archive.
+    Exact navigation totals and trending scores are read in one transaction
+    together with the counters, and the counters are corrected by the
+    difference, so navigations recorded meanwhile are kept. Events older than
+    10 half-lives are left out of the trending scores.
+
+    Returns:
+        Tuple of (number of products, number of categories) corrected
+    """
+    now = timezone.now()
+    half_life = get_trending_half_life()
+    epoch = get_trending_epoch(now, half_life)
+    since = now - 10 * half_life
+
+    # Every product and category has a counter, so that all of them can be corrected in place
+    ProductPopularity.objects.bulk_create([
+        ProductPopularity(product_id=product_id)
+        for product_id in Product.objects.filter(popularity__isnull=True).values_list('id', flat=True)
+    ], ignore_conflicts=True)
+    CategoryPopularity.objects.bulk_create([
+        CategoryPopularity(category_id=category_id)
+        for category_id in Category.objects.filter(popularity__isnull=True).values_list('id', flat=True)
+    ], ignore_conflicts=True)
+
+    # One snapshot of the counters and of the navigations they count
+    with transaction.atomic():
+        product_counters = list(ProductPopularity.objects.values_list(
+            'product_id', 'navigations', 'trending_score', 'trending_epoch'
+        ))
+        category_counters = list(CategoryPopularity.objects.values_list(
+            'category_id', 'navigations', 'trending_score', 'trending_epoch'
+        ))
+        # Recent events are in the table, and in the archive if the retention period is short
+        rows = list(ProductNavigation.objects.filter(created_at__gte=since).values_list(
+            'destination_product_id', 'created_at'
+        ))
+        recent_archives = list(NavigationArchive.objects.filter(day__gte=timezone.localdate(since)))
+        table_totals = dict(
+            ProductNavigation.objects.values('destination_product_id').annotate(
+                count=Count('id')
+            ).values_list('destination_product_id', 'count')
+        )
+        archived_ids, archived_counts = archived_product_counts()
+        links = list(Product.categories.through.objects.values_list('product_id', 'category_id'))
+
+    recent_products = [np.array([product_id for product_id, _ in rows], dtype=np.int64)]
+    recent_times = [np.array([created_at.timestamp() for _, created_at in rows], dtype=np.float64)]
+    for _, segment in iter_archived_navigations(recent_archives, names=('product_ids', 'created_at')):
+        recent = segment['created_at'] >= since.timestamp()
+        recent_products.append(segment['product_ids'][recent])
+        recent_times.append(segment['created_at'][recent].astype(np.float64))
+
+    product_trending = defaultdict(float)
+    weights = get_trending_weights(np.concatenate(recent_times), epoch, half_life)
+    for product_id, weight in zip(np.concatenate(recent_products).tolist(), weights.tolist()):
+        product_trending[product_id] += weight
+
+    # Totals of the table plus the daily aggregates of the archive
+    product_totals = Counter(dict(zip(archived_ids.tolist(), archived_counts.tolist())))
+    product_totals.update(table_totals)
+
+    category_totals = Counter()
+    category_trending = defaultdict(float)
+    for product_id, category_id in links:
+        category_totals[category_id] += product_totals.get(product_id, 0)
+        category_trending[category_id] += product_trending.get(product_id, 0)
+
+    products = correct_counters(
+        ProductPopularity, 'product_id', product_counters, product_totals, product_trending, epoch, now
+    )
+    categories = correct_counters(
+        CategoryPopularity, 'category_id', category_counters, category_totals, category_trending, epoch, now
+    )
+    return products, categories
+
+
+def correct_counters(model, key, counters, totals, trending, epoch, now):
+    """
+    Move counters to the exact values with relative updates, one UPDATE
+    per batch of counters, so increments made since they were read stay
+
+    Args:
+        counters: (object ID, navigations, trending score, trending epoch) as read
+        totals: Exact navigations by object ID
+        trending: Exact trending scores anchored to `epoch` by object ID
+
+    Returns:
+        Number of corrected counters
+    """
+    if not counters:
+        return 0
+    object_ids, navigations, scores, epochs = zip(*counters)
+    scores = np.array(scores, dtype=np.float64) * get_trending_scale(epochs, epoch * TRENDING_PERIOD_HALF_LIVES)
+    corrections = []
+    for object_id, count, score in zip(object_ids, navigations, scores.tolist()):
+        navigations_delta = totals.get(object_id, 0) - count
+        trending_delta = trending.get(object_id, 0) - score
+        if navigations_delta or trending_delta:
+            corrections.append((object_id, navigations_delta, trending_delta))
+
+    for offset in range(0, len(corrections), RECONCILE_BATCH_SIZE):
+        batch = corrections[offset:offset + RECONCILE_BATCH_SIZE]
+        model.objects.filter(**{f'{key}__in': [object_id for object_id, _, _ in batch]}).update(
+            navigations=F('navigations') + Case(
+                *[When(**{key: object_id}, then=Value(delta)) for object_id, delta, _ in batch],
+                default=Value(0),
+            ),
+            trending_score=anchored_trending_score(epoch * TRENDING_PERIOD_HALF_LIVES) + Case(
+                *[When(**{key: object_id}, then=Value(delta)) for object_id, _, delta in batch],
+                default=Value(0.0), output_field=FloatField(),
+            ),
+            trending_epoch=epoch,
+            updated_at=now,
+        )
+    return len(corrections)
+
+
+def order_by_popularity(queryset, trending=False):
+    """
+    Annotate products or categories with their counter and order by it,
+    most popular first. Rows without a counter count as zero, trending
+    scores are decayed to the current time.
+    """
+    if trending:
+        anchor = timezone.now().timestamp() / get_trending_half_life().total_seconds()
+        counter, default = anchored_trending_score(anchor, prefix='popularity__'), 0.0
+    else:
+        counter, default = F('popularity__navigations'), 0
+    return queryset.annotate(
+        navigation_count=Coalesce(counter, Value(default))
+    ).order_by('-navigation_count', 'id')
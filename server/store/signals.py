@@ -0,0 +1,101 @@
+from django.db import transaction
+from django.db.models import Count, Q, QuerySet
+from django.db.models.functions import TruncDate
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import User
+from store.catalog import invalidate_catalog
+from store.metrics import add_to_metric, record_order_change
+from store.models import Category, Order, Product, ProductNavigation
+from store.popularity import record_navigations
+from store.statistics import invalidate_statistics
+
+@receiver(post_save, sender=ProductNavigation)
+def count_navigation(sender, instance, created, **kwargs):
+    if created:
+        record_navigations([instance.destination_product_id])
+        add_to_metric('navigations', 1)
+
+@receiver(pre_delete, sender=Product)
+@receiver(pre_delete, sender=User)
+def uncount_navigations(sender, instance, origin=None, **kwargs):
+    # Navigations are deleted with their product or user in one fast DELETE, a receiver on
+    # ProductNavigation would load them one by one. Archived navigations still count.
+    if isinstance(origin, QuerySet) and origin.model is sender:
+        if getattr(origin, '_navigations_uncounted', False):
+            # A navigation between two deleted products only counts once
+            return
+        origin._navigations_uncounted = True
+        deleted = origin.values('pk')
+    else:
+        deleted = [instance.pk]
+    if sender is Product:
+        navigations = ProductNavigation.objects.filter(
+            Q(destination_product__in=deleted) | Q(source_product__in=deleted)
+        )
+    else:
+        navigations = ProductNavigation.objects.filter(user__in=deleted)
+    days = navigations.annotate(day=TruncDate('created_at')).values('day').annotate(count=Count('id'))
+    for day, count in days.values_list('day', 'count'):
+        add_to_metric('navigations', -count, day)
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Category)
+@receiver(m2m_changed, sender=Product.categories.through)
+def refresh_catalog(sender, **kwargs):
+    # Readers only see the change once it's committed
+    transaction.on_commit(invalidate_catalog)
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def refresh_statistics(sender, **kwargs):
+    transaction.on_commit(invalidate_statistics)
+
+ORDER_ROLLUP_FIELDS = ('status', 'total', 'created_at')
+
+@receiver(post_init, sender=Order)
+def remember_loaded_order(sender, instance, **kwargs):
+    # The rollups need the values a save replaces, kept from when the order was loaded
+    if instance.pk is not None and not instance.get_deferred_fields() & set(ORDER_ROLLUP_FIELDS):
+        instance._rollup_state = tuple(getattr(instance, name) for name in ORDER_ROLLUP_FIELDS)
+
+@receiver(pre_save, sender=Order)
+def remember_order(sender, instance, **kwargs):
+    if instance._state.adding:
+        instance._rollup_state = None
+    elif not hasattr(instance, '_rollup_state'):
+        # Loaded without some of the fields
+        instance._rollup_state = Order.objects.filter(pk=instance.pk).values_list(*ORDER_ROLLUP_FIELDS).first()
+
+@receiver(post_save, sender=Order)
+def roll_up_order(sender, instance, update_fields=None, **kwargs):
+    previous = instance._rollup_state
+    current = tuple(getattr(instance, name) for name in ORDER_ROLLUP_FIELDS)
+    if previous is not None and update_fields is not None:
+        # Fields left out of the update keep their stored values
+        current = tuple(
+            value if name in update_fields else old
+            for name, value, old in zip(ORDER_ROLLUP_FIELDS, current, previous)
+        )
+    record_order_change(previous, current)
+    instance._rollup_state = current
+
+@receiver(post_delete, sender=Order)
+def roll_up_deleted_order(sender, instance, **kwargs):
+    record_order_change(previous=(instance.status, instance.total, instance.created_at))
+
+@receiver(post_save, sender=Product)
+def roll_up_product(sender, instance, created, **kwargs):
+    if created:
+        add_to_metric('products', 1, timezone.localdate(instance.created_at))
+
+@receiver(post_delete, sender=Product)
+def roll_up_deleted_product(sender, instance, **kwargs):
+    add_to_metric('products', -1, timezone.localdate(instance.created_at))
@@ -1,3 +1,683 @@
-from django.test import TestCase
-
-# Create your tests here.
+import os
+import random
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+import numpy as np
+from django.db import DatabaseError, connection
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import Session, User
+from core.query_stats import reset_endpoint_stats
+from store import archive, catalog, navigations, popularity
+from store.catalog import Catalog, get_catalog, invalidate_catalog
+from store.models import (
+    CartItem, Category, CategoryPopularity, DailyMetric, NavigationArchive, Order, Product, ProductImage,
+    ProductNavigation, ProductPopularity,
+)
+from store.navigations import NavigationRecorder
+from store.popularity import (
+    TRENDING_PERIOD_HALF_LIVES, correct_counters, get_trending_epoch, get_trending_half_life, increment_counters,
+    order_by_popularity, reconcile_popularity,
+)
+from store.metrics import backfill_daily_metrics, get_daily_series
+from store.statistics import compute_statistics, get_last_changes, get_periods, invalidate_statistics
+
+WORDS = 'phone laptop wireless speaker monitor headphones gaming mouse keyboard camera smart watch tablet charger cable'.split()
+
+# Every cache in memory, and no background refreshes while a test measures
+BUDGET_SETTINGS = dict(
+    CACHES={
+        alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+        for alias in ('default', 'recommendations', 'statistics')
+    },
+    CATALOG_REFRESH_INTERVAL=3600,
+    TEXT_INDEX_REFRESH_INTERVAL=3600,
+    RECOMMENDATION_REFRESH_INTERVAL=3600,
+    QUERY_STATS_HEADERS=True,
+)
+
+
+def seed_store(num_categories=8, num_products=120, num_users=12, navigations_per_user=10, seed=0):
+    """
+    A small but realistic store: products in two categories each, most with
+    images, users with navigation histories, orders and full carts.
+    Every list endpoint has more than one page of it.
+    """
+    rng = random.Random(seed)
+    categories = [
+        Category.objects.create(name=f'Category {i}', description=' '.join(rng.sample(WORDS, 4)))
+        for i in range(num_categories)
+    ]
+    products = []
+    for i in range(num_products):
+        product = Product.objects.create(
+            name=' '.join(rng.sample(WORDS, 3)),
+            description=' '.join(rng.sample(WORDS, 6)),
+            price=rng.randint(1, 500),
+        )
+        product.categories.set(rng.sample(categories, 2))
+        products.append(product)
+    # Some products have no image
+    ProductImage.objects.bulk_create([
+        ProductImage(product=product, image=f'products/{product.id}-{n}.jpg')
+        for product in products[:-10] for n in range(2)
+    ])
+
+    users = [
+        User.objects.create_user(
+            email=f'user{i}@example.com', first_name='Test', last_name='User', dob='1990-01-01', password='password'
+        )
+        for i in range(num_users)
+    ]
+    ProductNavigation.objects.bulk_create([
+        ProductNavigation(
+            user=user,
+            source_product=rng.choice(products) if rng.random() < 0.5 else None,
+            destination_product=rng.choice(products),
+        )
+        for user in users for _ in range(navigations_per_user)
+    ])
+    reconcile_popularity()
+
+    for user in users:
+        Order.objects.create(user=user, total=rng.randint(10, 1000), status=rng.choice(['pending', 'completed']))
+        CartItem.objects.bulk_create([
+            CartItem(user=user, product=product, quantity=rng.randint(1, 3))
+            for product in rng.sample(products, 60)
+        ])
+    admin = User.objects.create_user(
+        email='store-admin@example.com', first_name='Admin', last_name='User', dob='1990-01-01', password='password',
+        is_admin=True,
+    )
+    return {'categories': categories, 'products': products, 'users': users, 'admin': admin}
+
+
+@override_settings(**BUDGET_SETTINGS)
+class QueryBudgetTestCase(TestCase):
+    """
+    Asserts how many SQL queries an endpoint may run. Authentication is the
+    real JWT lookup, so its queries count. Each endpoint is requested once
+    to warm the in-process snapshots, then measured at two page sizes:
+    the count must stay within the budget and must not grow with the page.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_store()
+
+    def setUp(self):
+        # The test transaction is never committed, so the on_commit
+        # invalidations of the previous tests never ran
+        invalidate_catalog()
+        invalidate_statistics()
+        reset_endpoint_stats()
+        self.recorder = navigations._recorder
+        navigations._recorder = NavigationRecorder(durability='sync')
+
+    def tearDown(self):
+        navigations._recorder = self.recorder
+
+    def client_for(self, user=None):
+        client = APIClient()
+        if user is not None:
+            access_token, _ = user.generate_tokens(Session.objects.create(user=user).id)
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        return client
+
+    def count_queries(self, client, path, method='get'):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(client, method)(path)
+        self.assertLess(response.status_code, 400, f'{path}: {response.content[:300]}')
+        return len(queries), response
+
+    def assertQueryBudget(self, path, budget, user=None, page_sizes=(5, 50)):
+        client = self.client_for(user)
+        separator = '&' if '?' in path else '?'
+        self.count_queries(client, path)
+        counts = [
+            self.count_queries(client, f'{path}{separator}page_size={page_size}')[0]
+            for page_size in page_sizes
+        ]
+        self.assertLessEqual(max(counts), budget, f'{path} ran {counts} queries, the budget is {budget}')
+        self.assertEqual(len(set(counts)), 1, f'{path} runs more queries for larger pages: {counts}')
+
+
+class StoreQueryBudgetTests(QueryBudgetTestCase):
+    def test_categories(self):
+        self.assertQueryBudget('/categories', 2)
+
+    def test_category_search(self):
+        self.assertQueryBudget('/categories?query=Category', 2)
+
+    def test_category_detail(self):
+        self.assertQueryBudget(f'/category/{self.data["categories"][0].id}/', 1, page_sizes=(5,))
+
+    def test_category_names(self):
+        self.assertQueryBudget('/categories/names', 1, page_sizes=(5,))
+
+    def test_popular_categories(self):
+        self.assertQueryBudget('/popular-categories', 2)
+        self.assertQueryBudget('/popular-categories?sort=trending', 2)
+
+    def test_products(self):
+        self.assertQueryBudget('/products', 4)
+        self.assertQueryBudget('/products?query=phone', 4)
+
+    def test_product_detail_records_navigation(self):
+        product = self.data['products'][0]
+        source = self.data['products'][1]
+        # Product, its images and categories, then in one transaction the navigation insert,
+        # the product counter and the counters of its two categories in a savepoint, and the daily metric
+        self.assertQueryBudget(f'/product/{product.id}/?source={source.id}', 12, page_sizes=(5,))
+        # Plus two for authentication
+        self.assertQueryBudget(f'/product/{product.id}/', 14, user=self.data['users'][0], page_sizes=(5,))
+
+    def test_cart(self):
+        self.assertQueryBudget('/cart', 5, user=self.data['users'][0])
+
+    def test_statistics(self):
+        self.assertQueryBudget('/statistics', 2, user=self.data['admin'], page_sizes=(5,))
+        invalidate_statistics()
+        count, _ = self.count_queries(self.client_for(self.data['admin']), '/statistics')
+        self.assertLessEqual(count, 2 + 3)
+
+    def test_daily_statistics(self):
+        self.assertQueryBudget('/statistics/daily', 3, user=self.data['admin'], page_sizes=(5,))
+
+
+class QueryStatsTests(QueryBudgetTestCase):
+    def test_headers_match_captured_queries(self):
+        client = self.client_for()
+        client.get('/products')
+        count, response = self.count_queries(client, '/products?page_size=20')
+        self.assertEqual(int(response['X-Query-Count']), count)
+        self.assertGreaterEqual(float(response['X-Query-Time-Ms']), float(response['X-Slowest-Query-Ms']))
+
+    def test_endpoint_stats_are_admin_only(self):
+        self.assertEqual(self.client_for(self.data['users'][0]).get('/statistics/queries').status_code, 403)
+
+    def test_endpoint_stats(self):
+        client = self.client_for()
+        for _ in range(3):
+            client.get('/products')
+        response = self.client_for(self.data['admin']).get('/statistics/queries')
+        self.assertEqual(response.status_code, 200)
+        endpoints = {(e['method'], e['route']): e for e in response.json()['endpoints']}
+        products = endpoints['GET', 'products']
+        self.assertEqual(products['requests'], 3)
+        self.assertGreater(products['max_queries'], 0)
+        self.assertLessEqual(len(products['slowest']), 5)
+
+        self.client_for(self.data['admin']).delete('/statistics/queries')
+        response = self.client_for(self.data['admin']).get('/statistics/queries')
+        self.assertNotIn(('GET', 'products'), {(e['method'], e['route']) for e in response.json()['endpoints']})
+
+
+class NavigationRecorderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Phones')
+        cls.products = [Product.objects.create(name=f'Phone {i}', price=100) for i in range(3)]
+        for product in cls.products:
+            product.categories.add(cls.category)
+        cls.user = User.objects.create_user(
+            email='recorder@example.com', first_name='Test', last_name='User', dob='1990-01-01', password='password'
+        )
+
+    def best_effort_recorder(self, **kwargs):
+        # Flushed by the test itself, never by the background thread
+        recorder = NavigationRecorder(durability='best_effort', batch_size=1000, flush_interval=3600, **kwargs)
+        patcher = mock.patch.object(recorder, '_ensure_thread')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return recorder
+
+    def assertCounters(self, navigations):
+        self.assertEqual(ProductNavigation.objects.count(), navigations)
+        self.assertEqual(
+            sum(ProductPopularity.objects.values_list('navigations', flat=True)), navigations
+        )
+        self.assertEqual(CategoryPopularity.objects.get(category=self.category).navigations, navigations)
+        self.assertEqual(
+            DailyMetric.objects.get(metric='navigations', day=timezone.localdate()).value, navigations
+        )
+
+    def test_dedupe_window(self):
+        recorder = NavigationRecorder(durability='sync', dedupe_window=60)
+        product = self.products[0]
+        self.assertTrue(recorder.record(product.id, user_id=self.user.id))
+        self.assertFalse(recorder.record(product.id, user_id=self.user.id))
+        self.assertTrue(recorder.record(self.products[1].id, user_id=self.user.id))
+        # Anonymous views can't be told apart
+        self.assertTrue(recorder.record(product.id))
+        self.assertTrue(recorder.record(product.id))
+        self.assertCounters(4)
+
+    def test_stop_drains_queue(self):
+        recorder = self.best_effort_recorder()
+        for product in self.products:
+            recorder.record(product.id, user_id=self.user.id)
+        self.assertEqual(ProductNavigation.objects.count(), 0)
+        recorder.stop()
+        self.assertCounters(3)
+
+    def test_process_recorder_is_drained_at_exit(self):
+        self.addCleanup(setattr, navigations, '_recorder', navigations._recorder)
+        navigations._recorder = None
+        with mock.patch.object(navigations.atexit, 'register') as register:
+            recorder = navigations.get_navigation_recorder()
+        register.assert_called_once_with(recorder.stop)
+
+    def test_failed_flush_is_retried_once(self):
+        recorder = self.best_effort_recorder()
+        for product in self.products:
+            recorder.record(product.id, user_id=self.user.id, source_product_id=self.products[0].id)
+
+        with mock.patch.object(navigations, 'add_to_metric', side_effect=DatabaseError('database is locked')):
+            with self.assertLogs('store.navigations', 'ERROR'):
+                self.assertEqual(recorder.flush(), 0)
+        # Rolled back as a whole, the events wait in the queue without primary keys
+        self.assertEqual(ProductNavigation.objects.count(), 0)
+        self.assertFalse(ProductPopularity.objects.filter(navigations__gt=0).exists())
+        self.assertEqual(len(recorder._queue), 3)
+        self.assertTrue(all(navigation.pk is None for navigation in recorder._queue))
+
+        self.assertEqual(recorder.flush(), 3)
+        self.assertEqual(recorder.flush(), 0)
+        self.assertCounters(3)
+
+    def test_sync_failure_is_raised(self):
+        recorder = NavigationRecorder(durability='sync')
+        with mock.patch.object(navigations, 'add_to_metric', side_effect=DatabaseError('database is locked')):
+            with self.assertRaises(DatabaseError):
+                recorder.record(self.products[0].id)
+        self.assertEqual(ProductNavigation.objects.count(), 0)
+
+    def test_counters_are_updated_per_distinct_count(self):
+        a, b, c = self.products
+        # The first navigations create the counters
+        increment_counters(ProductPopularity, 'product_id', {a.id: 1, b.id: 1, c.id: 1})
+        # Two counts, two updates, whatever the number of products
+        with self.assertNumQueries(2):
+            increment_counters(ProductPopularity, 'product_id', {a.id: 5, b.id: 5, c.id: 1})
+        navigations = dict(ProductPopularity.objects.values_list('product_id', 'navigations'))
+        self.assertEqual(navigations, {a.id: 6, b.id: 6, c.id: 2})
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Phones')
+        cls.products = [Product.objects.create(name=f'Phone {i}', price=100) for i in range(2)]
+        for product in cls.products:
+            product.categories.add(cls.category)
+
+    def trending(self):
+        products = order_by_popularity(Product.objects.filter(id__in=[p.id for p in self.products]), trending=True)
+        return {product.id: product.navigation_count for product in products}
+
+    def test_scores_decay_without_reconcile(self):
+        old, new = self.products
+        now = timezone.now()
+        half_life = get_trending_half_life()
+        with mock.patch.object(popularity.timezone, 'now', return_value=now - 3 * half_life):
+            increment_counters(ProductPopularity, 'product_id', {old.id: 4})
+        with mock.patch.object(popularity.timezone, 'now', return_value=now):
+            increment_counters(ProductPopularity, 'product_id', {new.id: 1})
+            trending = self.trending()
+        # Four navigations three half-lives ago weigh half of one now
+        self.assertAlmostEqual(trending[old.id], 0.5)
+        self.assertAlmostEqual(trending[new.id], 1.0)
+        self.assertEqual(list(trending), [new.id, old.id])
+
+    def test_scores_carry_over_to_the_next_period(self):
+        product = self.products[0]
+        half_life = get_trending_half_life()
+        period = TRENDING_PERIOD_HALF_LIVES * half_life.total_seconds()
+        now = timezone.now()
+        next_period = now + timedelta(seconds=period - now.timestamp() % period)
+        with mock.patch.object(popularity.timezone, 'now', return_value=next_period - half_life):
+            increment_counters(ProductPopularity, 'product_id', {product.id: 2})
+        with mock.patch.object(popularity.timezone, 'now', return_value=next_period + half_life):
+            increment_counters(ProductPopularity, 'product_id', {product.id: 1})
+            self.assertAlmostEqual(self.trending()[product.id], 1.5)
+        counter = ProductPopularity.objects.get(product=product)
+        self.assertEqual(counter.trending_epoch, get_trending_epoch(next_period + half_life, half_life))
+
+    def test_reconcile_keeps_concurrent_increments(self):
+        a, b = self.products
+        ProductNavigation.objects.bulk_create([ProductNavigation(destination_product=a) for _ in range(3)])
+        # Counters that drifted from the table
+        increment_counters(ProductPopularity, 'product_id', {a.id: 1, b.id: 7})
+
+        def correct_after_increment(model, *args):
+            # Recorded after the snapshot was read, before the corrections are written
+            if model is ProductPopularity:
+                increment_counters(ProductPopularity, 'product_id', {a.id: 2})
+            return correct_counters(model, *args)
+
+        with mock.patch.object(popularity, 'correct_counters', side_effect=correct_after_increment):
+            reconcile_popularity()
+        counters = {
+            product_id: (navigations, score)
+            for product_id, navigations, score in ProductPopularity.objects.values_list(
+                'product_id', 'navigations', 'trending_score'
+            )
+        }
+        self.assertEqual(counters[a.id][0], 5)
+        self.assertEqual(counters[b.id][0], 0)
+        self.assertAlmostEqual(self.trending()[a.id], 5, places=3)
+        self.assertAlmostEqual(self.trending()[b.id], 0)
+        self.assertEqual(CategoryPopularity.objects.get(category=self.category).navigations, 3)
+
+
+class CatalogPatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories = [Category.objects.create(name=f'Category {i}') for i in range(12)]
+        cls.products = []
+        for i in range(20):
+            product = Product.objects.create(name=f'Product {i}', price=10 + i)
+            product.categories.set(cls.categories[i % 12:i % 12 + 2])
+            cls.products.append(product)
+        ProductNavigation.objects.bulk_create([ProductNavigation(destination_product=cls.products[0]) for _ in range(3)])
+        reconcile_popularity()
+
+    def setUp(self):
+        catalog._catalog = Catalog.build()
+        invalidate_catalog()
+
+    def assertMatchesBuild(self, patched):
+        built = Catalog.build()
+        self.assertEqual(patched.marker, built.marker)
+        for column in ('ids', 'prices', 'created_at', 'category_ids', 'category_bits', 'navigations'):
+            self.assertTrue(np.array_equal(getattr(patched, column), getattr(built, column)), column)
+
+    def refresh(self):
+        invalidate_catalog()
+        with mock.patch.object(Catalog, 'build', wraps=Catalog.build) as build:
+            patched = get_catalog()
+        self.assertFalse(build.called)
+        return patched
+
+    def test_saved_product_is_patched(self):
+        product = self.products[5]
+        product.price = 999
+        product.save()
+        product.categories.add(self.categories[0])
+        patched = self.refresh()
+        self.assertMatchesBuild(patched)
+        # Counters of the patched rows are kept
+        self.assertEqual(patched.navigations[patched.ids == self.products[0].id].tolist(), [3])
+
+    def test_created_and_deleted_products_are_patched(self):
+        Product.objects.create(name='New product', price=1).categories.add(self.categories[3])
+        self.products[7].delete()
+        self.assertMatchesBuild(self.refresh())
+
+    def test_new_category_rebuilds(self):
+        Category.objects.create(name='New category')
+        self.products[1].save()
+        invalidate_catalog()
+        with mock.patch.object(Catalog, 'build', wraps=Catalog.build) as build:
+            self.assertMatchesBuild(get_catalog())
+        self.assertTrue(build.called)
+
+
+class NavigationArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = [Product.objects.create(name=f'Phone {i}', price=100) for i in range(3)]
+        cls.users = [
+            User.objects.create_user(
+                email=f'archive{i}@example.com', first_name='Test', last_name='User', dob='1990-01-01',
+                password='password',
+            )
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(NAVIGATION_ARCHIVE_DIR=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        archive.invalidate_archive_counts()
+        self.day = timezone.localdate() - timedelta(days=10)
+
+    def navigate(self, specs):
+        """Create navigations at noon of self.day from (user, destination, source, query) tuples"""
+        created_at = archive.day_bounds(self.day)[0] + timedelta(hours=12)
+        navigations = ProductNavigation.objects.bulk_create([
+            ProductNavigation(user=user, destination_product=destination, source_product=source, search_query=query)
+            for user, destination, source, query in specs
+        ])
+        ProductNavigation.objects.filter(id__in=[n.id for n in navigations]).update(created_at=created_at)
+        return list(ProductNavigation.objects.filter(id__in=[n.id for n in navigations]).order_by('id').values_list(
+            'id', 'user_id', 'destination_product_id', 'source_product_id', 'search_query', 'created_at'
+        ))
+
+    def archived_rows(self):
+        rows = []
+        for _, segment in archive.iter_archived_navigations(names=archive.SEGMENT_COLUMNS):
+            for i in range(len(segment['ids'])):
+                rows.append((
+                    int(segment['ids'][i]),
+                    None if segment['user_ids'][i] == archive.NO_ID else int(segment['user_ids'][i]),
+                    int(segment['product_ids'][i]),
+                    None if segment['source_product_ids'][i] == archive.NO_ID else int(segment['source_product_ids'][i]),
+                    str(segment['search_queries'][i]) or None,
+                    int(segment['created_at'][i]),
+                ))
+        return sorted(rows)
+
+    def test_round_trip(self):
+        a, b, c = self.products
+        rows = self.navigate([
+            (self.users[0], a, None, None),
+            (self.users[0], b, a, None),
+            (self.users[1], a, None, 'phone'),
+            (None, c, b, None),
+        ])
+        ProductNavigation.objects.create(destination_product=a)  # Recent, stays in the table
+
+        archives = archive.archive_navigations(retention_days=5)
+        self.assertEqual([(x.day, x.num_events, x.num_user_events) for x in archives], [(self.day, 4, 3)])
+        self.assertEqual(ProductNavigation.objects.count(), 1)
+        self.assertEqual(
+            self.archived_rows(),
+            [(*row[:5], int(row[5].timestamp())) for row in rows],
+        )
+        ids, counts = archive.archived_product_counts()
+        self.assertEqual(dict(zip(ids.tolist(), counts.tolist())), {a.id: 2, b.id: 1, c.id: 1})
+        self.assertEqual(archive.count_archived_user_navigations(self.users[0].id), 2)
+        self.assertEqual(archive.count_archived_user_navigations(self.users[1].id), 1)
+
+    def test_user_counts_are_cached_per_archive_version(self):
+        self.navigate([(self.users[0], self.products[0], None, None)])
+        archive.archive_navigations(retention_days=5)
+        self.assertEqual(archive.count_archived_user_navigations(self.users[0].id), 1)
+        with self.assertNumQueries(0):
+            archive.count_archived_user_navigations(self.users[0].id)
+
+        # A late navigation archived in this process is counted once committed
+        self.navigate([(self.users[0], self.products[1], None, None)])
+        with self.captureOnCommitCallbacks(execute=True):
+            archive.archive_navigations(retention_days=5)
+        self.assertEqual(archive.count_archived_user_navigations(self.users[0].id), 2)
+
+    def test_compaction_merges_split_days(self):
+        a, b, c = self.products
+        first = self.navigate([(self.users[0], a, None, None), (self.users[1], b, None, None)])
+        archive.archive_navigations(retention_days=5)
+        # Recorded late, archived in a second segment of the same day
+        second = self.navigate([(self.users[0], c, a, None)])
+        archive.archive_navigations(retention_days=5)
+        old_paths = list(NavigationArchive.objects.values_list('path', flat=True))
+        self.assertEqual(len(old_paths), 2)
+
+        self.assertEqual(archive.compact_archives(), 1)
+        merged = NavigationArchive.objects.get()
+        self.assertEqual((merged.min_id, merged.max_id, merged.num_events), (first[0][0], second[0][0], 3))
+        self.assertEqual([row[0] for row in self.archived_rows()], [row[0] for row in first + second])
+        self.assertFalse(any(os.path.exists(path) for path in old_paths if path != merged.path))
+        self.assertEqual(archive.count_archived_user_navigations(self.users[0].id), 2)
+
+    def test_compaction_keeps_days_with_unreadable_segments(self):
+        self.navigate([(self.users[0], self.products[0], None, None)])
+        archive.archive_navigations(retention_days=5)
+        self.navigate([(self.users[1], self.products[1], None, None)])
+        archive.archive_navigations(retention_days=5)
+        missing = NavigationArchive.objects.first()
+        os.remove(missing.path)
+
+        with self.assertLogs('store.archive', 'ERROR'):
+            self.assertEqual(archive.compact_archives(), 0)
+        self.assertEqual(NavigationArchive.objects.count(), 2)
+        self.assertTrue(NavigationArchive.objects.filter(id=missing.id).exists())
+
+
+def baseline_statistics():
+    """The dashboard statistics computed with one query per period, like before the conditional aggregates"""
+    periods = get_periods()
+    names = {'day': 'yesterday', 'week': 'last_week', 'month': 'last_month', 'year': 'last_year'}
+
+    def count_stats(objects, title):
+        count = objects.count()
+        return get_last_changes(
+            {name: count - objects.filter(created_at__lt=periods[period]).count() for name, period in names.items()},
+            count, title,
+        )
+
+    completed = Order.objects.filter(status='completed')
+    current_sum = completed.aggregate(total_sum=Sum('total'))['total_sum'] or 0
+    changes = {}
+    for name, period in names.items():
+        previous_sum = completed.filter(created_at__lt=periods[period]).aggregate(total_sum=Sum('total'))['total_sum'] or 0
+        changes[name] = (float(current_sum) - float(previous_sum)) / float(previous_sum) * 100 if previous_sum > 0 else 0
+    return [
+        count_stats(Product.objects, 'Total Products'),
+        count_stats(Category.objects, 'Categories'),
+        count_stats(Order.objects, 'Orders'),
+        get_last_changes(changes, current_sum, 'Revenue', '%'),
+    ]
+
+
+def baseline_daily_series(start, end):
+    """Daily metrics counted from the tables one day at a time"""
+    series = {metric: [] for metric in ('orders', 'revenue', 'products', 'navigations')}
+    day = start
+    while day <= end:
+        bounds = archive.day_bounds(day)
+        created = dict(created_at__gte=bounds[0], created_at__lt=bounds[1])
+        series['orders'].append(Order.objects.filter(**created).count())
+        revenue = Order.objects.filter(status='completed', **created).aggregate(total=Sum('total'))['total']
+        series['revenue'].append(float(revenue or 0))
+        series['products'].append(Product.objects.filter(**created).count())
+        series['navigations'].append(ProductNavigation.objects.filter(**created).count())
+        day += timedelta(days=1)
+    return series
+
+
+class StatisticsEquivalenceTests(TestCase):
+    """Statistics and daily rollups give the numbers of the straightforward per-period queries"""
+    AGES = [timedelta(hours=2), timedelta(days=2), timedelta(days=12), timedelta(days=100), timedelta(days=500)]
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.user = User.objects.create_user(
+            email='statistics@example.com', first_name='Test', last_name='User', dob='1990-01-01', password='password'
+        )
+        self.orders = []
+        self.products = []
+        for i, age in enumerate(self.AGES):
+            # Created in the past, auto_now_add and the rollups see the same time
+            with self.frozen(self.now - age):
+                Category.objects.create(name=f'Category {i}')
+                product = Product.objects.create(name=f'Phone {i}', price=100)
+                self.products.append(product)
+                for status, total in (('completed', 100 + i), ('pending', 50), ('completed', 10 * (i + 1))):
+                    self.orders.append(Order.objects.create(user=self.user, status=status, total=total))
+                for _ in range(i + 1):
+                    ProductNavigation.objects.create(user=self.user, destination_product=product)
+
+    def frozen(self, at):
+        return mock.patch('django.utils.timezone.now', return_value=at)
+
+    def test_statistics_match_per_period_queries(self):
+        with self.frozen(self.now):
+            self.assertEqual(compute_statistics(), baseline_statistics())
+            # And after orders changed status
+            Order.objects.filter(status='pending').update(status='completed')
+            self.assertEqual(compute_statistics(), baseline_statistics())
+
+    def assertRollupsMatchTables(self):
+        end = timezone.localdate(self.now)
+        start = end - timedelta(days=600)
+        expected = baseline_daily_series(start, end)
+        series = get_daily_series(list(expected), start, end)
+        del series['days']
+        self.assertEqual(series, expected)
+        # A backfill writes the same rollups
+        backfill_daily_metrics(start, end)
+        series = get_daily_series(list(expected), start, end)
+        del series['days']
+        self.assertEqual(series, expected)
+
+    def test_rollups_match_per_day_queries(self):
+        self.assertRollupsMatchTables()
+
+    def test_rollups_follow_changes_and_deletes(self):
+        with self.frozen(self.now):
+            completed, pending = self.orders[3], self.orders[4]
+            completed.status = 'canceled'
+            completed.save()
+            pending.status = 'completed'
+            pending.total = Decimal('75.50')
+            pending.save()
+            # Only the saved fields count
+            order = Order.objects.get(id=self.orders[6].id)
+            order.total = Decimal('999')
+            order.status = 'pending'
+            order.save(update_fields=['total'])
+            self.orders[0].delete()
+            # Cascades to its navigations
+            self.products[2].delete()
+            self.assertRollupsMatchTables()
+
+    def test_rollups_follow_cascading_deletes(self):
+        with self.frozen(self.now):
+            # Navigations between two deleted products are uncounted once
+            ProductNavigation.objects.create(source_product=self.products[0], destination_product=self.products[1])
+            Product.objects.filter(id__in=[self.products[0].id, self.products[1].id]).delete()
+            self.assertRollupsMatchTables()
+            self.user.delete()
+            self.assertRollupsMatchTables()
+
+    def test_deleting_a_product_runs_no_query_per_navigation(self):
+        counts = []
+        for product, navigations in ((self.products[3], 10), (self.products[4], 300)):
+            with self.frozen(self.now):
+                ProductNavigation.objects.bulk_create([
+                    ProductNavigation(destination_product=product) for _ in range(navigations)
+                ])
+            with CaptureQueriesContext(connection) as queries:
+                product.delete()
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        # The cascade, one query for the navigations per day and one rollup update per day
+        self.assertLessEqual(counts[1], 11)
+
+    def test_saving_a_loaded_order_reads_no_previous_state(self):
+        order = Order.objects.get(id=self.orders[0].id)
+        order.status = 'canceled'
+        with CaptureQueriesContext(connection) as queries:
+            order.save()
+        self.assertFalse(any(
+            query['sql'].startswith('SELECT') and 'store_order' in query['sql'] for query in queries.captured_queries
+        ))